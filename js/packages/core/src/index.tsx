@@ -28,4 +28,5 @@ export default UIFactory;
 export { EventSystemProvider, useEventSystem } from './events';
 export { ComponentFactory } from './factory';
 export { GraphRenderer, DynamicRenderer } from './renderer';
+export type { PrevalidatedIndex, SchemaEnvelope } from './renderer';
 export type { AdapterRegistry, ComponentAdapter } from '@promptius-gui/adapters';
@@ -1,60 +1,152 @@
-import React from 'react';
-import { Node, Edge, Event, EventType, EventAction, PromptiusGUISchema, UISchema } from '@promptius-gui/schemas';
+import React, { useCallback, useMemo, useRef } from 'react';
+import {
+  Node,
+  Edge,
+  Event,
+  EventAction,
+  EventSchema,
+  EventTypeSchema,
+  PromptiusGUISchema,
+  UISchema,
+} from '@promptius-gui/schemas';
 import { useEventSystem } from './events';
 import { ComponentFactory } from './factory';
 
+// Lookup maps shipped in a server-issued envelope (envelope.index)
+export interface PrevalidatedIndex {
+  children: Record<string, string[]>;
+  events: Record<string, number[]>;
+  // Live bindings only: nodes[nodeId][eventType] indexes into actions
+  dispatch?: {
+    actions: EventAction[];
+    nodes: Record<string, Record<string, number>>;
+  };
+}
+
+// Response of POST /generate_ui with "envelope": true
+export interface SchemaEnvelope {
+  version: string;
+  hash: string;
+  // HMAC stamp; only the server holding the secret can check it
+  validated: string;
+  schema: PromptiusGUISchema;
+  index?: PrevalidatedIndex;
+}
+
 interface GraphRendererProps {
   schema: PromptiusGUISchema;
+  // Saves rebuilding the adjacency and event maps
+  index?: PrevalidatedIndex;
+  // envelope.hash; with trusted, maps are cached across mounts by this key
+  hash?: string;
+  // Skip the Zod parse and the index checks. The browser cannot verify the
+  // stamp, so set this only for envelopes fetched from your own server
+  trusted?: boolean;
 }
 
-export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema }) => {
-  const eventSystem = useEventSystem();
-  const adapter = ComponentFactory.getAdapter();
+type Handler = (e: React.SyntheticEvent) => void;
 
-  // Validate schema using Zod before rendering
-  const validationResult = UISchema.safeParse(schema);
-  if (!validationResult.success) {
-    console.error('Schema validation failed:', validationResult.error);
-    return (
-      <div className="p-4 border border-red-300 bg-red-50 rounded-md">
-        <h3 className="text-red-800 font-semibold mb-2">Schema Validation Error</h3>
-        <p className="text-red-700 mb-2">The provided schema is invalid and cannot be rendered.</p>
-        <details className="text-sm text-red-600">
-          <summary className="cursor-pointer font-medium">View validation errors</summary>
-          <pre className="mt-2 p-2 bg-red-100 rounded text-xs overflow-auto">
-            {JSON.stringify(validationResult.error.errors, null, 2)}
-          </pre>
-        </details>
-      </div>
-    );
-  }
+const EVENT_TYPES = new Set<string>(EventTypeSchema.options);
+
+interface RenderMaps {
+  nodeMap: Map<string, Node>;
+  edgeMap: Map<string, Edge[]>;
+  eventMap: Map<string, Event[]>;
+}
+
+type ParseError = Extract<ReturnType<typeof UISchema.safeParse>, { success: false }>['error'];
+type Prepared = { success: true; maps: RenderMaps } | { success: false; error: ParseError };
 
-  // Use the validated schema
-  const validatedSchema = validationResult.data;
+// Maps of trusted envelopes by content hash, oldest dropped first
+const MAX_CACHED_MAPS = 64;
+const trustedMaps = new Map<string, RenderMaps>();
 
-  // Create lookup maps for efficient access
-  const nodeMap = new Map(validatedSchema.nodes.map(node => [node.id, node]));
+const buildMaps = (schema: PromptiusGUISchema, index: PrevalidatedIndex | undefined): RenderMaps => {
+  const nodeMap = new Map(schema.nodes.map((node): [string, Node] => [node.id, node as Node]));
   const edgeMap = new Map<string, Edge[]>();
   const eventMap = new Map<string, Event[]>();
 
+  if (index) {
+    // Children arrive sorted by order; rebuild edges and events from positions
+    Object.entries(index.children).forEach(([src, dests]) => {
+      edgeMap.set(src, dests.map((dest, order) => ({ src, dest, order })));
+    });
+    // With a dispatch table, handlers are looked up in it instead (see below)
+    if (!index.dispatch) {
+      Object.entries(index.events).forEach(([nodeId, positions]) => {
+        const events: Event[] = [];
+        positions.forEach(position => {
+          const event = schema.events?.[position];
+          if (event?.nodeId === nodeId) events.push(event as Event);
+        });
+        eventMap.set(nodeId, events);
+      });
+    }
+    return { nodeMap, edgeMap, eventMap };
+  }
+
   // Build adjacency list from edges
-  validatedSchema.edges?.forEach(edge => {
+  schema.edges?.forEach(edge => {
     if (!edgeMap.has(edge.src)) {
       edgeMap.set(edge.src, []);
     }
     edgeMap.get(edge.src)!.push(edge);
   });
+  edgeMap.forEach(edges => edges.sort((a, b) => a.order - b.order));
 
   // Build event map by nodeId
-  validatedSchema.events?.forEach(event => {
+  schema.events?.forEach(event => {
     if (!eventMap.has(event.nodeId)) {
       eventMap.set(event.nodeId, []);
     }
-    eventMap.get(event.nodeId)!.push(event);
+    eventMap.get(event.nodeId)!.push(event as Event);
   });
+  return { nodeMap, edgeMap, eventMap };
+};
 
-  const handleEvent = (action: EventAction, originalEvent?: React.SyntheticEvent) => {
+const prepare = (
+  schema: PromptiusGUISchema,
+  index: PrevalidatedIndex | undefined,
+  hash: string | undefined,
+  trusted: boolean
+): Prepared => {
+  if (trusted) {
+    const cached = hash !== undefined ? trustedMaps.get(hash) : undefined;
+    if (cached) return { success: true, maps: cached };
+    const maps = buildMaps(schema, index);
+    if (hash !== undefined) {
+      if (trustedMaps.size >= MAX_CACHED_MAPS) {
+        trustedMaps.delete(trustedMaps.keys().next().value as string);
+      }
+      trustedMaps.set(hash, maps);
+    }
+    return { success: true, maps };
+  }
+  // Validate schema using Zod before rendering
+  const validationResult = UISchema.safeParse(schema);
+  if (!validationResult.success) {
+    return { success: false, error: validationResult.error };
+  }
+  return { success: true, maps: buildMaps(validationResult.data as PromptiusGUISchema, index) };
+};
+
+export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema, index, hash, trusted = false }) => {
+  const eventSystem = useEventSystem();
+  const adapter = ComponentFactory.getAdapter();
+
+  // Parsing and map building run again only when the input changes
+  const prepared = useMemo(
+    () => prepare(schema, index, hash, trusted),
+    [schema, index, hash, trusted]
+  );
+
+  // Handlers read the latest event system, so they can be built once
+  const eventSystemRef = useRef(eventSystem);
+  eventSystemRef.current = eventSystem;
+
+  const handleEvent = useCallback((action: EventAction, originalEvent?: React.SyntheticEvent) => {
     originalEvent?.preventDefault();
+    const eventSystem = eventSystemRef.current;
 
     switch (action.type) {
       case 'setState': {
@@ -87,7 +179,40 @@ export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema }) => {
         return;
       }
     }
-  };
+  }, []);
+
+  // One handler per action of the dispatch table, looked up by
+  // dispatch.nodes[nodeId][eventType] while rendering
+  const dispatch = index?.dispatch;
+  const dispatchHandlers = useMemo(
+    () =>
+      dispatch?.actions.map((action): Handler | undefined => {
+        if (!trusted && !EventSchema.shape.action.safeParse(action).success) {
+          console.warn('Dropping invalid dispatch action:', action);
+          return undefined;
+        }
+        return (e: React.SyntheticEvent) => handleEvent(action, e);
+      }),
+    [dispatch, trusted, handleEvent]
+  );
+
+  if (!prepared.success) {
+    console.error('Schema validation failed:', prepared.error);
+    return (
+      <div className="p-4 border border-red-300 bg-red-50 rounded-md">
+        <h3 className="text-red-800 font-semibold mb-2">Schema Validation Error</h3>
+        <p className="text-red-700 mb-2">The provided schema is invalid and cannot be rendered.</p>
+        <details className="text-sm text-red-600">
+          <summary className="cursor-pointer font-medium">View validation errors</summary>
+          <pre className="mt-2 p-2 bg-red-100 rounded text-xs overflow-auto">
+            {JSON.stringify(prepared.error.errors, null, 2)}
+          </pre>
+        </details>
+      </div>
+    );
+  }
+
+  const { nodeMap, edgeMap, eventMap } = prepared.maps;
 
   const renderNode = (nodeId: string): React.ReactNode => {
     const node = nodeMap.get(nodeId);
@@ -116,10 +241,9 @@ export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema }) => {
       processedProps = rawProps;
     }
 
-    // Get children nodes (sorted by order)
+    // Get children nodes (the maps hold them sorted by order)
     const childEdges = edgeMap.get(nodeId) || [];
     const sortedChildren = childEdges
-      .sort((a, b) => a.order - b.order)
       .map(edge => renderNode(edge.dest))
       .filter(Boolean);
 
@@ -129,12 +253,24 @@ export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema }) => {
     );
 
     // Apply events if any
-    const nodeEvents = eventMap.get(nodeId) || [];
-    if (nodeEvents.length > 0 && React.isValidElement(renderedComponent)) {
-      const eventProps: Record<string, any> = {};
-      nodeEvents.forEach(event => {
+    if (!React.isValidElement(renderedComponent)) {
+      return renderedComponent;
+    }
+    const eventProps: Record<string, Handler> = {};
+    const bindings = dispatch?.nodes[nodeId];
+    if (dispatchHandlers && bindings) {
+      Object.entries(bindings).forEach(([eventType, position]) => {
+        const handler = dispatchHandlers[position];
+        if (handler && (trusted || EVENT_TYPES.has(eventType))) {
+          eventProps[eventType] = handler;
+        }
+      });
+    } else {
+      (eventMap.get(nodeId) || []).forEach(event => {
         eventProps[event.eventType] = (e: React.SyntheticEvent) => handleEvent(event.action, e);
       });
+    }
+    if (Object.keys(eventProps).length > 0) {
       return React.cloneElement(renderedComponent, eventProps);
     }
 
@@ -142,12 +278,12 @@ export const GraphRenderer: React.FC<GraphRendererProps> = ({ schema }) => {
   };
 
   // Start rendering from the root node
-  const rootNode = nodeMap.get(validatedSchema.metadata.rootId);
+  const rootNode = nodeMap.get(schema.metadata.rootId);
   if (!rootNode) {
-    return <div>Root node with id "{validatedSchema.metadata.rootId}" not found</div>;
+    return <div>Root node with id "{schema.metadata.rootId}" not found</div>;
   }
 
-  return <>{renderNode(validatedSchema.metadata.rootId)}</>;
+  return <>{renderNode(schema.metadata.rootId)}</>;
 };
 
 // Legacy renderer for backward compatibility (if needed)
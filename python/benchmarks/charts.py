@@ -0,0 +1,68 @@
+"""
+Chart aggregation throughput over synthetic sales rows.
+
+Times ``aggregate`` (sum per month and model, the ``assets/tesla_sales.png``
+shape) on millions of rows, then a cached lookup of the same input. Uses
+NumPy when installed; pass ``--python`` to time the pure Python fallback.
+
+    python benchmarks/charts.py --rows 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from promptius_gui_schema import charts  # noqa: E402
+from promptius_gui_schema.charts import ChartCache, aggregate, chart_node  # noqa: E402
+
+MODELS = ["Model S", "Model 3", "Model X", "Model Y"]
+
+
+def sales(rows: int, seed: int) -> dict:
+    if charts.np is not None:
+        rng = charts.np.random.default_rng(seed)
+        return {
+            "month": rng.integers(1, 13, rows),
+            "model": rng.choice(charts.np.array(MODELS), rows),
+            "units": rng.random(rows) * 100,
+        }
+    import random
+
+    rng = random.Random(seed)
+    return {
+        "month": [rng.randint(1, 12) for _ in range(rows)],
+        "model": [rng.choice(MODELS) for _ in range(rows)],
+        "units": [rng.random() * 100 for _ in range(rows)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--python", action="store_true", help="disable NumPy")
+    args = parser.parse_args()
+    if args.python:
+        charts.np = None
+
+    table = sales(args.rows, args.seed)
+    print(f"{args.rows} rows, {'NumPy' if charts.np is not None else 'pure Python'}")
+    for agg in ("sum", "mean", "max"):
+        start = time.perf_counter()
+        result = aggregate(table, "month", "units", series="model", agg=agg)
+        print(f"{agg:<6} {(time.perf_counter() - start) * 1e3:8.1f} ms")
+    chart_node("sales", result, title="Units by month", chart_type="line")
+
+    cache = ChartCache()
+    cache.aggregate(table, "month", "units", series="model")
+    start = time.perf_counter()
+    cache.aggregate(table, "month", "units", series="model")
+    print(f"cached {(time.perf_counter() - start) * 1e3:8.1f} ms (fingerprint only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory per node and serialization speed: compact tuples vs Pydantic models.
+
+Builds ``--copies`` documents from every built-in template (distinct ids per
+copy, so only genuinely repeated strings are shared) and measures, with
+``tracemalloc``, the bytes held per node by the validated models and by their
+``compact`` form. Then times ``to_json`` against ``model_dump_json`` and
+``json.dumps(model_dump())`` over the same documents and checks that
+``to_json`` wrote the same bytes as ``model_dump_json`` for every one.
+
+    python benchmarks/compact.py --copies 3000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from promptius_gui_schema import PromptiusGuiSchema  # noqa: E402
+from promptius_gui_schema.compact import compact, to_json  # noqa: E402
+from promptius_gui_schema.templates import default_registry  # noqa: E402
+
+
+def corpus(copies: int) -> List[bytes]:
+    templates = list(default_registry())
+    return [
+        template.instantiate(id_prefix=f"d{i}").model_dump_json().encode("utf-8")
+        for i in range(copies)
+        for template in templates
+    ]
+
+
+def retained(build: Callable[[], List[Any]]) -> "tuple[List[Any], int]":
+    """Objects returned by ``build`` and the bytes they still hold."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return objects, size
+
+
+def timed(name: str, work: Callable[[Any], Any], items: List[Any], nodes: int) -> None:
+    work(items[0])
+    start = time.perf_counter()
+    for item in items:
+        work(item)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed / nodes * 1e6:8.2f} us/node")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--copies", type=int, default=3000, help="per template")
+    args = parser.parse_args()
+
+    documents = corpus(args.copies)
+    models, model_bytes = retained(
+        lambda: [PromptiusGuiSchema.model_validate_json(d) for d in documents]
+    )
+    compacts, compact_bytes = retained(lambda: [compact(m) for m in models])
+    nodes = sum(len(m.nodes) for m in models)
+    print(f"{len(models)} documents, {nodes} nodes\n")
+    print(f"{'pydantic models':<28} {model_bytes / nodes:8.0f} B/node")
+    print(f"{'compact':<28} {compact_bytes / nodes:8.0f} B/node\n")
+
+    timed("compact()", compact, models, nodes)
+    timed("to_json", to_json, compacts, nodes)
+    timed("model_dump_json", lambda m: m.model_dump_json(), models, nodes)
+    timed(
+        "json.dumps(model_dump)",
+        lambda m: json.dumps(m.model_dump(mode="json"), separators=(",", ":")),
+        models,
+        nodes,
+    )
+
+    differ = sum(to_json(c) != m.model_dump_json() for c, m in zip(compacts, models))
+    print(f"\nto_json differs from model_dump_json on {differ}/{len(models)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Live bytes per cached schema: plain validation vs ``StringPool`` interning.
+
+Validates ``--schemas`` template-generated documents (distinct ids per
+document, plus a share of ``--unique-labels`` with a label seen nowhere else)
+into an in-process list, the way a response cache holds them, and reports the
+bytes still allocated per schema (``tracemalloc``) and the validation time for
+each mode. The pooled modes also print the pool size, which stays under
+``--max-strings``.
+
+    python benchmarks/interning.py --schemas 50000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from pydantic_core import from_json  # noqa: E402
+
+from promptius_gui_schema import PromptiusGuiSchema  # noqa: E402
+from promptius_gui_schema.interning import (  # noqa: E402
+    DEFAULT_MAX_STRINGS,
+    StringPool,
+)
+from promptius_gui_schema.templates import default_registry  # noqa: E402
+
+
+def corpus(count: int, unique_labels: float, seed: int) -> List[bytes]:
+    rng = random.Random(seed)
+    templates = list(default_registry())
+    documents = []
+    for i in range(count):
+        document = rng.choice(templates).instantiate(id_prefix=f"d{i}").model_dump(
+            mode="json"
+        )
+        if rng.random() < unique_labels:
+            document["metadata"]["description"] = f"Generated for request {i}"
+        documents.append(json.dumps(document).encode("utf-8"))
+    return documents
+
+
+def measure(
+    name: str,
+    validator: Callable[[], Callable[[bytes], object]],
+    documents: List[bytes],
+) -> None:
+    """Time one pass, then count live bytes on a second with a fresh validator
+    (``tracemalloc`` would slow the timed pass several times over)."""
+    validate = validator()
+    start = time.perf_counter()
+    for document in documents:
+        validate(document)
+    elapsed = time.perf_counter() - start
+
+    validate = validator()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = [validate(d) for d in documents]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(
+        f"{name:<32} {size / len(cache):8.0f} B/schema "
+        f"{elapsed / len(cache) * 1e6:8.1f} us/schema"
+    )
+    pool = getattr(validate, "__self__", None)
+    if isinstance(pool, StringPool):
+        print(f"{'':<32} pool holds {len(pool)} strings")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--schemas", type=int, default=50000)
+    parser.add_argument("--unique-labels", type=float, default=0.5)
+    parser.add_argument("--max-strings", type=int, default=DEFAULT_MAX_STRINGS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = corpus(args.schemas, args.unique_labels, args.seed)
+    print(f"{len(documents)} schemas\n")
+    measure(
+        "model_validate_json",
+        lambda: PromptiusGuiSchema.model_validate_json,
+        documents,
+    )
+    measure(
+        "from_json(cache_strings=False)",
+        lambda: lambda d: PromptiusGuiSchema.model_validate(
+            from_json(d, cache_strings=False)
+        ),
+        documents,
+    )
+    for name, share in (("StringPool, strings only", False), ("StringPool", True)):
+        measure(
+            name,
+            lambda: StringPool(share, args.max_strings).validate_json,
+            documents,
+        )
+
+
+if __name__ == "__main__":
+    main()
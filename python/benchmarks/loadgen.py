@@ -0,0 +1,227 @@
+"""
+Asyncio load generator for ``/generate_ui``.
+
+Closed loop (``--users N``): N clients each send their next request as soon as
+the previous one returns. Open loop (``--rate R``): requests arrive as a
+Poisson process at R per second regardless of how fast the server answers,
+which exposes queueing and tail latency. Prompts come from a recording made
+with ``PROMPTIUS_RECORD`` so a server started with ``--replay`` on the same
+file answers every request offline. All requests come from one client, so
+start the server with ``--no-rate-limit`` or most of them are answered 429.
+``serve.py --replay`` also turns the response cache off, so every request
+pays the replayed latency; the report's first line says whether the server
+caches:
+
+    python serve.py --workers 4 --no-rate-limit --replay answers.jsonl \\
+        --replay-latency lognormal:median=1.5,sigma=0.4
+    python benchmarks/loadgen.py --recording answers.jsonl --rate 20 --duration 60
+
+Uses only the standard library; arrivals and prompt choice are seeded.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import urllib.request
+from collections import Counter
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PROMPTS = [
+    "Create a sales dashboard with revenue, users and churn",
+    "Build a signup form with name, email and password",
+    "Show a bar chart of monthly orders",
+    "Make a settings page with toggles for notifications",
+]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def post(self, path: str, body: bytes, headers: str = "") -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        request = (
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"{headers}\r\n"
+        ).encode("latin-1")
+        try:
+            self.writer.write(request + body)
+            await self.writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+
+    async def _read_response(self) -> int:
+        assert self.reader is not None
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+        if chunked:
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class LoadGenerator:
+    def __init__(self, args: argparse.Namespace, prompts: List[str]) -> None:
+        parts = urlsplit(args.url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.args = args
+        self.prompts = prompts
+        self.rng = random.Random(args.seed)
+        self.results: List[Tuple[int, float]] = []
+        self.pool: List[Connection] = []
+        self.headers = (
+            f"Authorization: Bearer {args.api_key}\r\n" if args.api_key else ""
+        )
+
+    def body(self) -> bytes:
+        prompt = self.rng.choice(self.prompts)
+        return json.dumps({"prompt": prompt, "use_templates": False}).encode("utf-8")
+
+    async def one(self, connection: Connection) -> None:
+        body = self.body()
+        start = time.perf_counter()
+        try:
+            status = await connection.post("/generate_ui", body, self.headers)
+        except (OSError, asyncio.IncompleteReadError):
+            status = 0
+        self.results.append((status, time.perf_counter() - start))
+
+    async def closed_loop(self, deadline: float) -> None:
+        async def user() -> None:
+            connection = Connection(self.host, self.port)
+            while time.perf_counter() < deadline:
+                await self.one(connection)
+            connection.close()
+
+        await asyncio.gather(*(user() for _ in range(self.args.users)))
+
+    async def open_loop(self, deadline: float) -> None:
+        async def send() -> None:
+            connection = self.pool.pop() if self.pool else Connection(self.host, self.port)
+            await self.one(connection)
+            self.pool.append(connection)
+
+        tasks = []
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send()))
+            next_at += self.rng.expovariate(self.args.rate)
+        await asyncio.gather(*tasks)
+        for connection in self.pool:
+            connection.close()
+
+    async def run(self) -> float:
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        if self.args.rate:
+            await self.open_loop(deadline)
+        else:
+            await self.closed_loop(deadline)
+        return time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def report(results: List[Tuple[int, float]], elapsed: float) -> None:
+    statuses = Counter(status for status, _ in results)
+    latencies = sorted(seconds for status, seconds in results if status == 200)
+    print(f"requests   {len(results)} in {elapsed:.1f}s")
+    print(f"throughput {statuses[200] / elapsed:.1f} ok/s")
+    print("status     " + ", ".join(f"{s or 'error'}: {n}" for s, n in sorted(statuses.items())))
+    if latencies:
+        print(
+            "latency ms "
+            f"p50 {statistics.median(latencies) * 1e3:.0f}  "
+            f"p90 {percentile(latencies, 0.90) * 1e3:.0f}  "
+            f"p99 {percentile(latencies, 0.99) * 1e3:.0f}  "
+            f"max {latencies[-1] * 1e3:.0f}"
+        )
+
+
+def cache_note(url: str) -> str:
+    """Whether the server answers repeated prompts from its response cache."""
+    try:
+        with urllib.request.urlopen(f"{url}/stats", timeout=5) as response:
+            stats = json.load(response)
+    except (OSError, ValueError):
+        return "unknown (GET /stats failed)"
+    if stats.get("cache") is None:
+        return "off, every request reaches the LLM"
+    return "on, repeated prompts are cache hits and skip the LLM latency"
+
+
+def load_prompts(path: Optional[str]) -> List[str]:
+    if path is None:
+        return DEFAULT_PROMPTS
+    prompts = []
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                prompts.append(json.loads(line)["prompt"])
+    return sorted(set(prompts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--recording", default=None, help="JSONL written by RecordingLLM")
+    parser.add_argument("--users", type=int, default=16, help="closed-loop clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop requests/s")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--api-key", default=None, help="sent as a Bearer token")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"cache      {cache_note(args.url.rstrip('/'))}")
+    generator = LoadGenerator(args, load_prompts(args.recording))
+    elapsed = asyncio.run(generator.run())
+    report(generator.results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Yes/no validation throughput: compiled checker vs Pydantic vs jsonschema.
+
+Builds a corpus of template-generated documents, a share of them broken in
+typical ways (out-of-range props, bad enums, unknown node types, missing
+fields), and times each validator over the same bytes. ``jsonschema`` is
+optional and skipped when it is not installed. The compiled checker follows
+JSON Schema, so it rejects values Pydantic's lax mode coerces (``"yes"`` for a
+boolean); those are the only expected disagreements.
+
+    python benchmarks/schemacheck.py --documents 5000 --invalid 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from pydantic import ValidationError  # noqa: E402
+
+from promptius_gui_schema import PromptiusGuiSchema  # noqa: E402
+from promptius_gui_schema.schemacheck import compile_schema  # noqa: E402
+from promptius_gui_schema.templates import default_registry  # noqa: E402
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(HERE)), "schema", "promptius-gui-schema.json"
+)
+
+
+def break_document(document: dict, rng: random.Random) -> None:
+    node = rng.choice(document["nodes"])
+    kind = rng.randrange(5)
+    if kind == 0:
+        document["metadata"]["version"] = "2"
+    elif kind == 1:
+        node["props"].pop(rng.choice(sorted(node["props"])))
+    elif kind == 2:
+        node["type"] = "slider"
+    elif kind == 3:
+        node["id"] = ""
+    else:
+        for key, value in node["props"].items():
+            if isinstance(value, bool):
+                node["props"][key] = "yes"
+                break
+        else:
+            document["edges"].append({"src": "a", "dest": "b", "order": -1})
+
+
+def corpus(count: int, invalid: float, seed: int) -> List[bytes]:
+    rng = random.Random(seed)
+    templates = list(default_registry())
+    documents = []
+    for i in range(count):
+        document = rng.choice(templates).instantiate(id_prefix=f"d{i}").model_dump(
+            mode="json"
+        )
+        if rng.random() < invalid:
+            break_document(document, rng)
+        documents.append(json.dumps(document).encode("utf-8"))
+    return documents
+
+
+def pydantic_valid(data: bytes) -> bool:
+    try:
+        PromptiusGuiSchema.model_validate_json(data)
+    except ValidationError:
+        return False
+    return True
+
+
+def timed(
+    name: str, check: Callable[[bytes], bool], documents: List[bytes]
+) -> List[bool]:
+    check(documents[0])
+    start = time.perf_counter()
+    results = [check(d) for d in documents]
+    elapsed = time.perf_counter() - start
+    per_doc = elapsed / len(documents) * 1e6
+    print(f"{name:<28} {per_doc:8.1f} us/doc  {len(documents) / elapsed:9.0f} docs/s")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--invalid", type=float, default=0.2, help="share broken")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = corpus(args.documents, args.invalid, args.seed)
+    parsed = [json.loads(d) for d in documents]
+    start = time.perf_counter()
+    compiled = compile_schema(SCHEMA_PATH)
+    print(f"compiled in {(time.perf_counter() - start) * 1e3:.1f} ms\n")
+
+    reference = timed("pydantic model_validate_json", pydantic_valid, documents)
+    results = timed("compiled validate_json", compiled.validate_json, documents)
+    by_index = dict(zip(map(id, documents), parsed))
+    timed("compiled (pre-parsed)", lambda d: compiled(by_index[id(d)]), documents)
+    try:
+        import jsonschema
+    except ImportError:
+        print("jsonschema                   not installed, skipped")
+    else:
+        with open(SCHEMA_PATH, encoding="utf-8") as fp:
+            validator = jsonschema.Draft202012Validator(json.load(fp))
+        timed(
+            "jsonschema (pre-parsed)",
+            lambda d: validator.is_valid(by_index[id(d)]),
+            documents,
+        )
+        timed(
+            "jsonschema + json.loads",
+            lambda d: validator.is_valid(json.loads(d)),
+            documents,
+        )
+
+    disagree = sum(a != b for a, b in zip(reference, results))
+    total = len(documents)
+    print(f"\nPydantic accepts {sum(reference)}/{total}, compiled {sum(results)}")
+    print(f"disagreements: {disagree} (Pydantic lax coercion, e.g. \"yes\" -> true)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Requests per second of ``serve.py`` versus worker count, using the fake LLM.
+
+Each run starts a fresh server with an empty shared cache and sends
+``--requests`` POSTs to ``/generate_ui`` from ``--concurrency`` client threads.
+Prompts are drawn from a pool of ``--distinct`` texts, so most requests after
+the first round are cache hits no matter which worker serves them.
+
+    python benchmarks/workers.py --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(HERE)
+
+
+def wait_healthy(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not become healthy")
+
+
+def post(url: str, prompt: str) -> float:
+    body = json.dumps({"prompt": prompt, "use_templates": False}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url}/generate_ui", data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run(workers: int, args: argparse.Namespace) -> None:
+    cache = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    # A fresh bucket file per run, so one run's spend never throttles the next
+    buckets = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "serve.py",
+            "--host", "127.0.0.1",
+            "--port", str(args.port),
+            "--workers", str(workers),
+            "--cache", cache,
+            "--rate-limit-db", buckets,
+            # Measure throughput, not the per-tenant rate limiter
+            "--no-rate-limit",
+            "--fake-llm", str(args.latency),
+        ],
+        cwd=SERVER_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_healthy(url)
+        rng = random.Random(0)
+        prompts = [
+            f"dashboard {rng.randrange(args.distinct)} with revenue and users"
+            for _ in range(args.requests)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            latencies: List[float] = list(pool.map(lambda p: post(url, p), prompts))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+        for path in (cache, buckets):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    latencies.sort()
+    print(
+        f"{workers:>7} {args.requests / elapsed:>9.1f} "
+        f"{statistics.median(latencies) * 1e3:>8.1f} "
+        f"{latencies[int(len(latencies) * 0.99) - 1] * 1e3:>8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
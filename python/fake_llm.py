@@ -0,0 +1,208 @@
+"""
+Stand-ins for the structured-output LLM, for benchmarks and offline runs.
+
+``FakeStructuredLLM`` answers with one of the built-in templates, picked
+deterministically from the prompt. ``RecordingLLM`` wraps the real client and
+appends every prompt and raw JSON answer to a JSONL file; ``ReplayLLM`` serves
+those answers back. Both fakes wait according to a ``LatencyModel`` seeded for
+reproducible runs, and ``ReplayLLM.stream`` yields the answer in chunks with
+time-to-first-token and inter-chunk delays.
+
+``server.py`` picks these up from the environment:
+
+* ``PROMPTIUS_FAKE_LLM=<latency spec>`` - template answers
+* ``PROMPTIUS_RECORD=<file>`` - record real answers
+* ``PROMPTIUS_REPLAY=<file>`` with ``PROMPTIUS_REPLAY_LATENCY=<latency spec>``
+
+A latency spec is a number of seconds or ``kind:param=value,...``, e.g.
+``lognormal:median=1.5,sigma=0.4`` (see ``LatencyModel.parse``).
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.cache import prompt_key
+from promptius_gui_schema.templates import default_registry
+
+
+def messages_key(messages: Sequence[Any]) -> str:
+    """Recording key covering every message, so a new system prompt re-records."""
+    return prompt_key("\n".join(str(m.content) for m in messages))
+
+
+class LatencyModel:
+    """Random delay in seconds, drawn from a seeded distribution.
+
+    ``kind`` is ``fixed`` (``seconds``), ``uniform`` (``low``, ``high``),
+    ``lognormal`` (``median``, ``sigma``) or ``exponential`` (``mean``). Samples
+    are clipped to ``max``.
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "exponential")
+
+    def __init__(self, kind: str = "fixed", seed: int = 0, **params: float) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        self.kind = kind
+        self.params = params
+        self.max = params.pop("max", math.inf)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, None], seed: int = 0) -> "LatencyModel":
+        """Build a model from ``"0.5"`` or ``"lognormal:median=1.5,sigma=0.4"``."""
+        if spec is None or spec == "":
+            return cls("fixed", seconds=0.0)
+        if isinstance(spec, (int, float)):
+            return cls("fixed", seconds=float(spec))
+        kind, _, rest = spec.partition(":")
+        if not rest:
+            try:
+                return cls("fixed", seconds=float(kind))
+            except ValueError:
+                pass
+        params = {}
+        for item in filter(None, rest.split(",")):
+            name, _, value = item.partition("=")
+            params[name.strip()] = float(value)
+        return cls(kind.strip(), seed=seed, **params)
+
+    def sample(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == "fixed":
+                value = p.get("seconds", 0.0)
+            elif self.kind == "uniform":
+                value = self._rng.uniform(p.get("low", 0.0), p.get("high", 1.0))
+            elif self.kind == "lognormal":
+                value = self._rng.lognormvariate(
+                    math.log(p.get("median", 1.0)), p.get("sigma", 0.5)
+                )
+            else:
+                value = self._rng.expovariate(1.0 / p.get("mean", 1.0))
+        return min(max(value, 0.0), self.max)
+
+    def sleep(self) -> float:
+        seconds = self.sample()
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+
+def _latency(value: Union[LatencyModel, str, float, None]) -> LatencyModel:
+    return value if isinstance(value, LatencyModel) else LatencyModel.parse(value)
+
+
+class FakeStructuredLLM:
+    def __init__(self, latency: Union[LatencyModel, str, float] = 0.5) -> None:
+        self.latency = _latency(latency)
+        self.templates = list(default_registry())
+        self.calls = 0
+
+    def invoke(self, messages: Sequence[Any]) -> PromptiusGuiSchema:
+        prompt = messages[-1].content
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+        template = self.templates[digest[0] % len(self.templates)]
+        self.calls += 1
+        self.latency.sleep()
+        return template.instantiate(template.fill(prompt), id_prefix=digest.hex())
+
+
+class RecordingLLM:
+    """Wraps a structured-output LLM and appends each exchange to ``path``.
+
+    Each JSONL line holds ``key``, ``prompt``, ``response`` (the raw schema
+    JSON) and ``seconds`` (the real call latency, for fitting a
+    ``LatencyModel``).
+    """
+
+    def __init__(self, inner: Any, path: str) -> None:
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def invoke(self, messages: Sequence[Any]) -> PromptiusGuiSchema:
+        start = time.perf_counter()
+        answer = self.inner.invoke(messages)
+        seconds = time.perf_counter() - start
+        record = {
+            "key": messages_key(messages),
+            "prompt": messages[-1].content,
+            "response": answer.model_dump_json(),
+            "seconds": round(seconds, 4),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(record) + "\n")
+        return answer
+
+
+class ReplayMiss(KeyError):
+    """No recording exists for the prompt."""
+
+
+class ReplayLLM:
+    """Serves recorded answers with simulated latency.
+
+    ``latency`` is the whole-call delay for ``invoke``; ``stream`` splits the
+    answer into ``chunk_size``-character chunks, waits ``first_chunk`` before
+    the first and ``chunk_interval`` between the rest. Prompts without a
+    recording raise ``ReplayMiss`` unless a ``fallback`` LLM is given.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        latency: Union[LatencyModel, str, float, None] = None,
+        first_chunk: Union[LatencyModel, str, float, None] = None,
+        chunk_interval: Union[LatencyModel, str, float, None] = None,
+        chunk_size: int = 16,
+        fallback: Optional[Any] = None,
+    ) -> None:
+        self.path = path
+        self.latency = _latency(latency)
+        self.first_chunk = _latency(first_chunk)
+        self.chunk_interval = _latency(chunk_interval)
+        self.chunk_size = chunk_size
+        self.fallback = fallback
+        self.responses: Dict[str, str] = {}
+        self.prompts = []
+        with open(path, encoding="utf-8") as fp:
+            for line in fp:
+                if line.strip():
+                    record = json.loads(line)
+                    if record["key"] not in self.responses:
+                        self.prompts.append(record["prompt"])
+                    self.responses[record["key"]] = record["response"]
+        self.hits = 0
+        self.misses = 0
+
+    def _raw(self, messages: Sequence[Any]) -> str:
+        raw = self.responses.get(messages_key(messages))
+        if raw is not None:
+            self.hits += 1
+            return raw
+        self.misses += 1
+        if self.fallback is None:
+            raise ReplayMiss(messages[-1].content)
+        return self.fallback.invoke(messages).model_dump_json()
+
+    def invoke(self, messages: Sequence[Any]) -> PromptiusGuiSchema:
+        raw = self._raw(messages)
+        self.latency.sleep()
+        return PromptiusGuiSchema.model_validate_json(raw)
+
+    def stream(self, messages: Sequence[Any]) -> Iterator[str]:
+        """Yield the raw answer JSON in chunks, paced like a streaming model."""
+        raw = self._raw(messages)
+        self.first_chunk.sleep()
+        for start in range(0, len(raw), self.chunk_size):
+            if start:
+                self.chunk_interval.sleep()
+            yield raw[start : start + self.chunk_size]
@@ -0,0 +1,98 @@
+"""
+Command line tools: ``python -m promptius_gui_schema <command>``.
+
+    validate PATH...          re-validate JSONL files or directories of schemas
+    migrate PATH... -o OUT    upgrade stored schemas to the current version
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from .bulk import DEFAULT_CHUNK_BYTES, DEFAULT_MAX_SAMPLES, validate_archive
+from .migrations import migrate_archive
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def _validate(args: argparse.Namespace) -> int:
+    report = validate_archive(
+        args.paths,
+        jobs=args.jobs,
+        chunk_bytes=args.chunk_mb << 20,
+        max_samples=args.samples,
+    )
+    if args.json:
+        print(json.dumps(report.to_json(), indent=2))
+    else:
+        print(report.format(top=args.top))
+    return 1 if report.invalid else 0
+
+
+def _migrate(args: argparse.Namespace) -> int:
+    report = migrate_archive(
+        args.paths,
+        args.output,
+        target=args.to,
+        jobs=args.jobs,
+        chunk_bytes=args.chunk_mb << 20,
+    )
+    print(
+        f"documents  {report.documents}  migrated {report.migrated}  "
+        f"failed {report.failed}"
+    )
+    for path, count in report.paths.most_common():
+        print(f"{count:>10}  {path}")
+    for location, message in report.errors:
+        print(f"{location}: {message}")
+    return 1 if report.failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m promptius_gui_schema")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser(
+        "validate", help="validate schema archives (JSONL files or directories)"
+    )
+    validate.add_argument("paths", nargs="+")
+    validate.add_argument(
+        "--jobs", "-j", type=int, default=None, help="worker processes (default: cores)"
+    )
+    validate.add_argument(
+        "--chunk-mb",
+        type=_positive_int,
+        default=DEFAULT_CHUNK_BYTES >> 20,
+        help="work unit size",
+    )
+    validate.add_argument("--top", type=int, default=30, help="histogram rows to show")
+    validate.add_argument("--samples", type=int, default=DEFAULT_MAX_SAMPLES)
+    validate.add_argument("--json", action="store_true", help="print a JSON report")
+    validate.set_defaults(run=_validate)
+
+    migrate = commands.add_parser(
+        "migrate", help="upgrade stored schemas into one JSONL file"
+    )
+    migrate.add_argument("paths", nargs="+")
+    migrate.add_argument("--output", "-o", required=True)
+    migrate.add_argument("--to", default=None, help="target version (default: current)")
+    migrate.add_argument("--jobs", "-j", type=int, default=None)
+    migrate.add_argument(
+        "--chunk-mb", type=_positive_int, default=DEFAULT_CHUNK_BYTES >> 20
+    )
+    migrate.set_defaults(run=_migrate)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
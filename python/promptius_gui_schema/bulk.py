@@ -0,0 +1,291 @@
+"""
+Bulk re-validation of schema archives.
+
+Archives are JSONL files (one schema per line) or directories of ``.json`` /
+``.jsonl`` files. Inputs are memory-mapped and cut into byte ranges at line
+boundaries (or groups of small files); each chunk is validated in a worker
+process, which maps the file itself, so only offsets and small summaries
+cross process boundaries. Every document gets Pydantic validation followed
+by ``graph.check_graph``; errors are counted per (node type, field, error)
+into one histogram.
+
+Run as ``python -m promptius_gui_schema validate PATH... [--jobs N]``.
+"""
+
+from __future__ import annotations
+
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import Field, ValidationError
+from typing_extensions import Annotated
+
+from . import Event, EventAction, Node, PromptiusGuiSchema
+from .compact import ACTION_TYPES, NODE_TYPES
+from .graph import check_graph
+
+DEFAULT_CHUNK_BYTES = 8 << 20
+DEFAULT_MAX_SAMPLES = 20
+
+# (node type or section, field path, error code)
+HistogramKey = Tuple[str, str, str]
+
+# A chunk is (path, start, stop) for a byte range of a JSONL file, or
+# (path, -1, -1) for a whole ``.json`` file; a task is a list of chunks.
+Chunk = Tuple[str, int, int]
+
+_INDEX = re.compile(r"\.\d+(?=\.|$)")
+
+
+# Same documents as PromptiusGuiSchema, but nodes and actions are dispatched
+# on ``type`` instead of being tried against every union member: about six
+# times faster, and errors name only the declared type's fields.
+class _DiscriminatedEvent(Event):
+    action: Annotated[EventAction, Field(discriminator="type")]
+
+
+class _DiscriminatedSchema(PromptiusGuiSchema):
+    nodes: List[Annotated[Node, Field(discriminator="type")]]
+    events: List[_DiscriminatedEvent]
+
+
+@dataclass
+class Report:
+    """Counts, error histogram and a few sample failures."""
+
+    documents: int = 0
+    valid: int = 0
+    histogram: Counter = field(default_factory=Counter)
+    samples: List[Tuple[str, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def invalid(self) -> int:
+        return self.documents - self.valid
+
+    def merge(self, other: "Report", max_samples: int = DEFAULT_MAX_SAMPLES) -> None:
+        self.documents += other.documents
+        self.valid += other.valid
+        self.histogram.update(other.histogram)
+        self.samples.extend(other.samples[: max_samples - len(self.samples)])
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "seconds": round(self.seconds, 3),
+            "errors": [
+                {"nodeType": where, "field": path, "error": code, "count": count}
+                for (where, path, code), count in self.histogram.most_common()
+            ],
+            "samples": [
+                {"location": location, "error": message}
+                for location, message in self.samples
+            ],
+        }
+
+    def format(self, top: int = 30) -> str:
+        rate = self.documents / self.seconds if self.seconds else 0.0
+        lines = [
+            f"documents  {self.documents}  valid {self.valid}  "
+            f"invalid {self.invalid}  ({self.seconds:.1f}s, {rate:.0f}/s)"
+        ]
+        if self.histogram:
+            rows = [("count", "node type", "field", "error")] + [
+                (str(count), where, path, code)
+                for (where, path, code), count in self.histogram.most_common(top)
+            ]
+            widths = [max(len(row[i]) for row in rows) for i in range(3)]
+            lines.append("")
+            for row in rows:
+                lines.append(
+                    "  ".join(
+                        [row[0].rjust(widths[0])]
+                        + [row[i].ljust(widths[i]) for i in (1, 2)]
+                        + [row[3]]
+                    )
+                )
+            if len(self.histogram) > top:
+                lines.append(f"... {len(self.histogram) - top} more")
+        if self.samples:
+            lines.append("")
+            lines.extend(f"{location}: {message}" for location, message in self.samples)
+        return "\n".join(lines)
+
+
+def _field_path(loc: Sequence[Any]) -> str:
+    return _INDEX.sub("[]", ".".join(str(part) for part in loc)) or "-"
+
+
+def _classify(error: Dict[str, Any]) -> HistogramKey:
+    """Histogram key for one error of ``_DiscriminatedSchema``, whose error
+    locations carry the node or action type after the item index."""
+    loc = error["loc"]
+    code = error["type"]
+    section = loc[0] if loc else ""
+    rest = loc[2:]
+    if section == "nodes":
+        if code == "union_tag_invalid" and len(loc) == 2:
+            return (str(error["ctx"]["tag"]), "type", code)
+        if rest and rest[0] in NODE_TYPES:
+            return (rest[0], _field_path(rest[1:]), code)
+        return ("node", _field_path(rest), code)
+    if section == "events":
+        if code == "union_tag_invalid" and len(loc) == 3:
+            return ("event", "action.type", code)
+        if len(rest) > 1 and rest[0] == "action" and rest[1] in ACTION_TYPES:
+            return (f"{rest[1]} action", _field_path(rest[:1] + rest[2:]), code)
+        return ("event", _field_path(rest), code)
+    if section == "metadata":
+        return ("metadata", _field_path(loc[1:]), code)
+    if section == "edges":
+        return ("edge", _field_path(rest), code)
+    return ("schema", _field_path(loc), code)
+
+
+def check_document(data: bytes) -> List[Tuple[HistogramKey, str]]:
+    """Errors for one JSON document as ``(histogram key, message)`` pairs."""
+    try:
+        schema = _DiscriminatedSchema.model_validate_json(data)
+    except ValidationError as exc:
+        return [
+            (
+                _classify(error),
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}",
+            )
+            for error in exc.errors(include_url=False)
+        ]
+    return [
+        ((issue.node_type, issue.field, issue.code), issue.message)
+        for issue in check_graph(schema)
+    ]
+
+
+def _lines(buffer: Any, start: int, stop: int) -> Iterator[Tuple[int, bytes]]:
+    pos = start
+    while pos < stop:
+        end = buffer.find(b"\n", pos, stop)
+        if end < 0:
+            end = stop
+        line = buffer[pos:end].strip()
+        if line:
+            yield pos, line
+        pos = end + 1
+
+
+def iter_documents(chunk: Chunk) -> Iterator[Tuple[str, bytes]]:
+    """``(location, document bytes)`` for each non-blank document in ``chunk``."""
+    path, start, stop = chunk
+    with open(path, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size == 0:
+            if start < 0:
+                yield path, b""
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if start < 0:
+                yield path, buffer[:]
+                return
+            for offset, line in _lines(buffer, start, stop):
+                yield f"{path}@{offset}", line
+
+
+def validate_chunks(
+    chunks: Iterable[Chunk], max_samples: int = DEFAULT_MAX_SAMPLES
+) -> Report:
+    """Validate the documents in ``chunks`` (runs inside a worker).
+
+    The histogram counts documents: an error key is counted once per
+    document however often it occurs there.
+    """
+    report = Report()
+    for chunk in chunks:
+        for location, data in iter_documents(chunk):
+            report.documents += 1
+            errors = check_document(data)
+            if not errors:
+                report.valid += 1
+                continue
+            report.histogram.update({key for key, _ in errors})
+            if len(report.samples) < max_samples:
+                report.samples.append((location, errors[0][1]))
+    return report
+
+
+def _files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                if name.endswith((".json", ".jsonl")):
+                    yield os.path.join(directory, name)
+
+
+def plan_tasks(
+    paths: Iterable[str], chunk_bytes: int = DEFAULT_CHUNK_BYTES
+) -> Iterator[List[Chunk]]:
+    """Cut the inputs into tasks of roughly ``chunk_bytes`` each.
+
+    JSONL files are split at the first newline after every ``chunk_bytes``
+    boundary; ``.json`` files (one document each) are batched until their
+    sizes add up to ``chunk_bytes``.
+    """
+    if chunk_bytes <= 0:
+        raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}")
+    batch: List[Chunk] = []
+    batch_bytes = 0
+    for path in _files(paths):
+        size = os.path.getsize(path)
+        if not path.endswith(".jsonl"):
+            batch.append((path, -1, -1))
+            batch_bytes += size
+            if batch_bytes >= chunk_bytes:
+                yield batch
+                batch, batch_bytes = [], 0
+            continue
+        if size == 0:
+            continue
+        with open(path, "rb") as fp, mmap.mmap(
+            fp.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            start = 0
+            while start < size:
+                stop = buffer.find(b"\n", min(start + chunk_bytes, size) - 1)
+                stop = size if stop < 0 else stop + 1
+                yield [(path, start, stop)]
+                start = stop
+    if batch:
+        yield batch
+
+
+def validate_archive(
+    paths: Sequence[str],
+    jobs: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> Report:
+    """Validate every document under ``paths`` on ``jobs`` processes
+    (default: all cores; ``1`` validates in this process)."""
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    report = Report()
+    tasks = plan_tasks(paths, chunk_bytes)
+    if jobs == 1:
+        for task in tasks:
+            report.merge(validate_chunks(task, max_samples), max_samples)
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            for part in pool.imap_unordered(validate_chunks, tasks):
+                report.merge(part, max_samples)
+    report.seconds = time.perf_counter() - start
+    return report
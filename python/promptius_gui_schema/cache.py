@@ -0,0 +1,120 @@
+"""
+Response cache shared between server processes.
+
+Each worker process keeps its own connection to one SQLite file in WAL mode, so
+readers never block the writer and an answer generated by any worker is a hit
+for all of them. Running N workers therefore does not divide the hit rate by N
+the way per-process dictionaries would.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+"""
+
+# Eviction runs every this many writes rather than on each one.
+_EVICT_EVERY = 64
+
+
+def prompt_key(prompt: str, *parts: str) -> str:
+    """Cache key for ``prompt``, ignoring case and runs of whitespace.
+
+    ``parts`` (model name, options) are folded into the key so answers from
+    different configurations never collide.
+    """
+    normalised = " ".join(prompt.lower().split())
+    h = hashlib.blake2b(digest_size=16)
+    for part in (normalised,) + parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters for this process; ``entries`` is shared by all processes."""
+
+    entries: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache, oldest entries evicted past ``max_entries``.
+
+    Safe to share one file between processes; within a process calls are
+    serialised by a lock.
+    """
+
+    def __init__(self, path: str = ":memory:", max_entries: int = 10_000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA_SQL)
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return bytes(row[0])
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, body, time.time()),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY created DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> CacheStats:
+        return CacheStats(entries=len(self), hits=self.hits, misses=self.misses)
@@ -0,0 +1,341 @@
+"""
+Canonical form and stable hashing for PromptiusGuiSchema.
+
+Two schemas that differ only in node, edge or event list order, in ``order``
+numbering, or (optionally) in the ids the LLM picked are considered equal.
+Positions come from the tree: children are ordered by ``order`` with ties
+broken by subtree hash, and unreachable subtrees are ordered by hash, so the
+canonical order never depends on list order in the input. A subtree hash
+covers the events and dangling edges of its nodes, so siblings that tie on
+it are interchangeable.
+
+Hashes are computed by streaming a compact token encoding of each model's
+fields into blake2b; no intermediate ``model_dump`` dicts are built.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from . import Edge, Event, PromptiusGuiSchema
+from .graph import GraphIndex
+
+DIGEST_SIZE = 16
+
+_field_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def _token(value: Any, out: List[str]) -> None:
+    """Append a self-delimiting encoding of ``value`` to ``out``."""
+    kind = type(value)
+    if kind is str:
+        out.append(f"s{len(value)}:{value}")
+    elif kind is bool:
+        out.append("T" if value else "F")
+    elif kind is int:
+        out.append(f"i{value};")
+    elif kind is float:
+        # Normalise -0.0 to 0.0 so equal values always encode the same.
+        out.append(f"f{repr(value) if value else '0.0'};")
+    elif isinstance(value, Enum):
+        _token(value.value, out)
+    elif isinstance(value, BaseModel):
+        names = _field_names.get(kind)
+        if names is None:
+            names = _field_names[kind] = tuple(kind.model_fields)
+        out.append("{")
+        fields = value.__dict__
+        for name in names:
+            _token(fields[name], out)
+        out.append("}")
+    elif isinstance(value, (list, tuple)):
+        out.append("[")
+        for item in value:
+            _token(item, out)
+        out.append("]")
+    elif value is None:
+        out.append("N")
+    elif isinstance(value, str):
+        _token(str(value), out)
+    else:
+        raise TypeError(f"Cannot hash value of type {kind.__name__}")
+
+
+def encode(value: Any) -> bytes:
+    """Canonical byte encoding of a model or JSON-compatible value."""
+    out: List[str] = []
+    _token(value, out)
+    return "".join(out).encode("utf-8")
+
+
+class Canonical:
+    """Tree positions and Merkle hashes for one schema.
+
+    ``subtree`` maps node id to a digest covering the node's type, props,
+    sorted events, dangling edges and ordered children (and its id when
+    ``include_ids`` is true). ``positions``
+    lists node ids in canonical order: the root's tree in pre-order, then
+    unreachable trees ordered by hash. ``children`` holds the canonical child
+    edges per node; edges left out (dangling or closing a cycle) are in
+    ``loose_edges``. Cyclic graphs are canonical only up to DFS order.
+    """
+
+    def __init__(self, schema: PromptiusGuiSchema, include_ids: bool = False) -> None:
+        self.schema = schema
+        self.include_ids = include_ids
+        index = GraphIndex(schema)
+        self.index = index
+        nodes = index.nodes
+
+        subtree: Dict[str, bytes] = {}
+        children: Dict[str, List[Edge]] = {}
+        loose_edges: List[Edge] = [e for e in schema.edges if e.src not in nodes]
+        on_stack = set()
+
+        # Per-node event and dangling-edge encodings, sorted, so that the
+        # subtree hashes used to break sibling ties see everything attached.
+        attached: Dict[str, List[bytes]] = {}
+        for event in schema.events:
+            if event.nodeId in nodes:
+                attached.setdefault(event.nodeId, []).append(
+                    encode([event.eventType, event.action])
+                )
+        for edge in schema.edges:
+            if edge.src in nodes and edge.dest not in nodes:
+                attached.setdefault(edge.src, []).append(
+                    encode([edge.dest, edge.order])
+                )
+        for encodings in attached.values():
+            encodings.sort()
+
+        for start in [index.root_id] + [n.id for n in schema.nodes]:
+            if start in subtree or start not in nodes:
+                continue
+            stack: List[Tuple[str, bool]] = [(start, False)]
+            while stack:
+                node_id, expanded = stack.pop()
+                if expanded:
+                    on_stack.discard(node_id)
+                    kept = children[node_id]
+                    kept.sort(key=lambda e: (e.order, subtree[e.dest]))
+                    out: List[str] = []
+                    if include_ids:
+                        _token(node_id, out)
+                    node = nodes[node_id]
+                    _token(node.type, out)
+                    _token(node.props, out)
+                    digest = hashlib.blake2b(
+                        "".join(out).encode("utf-8"), digest_size=DIGEST_SIZE
+                    )
+                    for encoding in attached.get(node_id, ()):
+                        digest.update(encoding)
+                    digest.update(b"|")
+                    for edge in kept:
+                        digest.update(subtree[edge.dest])
+                    subtree[node_id] = digest.digest()
+                    continue
+                if node_id in subtree:
+                    continue
+                on_stack.add(node_id)
+                stack.append((node_id, True))
+                kept = []
+                for edge in index.child_edges.get(node_id, ()):
+                    if edge.dest not in nodes or edge.dest in on_stack:
+                        loose_edges.append(edge)
+                        continue
+                    kept.append(edge)
+                    if edge.dest not in subtree:
+                        stack.append((edge.dest, False))
+                children[node_id] = kept
+
+        # Canonical positions: root tree first, then the remaining trees by hash.
+        # Nodes with a parent come last, so they head a tree only on a cycle.
+        reachable = {node.id for node, _ in index.walk()}
+        has_parent = {e.dest for kept in children.values() for e in kept}
+        heads = [index.root_id] if index.root_id in nodes else []
+        heads += sorted(
+            (n.id for n in schema.nodes if n.id not in reachable),
+            key=lambda node_id: (node_id in has_parent, subtree[node_id]),
+        )
+        positions: List[str] = []
+        seen = set()
+        for head in heads:
+            if head in seen:
+                continue
+            stack_ids = [head]
+            seen.add(head)
+            while stack_ids:
+                node_id = stack_ids.pop()
+                positions.append(node_id)
+                for edge in reversed(children[node_id]):
+                    if edge.dest not in seen:
+                        seen.add(edge.dest)
+                        stack_ids.append(edge.dest)
+
+        self.subtree = subtree
+        self.children = children
+        self.positions = positions
+        self.position = {node_id: i for i, node_id in enumerate(positions)}
+        self.heads = [h for h in heads if h in self.position]
+        self.loose_edges = loose_edges
+
+    def label(self, node_id: str, relabel_ids: bool) -> str:
+        """Canonical id for ``node_id`` (``n<position>`` when relabelling)."""
+        if relabel_ids and node_id in self.position:
+            return f"n{self.position[node_id]}"
+        return node_id
+
+    def _ref(self, node_id: str) -> Any:
+        # Position for known nodes when ids do not matter, else the raw id.
+        if not self.include_ids and node_id in self.position:
+            return self.position[node_id]
+        return node_id
+
+    def sorted_loose_edges(self) -> List[Edge]:
+        return sorted(
+            self.loose_edges,
+            key=lambda e: (encode(self._ref(e.src)), encode(self._ref(e.dest)), e.order),
+        )
+
+    def sorted_events(self) -> List[Event]:
+        def key(event: Event) -> Tuple[bytes, str, bytes]:
+            return (
+                encode(self._ref(event.nodeId)),
+                event.eventType.value,
+                encode(event.action),
+            )
+
+        return sorted(self.schema.events, key=key)
+
+    def digest(self) -> str:
+        """Hex blake2b digest identifying the schema."""
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        metadata = self.schema.metadata
+        out: List[str] = []
+        for value in (
+            metadata.title,
+            metadata.description,
+            metadata.version,
+            metadata.framework,
+        ):
+            _token(value, out)
+        if self.include_ids:
+            _token(metadata.rootId, out)
+        h.update("".join(out).encode("utf-8"))
+        for head in self.heads:
+            h.update(self.subtree[head])
+        h.update(b"|")
+        for edge in self.sorted_loose_edges():
+            h.update(encode([self._ref(edge.src), self._ref(edge.dest), edge.order]))
+        h.update(b"|")
+        for event in self.sorted_events():
+            h.update(encode(self._ref(event.nodeId)))
+            h.update(encode(event.eventType))
+            h.update(encode(event.action))
+        return h.hexdigest()
+
+
+def schema_hash(schema: PromptiusGuiSchema, relabel_ids: bool = True) -> str:
+    """Stable content hash of ``schema``.
+
+    With ``relabel_ids`` (the default) node ids do not contribute, so schemas
+    that differ only in LLM-chosen ids share a hash.
+    """
+    return Canonical(schema, include_ids=not relabel_ids).digest()
+
+
+def subtree_hashes(
+    schema: PromptiusGuiSchema, include_ids: bool = False
+) -> Dict[str, str]:
+    """Map each node id to the hex Merkle hash of the subtree it heads."""
+    return {
+        node_id: digest.hex()
+        for node_id, digest in Canonical(schema, include_ids).subtree.items()
+    }
+
+
+def render_keys(form: Canonical) -> Dict[str, bytes]:
+    """Cache key per node for what renders from it (HTML, layout).
+
+    ``form.subtree`` orders siblings with equal ``order`` by hash, but they
+    render in ``GraphIndex`` order (as in React), so a subtree whose tied
+    siblings sit in another order renders differently under the same hash.
+    The key is the Merkle hash where both orders agree all the way down, and
+    otherwise a digest of that hash and the children's keys in render order.
+    """
+    subtree, order = form.subtree, form.index.child_edges
+    keys: Dict[str, bytes] = {}
+    for start in form.positions:
+        stack: List[Tuple[str, bool]] = [(start, False)]
+        while stack:
+            node_id, expanded = stack.pop()
+            if node_id in keys:
+                continue
+            kept = form.children.get(node_id, [])
+            if not expanded:
+                stack.append((node_id, True))
+                stack.extend((edge.dest, False) for edge in kept)
+                continue
+            kept_ids = {id(edge) for edge in kept}
+            rendered = [e for e in order.get(node_id, ()) if id(e) in kept_ids]
+            if rendered == kept and all(
+                keys[edge.dest] == subtree[edge.dest] for edge in kept
+            ):
+                keys[node_id] = subtree[node_id]
+                continue
+            digest = hashlib.blake2b(subtree[node_id], digest_size=DIGEST_SIZE)
+            for edge in rendered:
+                digest.update(keys[edge.dest])
+            keys[node_id] = digest.digest()
+    return keys
+
+
+def canonicalize(
+    schema: PromptiusGuiSchema,
+    relabel_ids: bool = False,
+    canonical: Optional[Canonical] = None,
+) -> PromptiusGuiSchema:
+    """Return ``schema`` with nodes, edges and events in canonical order.
+
+    Sibling ``order`` values are renumbered from 0. With ``relabel_ids`` node
+    ids become ``n0, n1, ...`` by canonical position (``n0`` is the root).
+    """
+    form = canonical or Canonical(schema, include_ids=not relabel_ids)
+    nodes = form.index.nodes
+
+    def label(node_id: str) -> str:
+        return form.label(node_id, relabel_ids)
+
+    # Models are immutable in practice, so unchanged ones are shared.
+    new_nodes = []
+    for node_id in form.positions:
+        node = nodes[node_id]
+        new_id = label(node_id)
+        if new_id != node_id:
+            node = type(node).model_construct(id=new_id, type=node.type, props=node.props)
+        new_nodes.append(node)
+    new_edges = []
+    for node_id in form.positions:
+        for i, edge in enumerate(form.children[node_id]):
+            src, dest = label(node_id), label(edge.dest)
+            if (src, dest, i) != (edge.src, edge.dest, edge.order):
+                edge = Edge.model_construct(src=src, dest=dest, order=i)
+            new_edges.append(edge)
+    new_edges += [
+        Edge.model_construct(src=label(e.src), dest=label(e.dest), order=e.order)
+        for e in form.sorted_loose_edges()
+    ]
+    new_events = [
+        event.model_copy(update={"nodeId": label(event.nodeId)})
+        for event in form.sorted_events()
+    ]
+    metadata = schema.metadata.model_copy(
+        update={"rootId": label(schema.metadata.rootId)}
+    )
+    return PromptiusGuiSchema.model_construct(
+        metadata=metadata, nodes=new_nodes, edges=new_edges, events=new_events
+    )
@@ -0,0 +1,621 @@
+"""
+Chart nodes from tabular data.
+
+``aggregate`` groups raw rows (a mapping of column name to values, e.g. from
+``read_table``) by a label column and optionally a series column, reduces a
+measure column with ``sum``, ``mean``, ``count``, ``min`` or ``max`` and
+returns category labels plus one ``ChartSeries`` per series value (a pivot;
+cells without rows are 0). ``chart_node`` turns the result into a complete
+``ChartNode`` with x ticks and a rounded y range from ``nice_range``.
+
+With NumPy installed (``pip install promptius-gui-schema[charts]``) the group
+keys are factorized once (bucketed when they are integers or short strings,
+``np.unique`` otherwise) and every reduction is a single
+``bincount`` or ``ufunc.at`` over flat cell indices, so millions of rows take
+a fraction of a second. Without it the same results come from a pure Python
+loop. ``ChartCache`` memoizes aggregates by a fingerprint of the input
+columns and parameters.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import (
+    AxisXProps,
+    AxisYProps,
+    ChartAnnotation,
+    ChartNode,
+    ChartProps,
+    ChartSeries,
+    ChartType,
+    LegendPosition,
+    PromptiusGuiSchema,
+)
+from .graph import GraphIssue
+
+try:
+    import numpy as np
+except ImportError:  # pure Python fallback
+    np = None
+
+# Column name -> values (lists, tuples or NumPy arrays of equal length).
+Table = Mapping[str, Sequence[Any]]
+
+AGGREGATES = ("sum", "mean", "count", "min", "max")
+# Rows whose distinct values are looked up before sorting a whole column.
+_SAMPLE_ROWS = 1 << 16
+# Label order: sorted, order of first appearance, or largest total first.
+ORDERS = ("label", "first", "total")
+
+# Tailwind 600 shades, assigned to series in order.
+DEFAULT_COLORS = [
+    "#2563eb",
+    "#dc2626",
+    "#16a34a",
+    "#d97706",
+    "#9333ea",
+    "#0891b2",
+    "#db2777",
+    "#4b5563",
+]
+
+
+class Aggregate(NamedTuple):
+    labels: List[str]
+    series: List[ChartSeries]
+    low: float  # smallest cell value
+    high: float  # largest cell value
+
+
+def read_table(path: str) -> Dict[str, Sequence[Any]]:
+    """Columns of a CSV file (as strings) or a Parquet file (needs pyarrow)."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow") from None
+        table = pq.read_table(path)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    with open(path, newline="", encoding="utf-8") as fp:
+        reader = csv.reader(fp)
+        header = next(reader, [])
+        columns: List[List[str]] = [[] for _ in header]
+        for row in reader:
+            for column, value in zip(columns, row):
+                column.append(value)
+    return dict(zip(header, columns))
+
+
+def _nice(x: float, round_: bool) -> float:
+    exponent = math.floor(math.log10(x))
+    fraction = x / 10**exponent
+    limits = (1.5, 3, 7) if round_ else (1, 2, 5)
+    for nice, limit in zip((1, 2, 5), limits):
+        if fraction < limit or (not round_ and fraction == limit):
+            return nice * 10**exponent
+    return 10 * 10**exponent
+
+
+def nice_range(
+    low: float, high: float, max_ticks: int = 5
+) -> Tuple[float, float, float]:
+    """``(min, max, step)`` covering ``[low, high]`` in round steps (1, 2 or 5
+    times a power of ten) with at most about ``max_ticks`` ticks."""
+    if not (math.isfinite(low) and math.isfinite(high)):
+        raise ValueError(f"Axis bounds must be finite, got {low}, {high}")
+    if high < low:
+        low, high = high, low
+    if high == low:
+        pad = abs(low) * 0.1 or 1.0
+        low, high = low - pad, high + pad
+    span = _nice(high - low, False)
+    step = _nice(span / max(max_ticks - 1, 1), True)
+    digits = max(0, -math.floor(math.log10(step)))
+    return (
+        round(math.floor(low / step) * step, digits),
+        round(math.ceil(high / step) * step, digits),
+        step,
+    )
+
+
+def _check_args(table: Table, columns: Sequence[str], agg: str, order: str) -> None:
+    if agg not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{agg}', expected one of {AGGREGATES}")
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order '{order}', expected one of {ORDERS}")
+    missing = [name for name in columns if name not in table]
+    if missing:
+        raise KeyError(f"Missing columns {missing}")
+    lengths = {len(table[name]) for name in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths {sorted(lengths)}")
+
+
+def _int_keys(values: Any) -> Any:
+    """Integer stand-ins for integer, bool and short string columns (one
+    integer per distinct value), or ``None``."""
+    kind, size = values.dtype.kind, values.dtype.itemsize
+    if kind in "biu":
+        return values.astype(np.int64, copy=False)
+    if kind in "SU" and size in (1, 2, 4) and values.flags.c_contiguous:
+        return values.view(f"<u{size}").astype(np.int64)
+    return None
+
+
+def _factorize(values: Any, order: str) -> Tuple[List[str], Any]:
+    """Distinct values as labels and each row's label index.
+
+    Columns with a compact integer key range are counted into buckets in
+    linear time. Other columns are looked up in the distinct values of a
+    sample with a binary search, falling back to a full ``np.unique`` sort
+    only when the sample missed some values.
+    """
+    values = values.reshape(-1)
+    if not len(values):
+        return [], np.zeros(0, dtype=np.int64)
+    keys = _int_keys(values)
+    low = int(keys.min()) if keys is not None else 0
+    span = int(keys.max()) - low + 1 if keys is not None else 0
+    if keys is not None and span <= max(len(values), 1 << 16):
+        offsets = keys - low
+        slots = np.flatnonzero(np.bincount(offsets, minlength=span))
+        lookup = np.zeros(span, dtype=np.int64)
+        lookup[slots] = np.arange(len(slots))
+        codes = lookup[offsets]
+        uniques = None  # representatives are taken from each bucket's first row
+    else:
+        uniques = np.unique(values[:_SAMPLE_ROWS])
+        codes = np.minimum(np.searchsorted(uniques, values), len(uniques) - 1)
+        if not (uniques[codes] == values).all():
+            uniques, codes = np.unique(values, return_inverse=True)
+            codes = codes.reshape(-1)
+    first = np.full(int(codes.max()) + 1, len(values), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(values)))
+    if uniques is None:
+        uniques = values[first]
+    rank = np.argsort(first if order == "first" else uniques, kind="stable")
+    remap = np.empty_like(rank)
+    remap[rank] = np.arange(len(rank))
+    return [str(value) for value in uniques[rank].tolist()], remap[codes]
+
+
+def _aggregate_numpy(
+    groups: Any, series: Any, measure: Any, agg: str, order: str
+) -> Tuple[List[str], List[str], Any]:
+    groups = np.asarray(groups)
+    values = None
+    if agg != "count":
+        values = np.asarray(measure, dtype=np.float64)
+        keep = np.isfinite(values)
+        if not keep.all():
+            groups, values = groups[keep], values[keep]
+            series = None if series is None else np.asarray(series)[keep]
+    labels, group_codes = _factorize(groups, order)
+    if series is None:
+        names, flat = [""], group_codes
+    else:
+        names, series_codes = _factorize(np.asarray(series), "label")
+        flat = group_codes * len(names) + series_codes
+    size = len(labels) * len(names)
+    if agg == "count":
+        cells = np.bincount(flat, minlength=size).astype(np.float64)
+    elif agg in ("sum", "mean"):
+        cells = np.bincount(flat, weights=values, minlength=size)
+        if agg == "mean":
+            counts = np.bincount(flat, minlength=size)
+            cells = np.divide(cells, counts, out=np.zeros(size), where=counts > 0)
+    else:
+        reduce = np.minimum if agg == "min" else np.maximum
+        cells = np.full(size, np.inf if agg == "min" else -np.inf)
+        reduce.at(cells, flat, values)
+        cells[~np.isfinite(cells)] = 0.0
+    cells = cells.reshape(len(labels), len(names))
+    if order == "total" and len(labels):
+        rank = np.argsort(-cells.sum(axis=1), kind="stable")
+        labels = [labels[i] for i in rank.tolist()]
+        cells = cells[rank]
+    return labels, names, cells.T.tolist()
+
+
+def _aggregate_python(
+    groups: Sequence[Any], series: Optional[Sequence[Any]], measure: Sequence[Any],
+    agg: str, order: str,
+) -> Tuple[List[str], List[str], List[List[float]]]:
+    cells: Dict[Tuple[Any, Any], List[float]] = {}  # [count, accumulator]
+    label_set: Dict[Any, None] = {}
+    name_set: Dict[Any, None] = {}
+    columns = [groups, groups if series is None else series]
+    if agg != "count":
+        columns.append(measure)
+    for row in zip(*columns):
+        value = 0.0
+        if agg != "count":
+            value = float(row[2])
+            if not math.isfinite(value):
+                continue
+        label = row[0]
+        name = "" if series is None else row[1]
+        label_set[label] = None
+        name_set[name] = None
+        cell = cells.get((label, name))
+        if cell is None:
+            cells[(label, name)] = [1, value]
+        elif agg == "min":
+            cell[0] += 1
+            cell[1] = min(cell[1], value)
+        elif agg == "max":
+            cell[0] += 1
+            cell[1] = max(cell[1], value)
+        else:
+            cell[0] += 1
+            cell[1] += value
+
+    def result(cell: Optional[List[float]]) -> float:
+        if cell is None:
+            return 0.0
+        if agg == "count":
+            return float(cell[0])
+        return cell[1] / cell[0] if agg == "mean" else cell[1]
+
+    keys = list(label_set) if order == "first" else _sorted_keys(label_set)
+    name_keys = _sorted_keys(name_set) if series is not None else [""]
+    data = [[result(cells.get((key, name))) for key in keys] for name in name_keys]
+    if order == "total" and keys:
+        totals = [sum(column) for column in zip(*data)]
+        rank = sorted(range(len(keys)), key=lambda i: -totals[i])
+        keys = [keys[i] for i in rank]
+        data = [[row[i] for i in rank] for row in data]
+    return [str(key) for key in keys], [str(name) for name in name_keys], data
+
+
+def _sorted_keys(keys: Iterable[Any]) -> List[Any]:
+    """Distinct column values in value order (numbers numerically), like the
+    NumPy path; mixed types sort as strings, as NumPy coerces them."""
+    try:
+        return sorted(keys)
+    except TypeError:
+        return sorted(keys, key=str)
+
+
+def aggregate(
+    table: Table,
+    group_by: str,
+    measure: Optional[str] = None,
+    series: Optional[str] = None,
+    agg: str = "sum",
+    order: str = "label",
+) -> Aggregate:
+    """Pivot ``table`` into chart labels (``group_by`` values) and one series
+    per ``series`` value (or a single series named after ``measure``).
+
+    ``measure`` may be omitted for ``agg="count"``; rows whose measure is not
+    a finite number are skipped.
+    """
+    if measure is None and agg != "count":
+        raise ValueError(f"'{agg}' needs a measure column")
+    columns = [name for name in (group_by, series, measure) if name is not None]
+    _check_args(table, columns, agg, order)
+    groups = table[group_by]
+    kinds = table[series] if series is not None else None
+    values = table[measure] if measure is not None else groups
+    if np is not None:
+        labels, names, data = _aggregate_numpy(groups, kinds, values, agg, order)
+    else:
+        labels, names, data = _aggregate_python(groups, kinds, values, agg, order)
+    if not labels:
+        raise ValueError("No rows with a numeric measure to chart")
+    if series is None:
+        names = [measure or "count"]
+    flat = [value for row in data for value in row]
+    return Aggregate(
+        labels=labels,
+        series=[ChartSeries(name=name, data=row) for name, row in zip(names, data)],
+        low=min(flat, default=0.0),
+        high=max(flat, default=0.0),
+    )
+
+
+def table_fingerprint(table: Table, columns: Sequence[str]) -> str:
+    """Hash of the named columns' contents, for caching derived results."""
+    digest = hashlib.sha256()
+    for name in columns:
+        column = table[name]
+        digest.update(name.encode("utf-8") + b"\0")
+        if isinstance(column, getattr(np, "ndarray", ())) and column.dtype.kind != "O":
+            digest.update(column.dtype.str.encode("ascii"))
+            digest.update(np.ascontiguousarray(column).data)
+        else:
+            digest.update("\x1f".join(map(str, column)).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """Thread-safe LRU of ``aggregate`` results keyed by input fingerprint.
+
+    The key covers the contents of the columns used and every parameter, so
+    re-rendering a dashboard over unchanged data skips the aggregation.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[Any, ...], Aggregate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def aggregate(
+        self,
+        table: Table,
+        group_by: str,
+        measure: Optional[str] = None,
+        series: Optional[str] = None,
+        agg: str = "sum",
+        order: str = "label",
+    ) -> Aggregate:
+        columns = [name for name in (group_by, series, measure) if name is not None]
+        _check_args(table, columns, agg, order)
+        key = (table_fingerprint(table, columns), group_by, measure, series, agg, order)
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = aggregate(table, group_by, measure, series, agg, order)
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _y_range(chart_type: ChartType, low: float, high: float) -> Tuple[float, float]:
+    if chart_type is ChartType.bar:
+        low, high = min(low, 0.0), max(high, 0.0)
+    y_min, y_max, _ = nice_range(low, high)
+    return y_min, y_max
+
+
+def chart_node(
+    node_id: str,
+    data: Aggregate,
+    title: str = "",
+    chart_type: str = "bar",
+    x_label: str = "",
+    y_label: str = "",
+    width: int = 800,
+    height: int = 400,
+    colors: Optional[List[str]] = None,
+    show_legend: Optional[bool] = None,
+    legend_position: str = "top",
+) -> ChartNode:
+    """A ``ChartNode`` plotting ``data``.
+
+    The x ticks are the labels and the y range is ``nice_range`` of the cell
+    values; bar charts always include 0. The legend is shown for several
+    series and for pie charts unless ``show_legend`` says otherwise.
+    """
+    chart_type = ChartType(chart_type)
+    if chart_type is ChartType.pie and len(data.series) != 1:
+        raise ValueError(f"A pie chart takes one series, got {len(data.series)}")
+    y_min, y_max = _y_range(chart_type, data.low, data.high)
+    if colors is None:
+        count = len(data.labels) if chart_type is ChartType.pie else len(data.series)
+        colors = [DEFAULT_COLORS[i % len(DEFAULT_COLORS)] for i in range(count)]
+    if show_legend is None:
+        show_legend = chart_type is ChartType.pie or len(data.series) > 1
+    return ChartNode(
+        id=node_id,
+        type="chart",
+        props=ChartProps(
+            chartType=chart_type,
+            width=width,
+            height=height,
+            labels=list(data.labels),
+            series=list(data.series),
+            colors=colors,
+            title=title,
+            showLegend=show_legend,
+            legendPosition=LegendPosition(legend_position),
+            xAxis=AxisXProps(label=x_label, ticks=list(data.labels), showGrid=False),
+            yAxis=AxisYProps(label=y_label, min=y_min, max=y_max, showGrid=True),
+            annotations=[],
+        ),
+    )
+
+
+# Which annotations ``fix_charts`` adds to charts that have none.
+ANNOTATE = ("all", "extrema", "outliers", "none")
+MAX_ANNOTATIONS = 5
+# Modified z-score (median and MAD based) above which a point is an outlier.
+OUTLIER_SCORE = 3.5
+
+
+def _format(value: float) -> str:
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.4g}"
+
+
+def chart_annotations(
+    props: ChartProps, annotate: str = "all", limit: int = MAX_ANNOTATIONS
+) -> List[ChartAnnotation]:
+    """Extrema of all series and outliers within each series, as
+    ``ChartAnnotation`` points (``x`` is the label index)."""
+    if annotate not in ANNOTATE:
+        raise ValueError(f"Unknown annotate '{annotate}', expected one of {ANNOTATE}")
+    result: List[ChartAnnotation] = []
+    if annotate == "none":
+        return result
+    if annotate in ("all", "extrema"):
+        points = [
+            (value, index, series.name)
+            for series in props.series
+            for index, value in enumerate(series.data)
+        ]
+        high, low = max(points), min(points)
+        for tag, (value, index, name) in (("High", high), ("Low", low)):
+            if len(props.series) > 1:
+                tag = f"{tag} {name}"
+            label = f"{tag}: {_format(value)}"
+            result.append(ChartAnnotation(x=index, y=value, label=label))
+        if high == low:
+            result.pop()
+    if annotate in ("all", "outliers"):
+        marked = {(a.x, a.y) for a in result}
+        for series in props.series:
+            data = series.data
+            if len(data) < 5:
+                continue
+            ordered = sorted(data)
+            median = ordered[len(data) // 2]
+            deviations = sorted(abs(value - median) for value in data)
+            mad = deviations[len(data) // 2]
+            if mad == 0:
+                continue
+            for index, value in enumerate(data):
+                score = 0.6745 * abs(value - median) / mad
+                if score > OUTLIER_SCORE and (index, value) not in marked:
+                    label = f"Outlier: {_format(value)}"
+                    result.append(ChartAnnotation(x=index, y=value, label=label))
+    return result[:limit]
+
+
+def fix_chart(
+    node: ChartNode, annotate: str = "all"
+) -> "Tuple[ChartNode, Optional[GraphIssue]]":
+    """``node`` with axes and annotations that fit its data.
+
+    Keeps a y range that contains every value and x ticks with one entry per
+    label, replaces them otherwise, and drops annotations outside the label
+    range, computing new ones when none are left. A chart whose series
+    lengths differ from its labels is returned unchanged with an issue.
+    """
+    props = node.props
+    count = len(props.labels)
+    for series in props.series:
+        if len(series.data) != count:
+            return node, GraphIssue(
+                "label_mismatch",
+                node.id,
+                node.type,
+                "labels",
+                f"Series '{series.name}' has {len(series.data)} points for "
+                f"{count} labels",
+            )
+    update: Dict[str, Any] = {}
+    if props.chartType is not ChartType.pie:
+        low = min(min(series.data) for series in props.series)
+        high = max(max(series.data) for series in props.series)
+        y_axis = props.yAxis
+        if not (y_axis.min < y_axis.max and y_axis.min <= low and high <= y_axis.max):
+            y_min, y_max = _y_range(props.chartType, low, high)
+            update["yAxis"] = y_axis.model_copy(update={"min": y_min, "max": y_max})
+        if len(props.xAxis.ticks) != count:
+            ticks = list(props.labels)
+            update["xAxis"] = props.xAxis.model_copy(update={"ticks": ticks})
+    kept = [a for a in props.annotations if 0 <= a.x <= count - 1]
+    if not kept:
+        kept = chart_annotations(props, annotate)
+    if kept != props.annotations:
+        update["annotations"] = kept
+    if not update:
+        return node, None
+    return node.model_copy(update={"props": props.model_copy(update=update)}), None
+
+
+def fix_charts(
+    schema: PromptiusGuiSchema, annotate: str = "all"
+) -> Tuple[PromptiusGuiSchema, List[GraphIssue]]:
+    """Run ``fix_chart`` over every chart node.
+
+    Returns ``schema`` itself when nothing changed, so cached hashes stay
+    valid, and the ``label_mismatch`` issues found.
+    """
+    issues: List[GraphIssue] = []
+    nodes = list(schema.nodes)
+    changed = False
+    for position, node in enumerate(nodes):
+        if node.type != "chart":
+            continue
+        fixed, issue = fix_chart(node, annotate)
+        if issue is not None:
+            issues.append(issue)
+        if fixed is not node:
+            nodes[position] = fixed
+            changed = True
+    if not changed:
+        return schema, issues
+    return schema.model_copy(update={"nodes": nodes}), issues
+
+
+# Fields left to ``fix_charts`` when the LLM is given ``chart_free_schema``.
+_COMPUTED_FIELDS = {
+    "AxisXProps": ("ticks",),
+    "AxisYProps": ("min", "max"),
+    "ChartProps": ("annotations",),
+}
+
+
+def chart_free_schema() -> Dict[str, Any]:
+    """The JSON schema of ``PromptiusGuiSchema`` without chart axis bounds,
+    x ticks and annotations, for structured output that ``complete_charts``
+    turns into a full schema. The model writes fewer tokens per chart."""
+    schema = PromptiusGuiSchema.model_json_schema()
+    for name, fields in _COMPUTED_FIELDS.items():
+        definition = schema["$defs"][name]
+        for field in fields:
+            definition["properties"].pop(field, None)
+        definition["required"] = [
+            field for field in definition.get("required", []) if field not in fields
+        ]
+    return schema
+
+
+def chart_placeholders(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Give chart ``props`` written against ``chart_free_schema`` the fields
+    it omits, as placeholders that ``fix_charts`` replaces. Changes ``props``
+    in place and returns it."""
+    props.setdefault("annotations", [])
+    for axis, defaults in (
+        ("xAxis", {"label": "", "ticks": [], "showGrid": False}),
+        ("yAxis", {"label": "", "min": 0, "max": 0, "showGrid": True}),
+    ):
+        if isinstance(props.get(axis), dict):
+            props[axis] = {**defaults, **props[axis]}
+        else:
+            props[axis] = defaults
+    return props
+
+
+def complete_charts(data: Dict[str, Any], annotate: str = "all") -> PromptiusGuiSchema:
+    """Validate a document written against ``chart_free_schema``: the
+    omitted chart fields get placeholders that ``fix_charts`` replaces."""
+    for node in data.get("nodes", []):
+        if not isinstance(node, dict) or node.get("type") != "chart":
+            continue
+        props = node.get("props")
+        if isinstance(props, dict):
+            chart_placeholders(props)
+    schema, _ = fix_charts(PromptiusGuiSchema.model_validate(data), annotate)
+    return schema
@@ -0,0 +1,356 @@
+"""
+Compact read-only representation of validated PromptiusGuiSchema documents.
+
+Once validated, cached schemas are only read and serialized. A Pydantic model
+carries an instance ``__dict__``, a fields-set and other bookkeeping per
+object, and every node holds a nested props model (charts several). Here a
+node is a three-slot object whose props are a plain tuple in model field
+order; nested models become tuples too, enums become their value strings and
+ids, types and enum values are interned so equal strings are stored once.
+
+``compact`` converts a schema, ``expand`` converts back (re-validating), and
+``to_json`` writes the same compact JSON as ``model_dump_json`` directly from
+the tuples, using per-class field specs built once from the models.
+"""
+
+from __future__ import annotations
+
+import sys
+import typing
+from enum import Enum
+from json.encoder import encode_basestring
+from typing import Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel
+
+from . import (
+    AlertNode,
+    ButtonNode,
+    CardNode,
+    ChartNode,
+    ContainerNode,
+    CustomAction,
+    GridNode,
+    InputNode,
+    NavigateAction,
+    PromptiusGuiSchema,
+    SetStateAction,
+    StackNode,
+    SubmitFormAction,
+    TextareaNode,
+    TextNode,
+    UIMetadata,
+    ValidateAction,
+)
+
+_intern = sys.intern
+
+NODE_TYPES: Dict[str, Type[BaseModel]] = {
+    "button": ButtonNode,
+    "input": InputNode,
+    "textarea": TextareaNode,
+    "text": TextNode,
+    "card": CardNode,
+    "alert": AlertNode,
+    "container": ContainerNode,
+    "grid": GridNode,
+    "stack": StackNode,
+    "chart": ChartNode,
+}
+
+ACTION_TYPES: Dict[str, Type[BaseModel]] = {
+    "navigate": NavigateAction,
+    "setState": SetStateAction,
+    "submitForm": SubmitFormAction,
+    "validate": ValidateAction,
+    "custom": CustomAction,
+}
+
+# A field spec is None (JSON scalar), "enum", ("list", spec) or ("model", Spec).
+_ENUM = "enum"
+
+
+class _Spec:
+    """Field names, JSON key prefixes and field specs of one model class."""
+
+    __slots__ = ("cls", "names", "keys", "fields")
+
+    def __init__(self, cls: Type[BaseModel]) -> None:
+        self.cls = cls
+        self.names = tuple(cls.model_fields)
+        self.keys = tuple(f"{encode_basestring(name)}:" for name in self.names)
+        self.fields = tuple(
+            _field_spec(cls.model_fields[name].annotation) for name in self.names
+        )
+
+
+_specs: Dict[type, _Spec] = {}
+
+
+def _spec(cls: Type[BaseModel]) -> _Spec:
+    spec = _specs.get(cls)
+    if spec is None:
+        spec = _specs[cls] = _Spec(cls)
+    return spec
+
+
+def _field_spec(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        return ("list", _field_spec(typing.get_args(annotation)[0]))
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            return _ENUM
+        if issubclass(annotation, BaseModel):
+            return ("model", _spec(annotation))
+    return None
+
+
+def _pack(value: Any, spec: Any) -> Any:
+    if spec is None:
+        return _intern(value) if type(value) is str else value
+    if spec is _ENUM:
+        return _intern(value.value)
+    kind, inner = spec
+    if kind == "list":
+        return tuple([_pack(item, inner) for item in value])
+    fields = value.__dict__
+    return tuple(
+        [_pack(fields[name], field) for name, field in zip(inner.names, inner.fields)]
+    )
+
+
+def _unpack(value: Any, spec: Any) -> Any:
+    if spec is None or spec is _ENUM:
+        return value
+    kind, inner = spec
+    if kind == "list":
+        return [_unpack(item, inner) for item in value]
+    return {
+        name: _unpack(item, field)
+        for name, item, field in zip(inner.names, value, inner.fields)
+    }
+
+
+class CompactNode:
+    """Immutable node: ``id``, ``type`` and ``props`` as a tuple."""
+
+    __slots__ = ("id", "type", "props")
+
+    def __init__(self, id: str, type: str, props: Tuple[Any, ...]) -> None:
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "type", type)
+        object.__setattr__(self, "props", props)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("CompactNode is immutable")
+
+    def __repr__(self) -> str:
+        return f"CompactNode(id={self.id!r}, type={self.type!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CompactNode) and (
+            (self.id, self.type, self.props) == (other.id, other.type, other.props)
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.type, self.props))
+
+    def prop(self, name: str) -> Any:
+        """Props field ``name``; nested models and lists stay as tuples."""
+        spec = _props_spec(self.type)
+        return self.props[spec.names.index(name)]
+
+    def props_dict(self) -> Dict[str, Any]:
+        return _unpack(self.props, ("model", _props_spec(self.type)))
+
+
+_props_specs: Dict[str, _Spec] = {}
+
+
+def _props_spec(node_type: str) -> _Spec:
+    spec = _props_specs.get(node_type)
+    if spec is None:
+        props = NODE_TYPES[node_type].model_fields["props"].annotation
+        spec = _props_specs[node_type] = _spec(props)
+    return spec
+
+
+class CompactSchema:
+    """Immutable schema made of tuples and ``CompactNode`` objects.
+
+    ``metadata`` is a tuple in ``UIMetadata`` field order, ``edges`` are
+    ``(src, dest, order)`` and ``events`` are ``(nodeId, eventType, action)``
+    with ``action`` a tuple in its action model's field order (``type``
+    first).
+    """
+
+    __slots__ = ("metadata", "nodes", "edges", "events")
+
+    def __init__(
+        self,
+        metadata: Tuple[Any, ...],
+        nodes: Tuple[CompactNode, ...],
+        edges: Tuple[Tuple[str, str, int], ...],
+        events: Tuple[Tuple[str, str, Tuple[Any, ...]], ...],
+    ) -> None:
+        object.__setattr__(self, "metadata", metadata)
+        object.__setattr__(self, "nodes", nodes)
+        object.__setattr__(self, "edges", edges)
+        object.__setattr__(self, "events", events)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("CompactSchema is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CompactSchema) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.metadata, self.nodes, self.edges, self.events))
+
+    @property
+    def root_id(self) -> str:
+        return self.metadata[_spec(UIMetadata).names.index("rootId")]
+
+
+def compact(schema: PromptiusGuiSchema) -> CompactSchema:
+    """Convert a validated schema to its compact form."""
+    metadata_spec = ("model", _spec(UIMetadata))
+    nodes = []
+    for node in schema.nodes:
+        node_type = _intern(node.type)
+        nodes.append(
+            CompactNode(
+                _intern(node.id),
+                node_type,
+                _pack(node.props, ("model", _props_spec(node_type))),
+            )
+        )
+    edges = tuple(
+        (_intern(edge.src), _intern(edge.dest), edge.order) for edge in schema.edges
+    )
+    events = tuple(
+        (
+            _intern(event.nodeId),
+            _intern(event.eventType.value),
+            _pack(event.action, ("model", _spec(ACTION_TYPES[event.action.type]))),
+        )
+        for event in schema.events
+    )
+    return CompactSchema(
+        _pack(schema.metadata, metadata_spec), tuple(nodes), edges, events
+    )
+
+
+def to_dict(schema: CompactSchema) -> Dict[str, Any]:
+    """JSON-compatible dict equal to ``model_dump(mode="json")``."""
+    return {
+        "metadata": _unpack(schema.metadata, ("model", _spec(UIMetadata))),
+        "nodes": [
+            {"id": node.id, "type": node.type, "props": node.props_dict()}
+            for node in schema.nodes
+        ],
+        "edges": [
+            {"src": src, "dest": dest, "order": order}
+            for src, dest, order in schema.edges
+        ],
+        "events": [
+            {
+                "nodeId": node_id,
+                "eventType": event_type,
+                "action": _unpack(action, ("model", _spec(ACTION_TYPES[action[0]]))),
+            }
+            for node_id, event_type, action in schema.events
+        ],
+    }
+
+
+def expand(schema: CompactSchema) -> PromptiusGuiSchema:
+    """Rebuild (and re-validate) the Pydantic schema."""
+    return PromptiusGuiSchema.model_validate(to_dict(schema))
+
+
+_INF = float("inf")
+
+
+def _float(value: float) -> str:
+    """``value`` as pydantic-core writes it: ``repr`` except for negative
+    exponents, which lose the zero padding (``1e-7``) and only start below
+    ``1e-5``; infinities and NaN become ``null``."""
+    if value != value or value in (_INF, -_INF):
+        return "null"
+    text = repr(value)
+    if "e-" not in text:
+        return text
+    mantissa, exponent = text.split("e-")
+    if exponent != "05":
+        return f"{mantissa}e-{int(exponent)}"
+    sign = "-" if mantissa[0] == "-" else ""
+    return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+
+
+def _write(value: Any, spec: Any, out: List[str]) -> None:
+    if spec is None:
+        kind = type(value)
+        if kind is str:
+            out.append(encode_basestring(value))
+        elif kind is bool:
+            out.append("true" if value else "false")
+        elif value is None:
+            out.append("null")
+        elif kind is float:
+            out.append(_float(value))
+        else:
+            out.append(repr(value))
+        return
+    if spec is _ENUM:
+        out.append(encode_basestring(value))
+        return
+    kind, inner = spec
+    if kind == "list":
+        out.append("[")
+        for i, item in enumerate(value):
+            if i:
+                out.append(",")
+            _write(item, inner, out)
+        out.append("]")
+        return
+    out.append("{")
+    for i, (key, item, field) in enumerate(zip(inner.keys, value, inner.fields)):
+        out.append("," + key if i else key)
+        _write(item, field, out)
+    out.append("}")
+
+
+def to_json(schema: CompactSchema) -> str:
+    """Compact JSON text matching ``PromptiusGuiSchema.model_dump_json()``."""
+    out: List[str] = ['{"metadata":']
+    _write(schema.metadata, ("model", _spec(UIMetadata)), out)
+    out.append(',"nodes":[')
+    for i, node in enumerate(schema.nodes):
+        out.append(
+            f'{"," if i else ""}{{"id":{encode_basestring(node.id)},'
+            f'"type":"{node.type}","props":'
+        )
+        _write(node.props, ("model", _props_spec(node.type)), out)
+        out.append("}")
+    out.append('],"edges":[')
+    out.append(
+        ",".join(
+            f'{{"src":{encode_basestring(src)},"dest":{encode_basestring(dest)},'
+            f'"order":{order}}}'
+            for src, dest, order in schema.edges
+        )
+    )
+    out.append('],"events":[')
+    for i, (node_id, event_type, action) in enumerate(schema.events):
+        out.append(
+            f'{"," if i else ""}{{"nodeId":{encode_basestring(node_id)},'
+            f'"eventType":"{event_type}","action":'
+        )
+        _write(action, ("model", _spec(ACTION_TYPES[action[0]])), out)
+        out.append("}")
+    out.append("]}")
+    return "".join(out)
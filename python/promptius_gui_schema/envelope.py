@@ -0,0 +1,89 @@
+"""
+Pre-validated response envelope for PromptiusGuiSchema.
+
+Schemas leaving the server have already passed Pydantic validation. The
+envelope records that fact with an HMAC stamp over the schema format version
+and the canonical content hash, and ships the lookup maps the client renderer
+would otherwise rebuild on every render: ``order``-sorted children, events
+grouped by node and the compiled event dispatch table (see ``events``). Only
+holders of the secret can check the stamp (``verify_envelope``). A browser
+skips its Zod parse only when the app marks the envelope as coming from its
+own server (``GraphRenderer``'s ``trusted``); it then caches the maps by
+``hash``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from typing import Any, Dict, List, Mapping, Optional
+
+from . import PromptiusGuiSchema
+from .canonical import schema_hash
+from .events import compile_events
+from .graph import GraphIndex
+from .migrations import SCHEMA_VERSION
+
+
+def _stamp(secret: bytes, version: str, content_hash: str) -> str:
+    message = f"{version}:{content_hash}".encode("utf-8")
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def build_index(schema: PromptiusGuiSchema) -> Dict[str, Any]:
+    """Children adjacency (sorted by ``order``), event positions by node and
+    the event dispatch table."""
+    index = GraphIndex(schema)
+    events: Dict[str, List[int]] = {}
+    for position, event in enumerate(schema.events):
+        events.setdefault(event.nodeId, []).append(position)
+    return {
+        "children": {src: [e.dest for e in edges] for src, edges in index.child_edges.items()},
+        "events": events,
+        "dispatch": compile_events(index).to_json(),
+    }
+
+
+def build_envelope(
+    schema: PromptiusGuiSchema, secret: bytes, with_index: bool = True
+) -> Dict[str, Any]:
+    """Wrap a validated ``schema`` for trusted clients.
+
+    The content hash keeps node ids (``relabel_ids=False``) because clients
+    address nodes by id.
+    """
+    content_hash = schema_hash(schema, relabel_ids=False)
+    envelope: Dict[str, Any] = {
+        "version": SCHEMA_VERSION,
+        "hash": content_hash,
+        "validated": _stamp(secret, SCHEMA_VERSION, content_hash),
+        "schema": schema.model_dump(mode="json"),
+    }
+    if with_index:
+        envelope["index"] = build_index(schema)
+    return envelope
+
+
+def verify_envelope(
+    envelope: Mapping[str, Any], secret: bytes
+) -> Optional[PromptiusGuiSchema]:
+    """Return the enclosed schema if the stamp and hash check out, else ``None``.
+
+    For services that receive envelopes back (caches, proxies): the hash is
+    recomputed from the payload, so a valid stamp on altered content fails.
+    """
+    try:
+        version = envelope["version"]
+        content_hash = envelope["hash"]
+        stamp = envelope["validated"]
+        payload = envelope["schema"]
+    except (KeyError, TypeError):
+        return None
+    if version != SCHEMA_VERSION:
+        return None
+    if not hmac.compare_digest(_stamp(secret, version, content_hash), str(stamp)):
+        return None
+    schema = PromptiusGuiSchema.model_validate(payload)
+    if schema_hash(schema, relabel_ids=False) != content_hash:
+        return None
+    return schema
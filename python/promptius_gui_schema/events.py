@@ -0,0 +1,302 @@
+"""
+Event binding checks and a precompiled dispatch table.
+
+``GraphRenderer`` maps ``events`` to React props on every render; only the
+last binding per ``(nodeId, eventType)`` survives, and bindings on nodes that
+never fire the event, or are not rendered at all, do nothing. ``compile_events``
+resolves all of that once on the server: the resulting ``DispatchTable``
+lists each distinct action once and maps every node to ``{eventType: action
+index}``, so a client indexes into it instead of scanning the event list.
+``envelope.build_index`` ships it as ``index.dispatch``.
+
+The same pass reports binding problems as ``GraphIssue`` entries: dead and
+shadowed bindings, ``setState`` keys that clash with the renderer's own state
+or are set to values of different types, ``submitForm`` endpoints that are
+not paths or http(s) URLs (or not among the declared ones), ``custom``
+handlers missing from a declared registry, and ``validate`` actions whose
+rules are empty, repeated, not in the rule language of ``rules``, or aimed at
+a node that is not an input or textarea.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import (
+    CustomAction,
+    EventAction,
+    PromptiusGuiSchema,
+    SetStateAction,
+    SubmitFormAction,
+    ValidateAction,
+)
+from .graph import GraphIndex, GraphIssue
+from .rules import RuleError, parse_rule
+
+# State keys GraphRenderer writes itself (submitForm and validate actions).
+RESERVED_STATE_KEYS = frozenset({"submitStatus", "isValid"})
+
+_FIELD_TYPES = frozenset({"input", "textarea"})
+_LAYOUT_TYPES = frozenset({"container", "card", "grid", "stack"})
+_FIELD_EVENTS = frozenset({"onChange", "onFocus", "onBlur", "onClick"})
+
+# Events each node type's element fires. Layout nodes also receive the
+# bubbling field events (and onSubmit) when they contain an input or textarea.
+NODE_EVENTS: Dict[str, frozenset] = {
+    "button": frozenset({"onClick", "onFocus", "onBlur"}),
+    "input": _FIELD_EVENTS,
+    "textarea": _FIELD_EVENTS,
+    "text": frozenset({"onClick"}),
+    "alert": frozenset({"onClick"}),
+    "chart": frozenset({"onClick"}),
+    "container": frozenset({"onClick"}),
+    "card": frozenset({"onClick"}),
+    "grid": frozenset({"onClick"}),
+    "stack": frozenset({"onClick"}),
+}
+_BUBBLED_EVENTS = frozenset({"onChange", "onFocus", "onBlur", "onSubmit"})
+
+
+@dataclass
+class DispatchTable:
+    """Per-node event dispatch for one schema.
+
+    ``nodes[node_id][event_type]`` is an index into ``actions``; ``events``
+    holds the position in ``schema.events`` each entry was compiled from.
+    """
+
+    actions: List[EventAction] = field(default_factory=list)
+    nodes: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    events: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    issues: List[GraphIssue] = field(default_factory=list)
+
+    def action(self, node_id: str, event_type: str) -> Optional[EventAction]:
+        """The action ``event_type`` on ``node_id`` runs, if any."""
+        index = self.nodes.get(node_id, {}).get(event_type)
+        return None if index is None else self.actions[index]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "actions": [action.model_dump(mode="json") for action in self.actions],
+            "nodes": self.nodes,
+        }
+
+
+def _has_field(index: GraphIndex, node_id: str) -> bool:
+    return any(
+        node.type in _FIELD_TYPES for node, depth in index.walk(node_id) if depth
+    )
+
+
+def _endpoint_ok(endpoint: str) -> bool:
+    if endpoint.startswith("/"):
+        return not endpoint.startswith("//") and " " not in endpoint
+    scheme, _, rest = endpoint.partition("://")
+    return scheme in ("http", "https") and bool(rest) and " " not in rest
+
+
+def compile_events(
+    source: "PromptiusGuiSchema | GraphIndex",
+    handlers: Optional[Iterable[str]] = None,
+    endpoints: Optional[Iterable[str]] = None,
+) -> DispatchTable:
+    """Compile ``events`` into a ``DispatchTable`` and check every binding.
+
+    ``handlers`` declares the custom handler names the client registers and
+    ``endpoints`` the accepted ``submitForm`` endpoints; either check is
+    skipped when not given. Bindings that cannot fire are reported and left
+    out of the table.
+    """
+    index = source if isinstance(source, GraphIndex) else GraphIndex(source)
+    schema = index.schema
+    if schema is None:
+        raise ValueError("compile_events needs a GraphIndex built from a schema")
+    known_handlers = None if handlers is None else set(handlers)
+    known_endpoints = None if endpoints is None else set(endpoints)
+    reachable = {node.id for node, _ in index.walk()}
+    table = DispatchTable()
+    issues = table.issues
+    action_ids: Dict[str, int] = {}
+    state_types: Dict[str, Tuple[str, int]] = {}
+    bubbling: Dict[str, bool] = {}
+    fields = {node.id for node in schema.nodes if node.type in _FIELD_TYPES}
+
+    def issue(code: str, position: int, node_id: str, where: str, message: str) -> None:
+        node = index.nodes.get(node_id)
+        node_type = node.type if node is not None else "event"
+        issues.append(
+            GraphIssue(code, node_id, node_type, f"events[{position}]{where}", message)
+        )
+
+    for position, event in enumerate(schema.events):
+        node_id, event_type, action = event.nodeId, event.eventType.value, event.action
+        _check_action(
+            action,
+            position,
+            node_id,
+            issue,
+            state_types,
+            known_handlers,
+            known_endpoints,
+            fields,
+        )
+        node = index.nodes.get(node_id)
+        if node is None:
+            issue(
+                "unknown_event_node",
+                position,
+                node_id,
+                ".nodeId",
+                f"{event_type} event on unknown node {node_id!r}",
+            )
+            continue
+        if node_id not in reachable:
+            issue(
+                "unreachable_binding",
+                position,
+                node_id,
+                ".nodeId",
+                f"{event_type} on {node_id!r}, which is not rendered from the root",
+            )
+            continue
+        fired = NODE_EVENTS.get(node.type, frozenset())
+        if (
+            event_type not in fired
+            and event_type in _BUBBLED_EVENTS
+            and node.type in _LAYOUT_TYPES
+        ):
+            if node_id not in bubbling:
+                bubbling[node_id] = _has_field(index, node_id)
+            if bubbling[node_id]:
+                fired = fired | {event_type}
+        if event_type not in fired:
+            issue(
+                "unsupported_event",
+                position,
+                node_id,
+                ".eventType",
+                f"{node.type} nodes never fire {event_type}",
+            )
+            continue
+        bound = table.events.setdefault(node_id, {})
+        if event_type in bound:
+            issue(
+                "duplicate_binding",
+                bound[event_type],
+                node_id,
+                "",
+                f"{event_type} on {node_id!r} is rebound by events[{position}]",
+            )
+        bound[event_type] = position
+    # Intern the surviving actions; equal actions share one entry
+    for node_id, bound in table.events.items():
+        dispatch = table.nodes[node_id] = {}
+        for event_type, position in bound.items():
+            action = schema.events[position].action
+            key = action.model_dump_json()
+            if key not in action_ids:
+                action_ids[key] = len(table.actions)
+                table.actions.append(action)
+            dispatch[event_type] = action_ids[key]
+    return table
+
+
+def _check_action(
+    action: EventAction,
+    position: int,
+    node_id: str,
+    issue: Any,
+    state_types: Dict[str, Tuple[str, int]],
+    handlers: Optional[Set[str]],
+    endpoints: Optional[Set[str]],
+    fields: Set[str],
+) -> None:
+    if isinstance(action, SetStateAction):
+        if action.key in RESERVED_STATE_KEYS:
+            issue(
+                "reserved_state_key",
+                position,
+                node_id,
+                ".action.key",
+                f"state key {action.key!r} is also written by the renderer",
+            )
+        kind = type(action.value).__name__
+        seen = state_types.setdefault(action.key, (kind, position))
+        if seen[0] != kind:
+            issue(
+                "state_type_conflict",
+                position,
+                node_id,
+                ".action.value",
+                f"state key {action.key!r} is set to a {kind} here and to a "
+                f"{seen[0]} by events[{seen[1]}]",
+            )
+    elif isinstance(action, SubmitFormAction):
+        if not _endpoint_ok(action.endpoint):
+            issue(
+                "bad_endpoint",
+                position,
+                node_id,
+                ".action.endpoint",
+                f"endpoint {action.endpoint!r} is not a path or http(s) URL",
+            )
+        elif endpoints is not None and action.endpoint not in endpoints:
+            issue(
+                "unknown_endpoint",
+                position,
+                node_id,
+                ".action.endpoint",
+                f"endpoint {action.endpoint!r} is not declared",
+            )
+    elif isinstance(action, CustomAction):
+        if handlers is not None and action.handler not in handlers:
+            issue(
+                "unknown_handler",
+                position,
+                node_id,
+                ".action.handler",
+                f"custom handler {action.handler!r} is not registered",
+            )
+    elif isinstance(action, ValidateAction):
+        rules = [rule.strip() for rule in action.rules]
+        if not rules or not all(rules):
+            issue(
+                "invalid_rules",
+                position,
+                node_id,
+                ".action.rules",
+                "validate action needs non-empty rules",
+            )
+        elif len(set(rules)) != len(rules):
+            issue(
+                "invalid_rules",
+                position,
+                node_id,
+                ".action.rules",
+                "validate action repeats a rule",
+            )
+        for rule in dict.fromkeys(filter(None, rules)):
+            try:
+                target = parse_rule(rule).target
+            except RuleError as exc:
+                issue("invalid_rules", position, node_id, ".action.rules", str(exc))
+                continue
+            if target is not None and target not in fields:
+                issue(
+                    "invalid_rules",
+                    position,
+                    node_id,
+                    ".action.rules",
+                    f"rule {rule!r} targets {target!r}, which is not an input "
+                    "or textarea",
+                )
+
+
+def check_events(
+    source: "PromptiusGuiSchema | GraphIndex",
+    handlers: Optional[Iterable[str]] = None,
+    endpoints: Optional[Iterable[str]] = None,
+) -> List[GraphIssue]:
+    """The issues ``compile_events`` reports, without keeping the table."""
+    return compile_events(source, handlers, endpoints).issues
@@ -0,0 +1,495 @@
+"""
+Server-side handling of ``submitForm`` actions.
+
+``SubmissionRouter`` is derived once from a schema: each form with a live
+``submitForm`` binding (see ``events.compile_events``) becomes a ``FormSpec``
+holding its input and textarea nodes. A form is the nearest layout node
+(container, card, grid or stack) around the bound node, or the bound node
+itself if it is one. Payloads map node ids to values and are checked
+against the fields' ``required``, ``minLength``/``maxLength`` and input
+``type`` constraints, tightened by the rules of validate actions bound in
+the form (see ``rules``). Each form's checks are compiled into one function
+on first use. ``RouterCache`` keeps routers by schema key so a hot form is
+neither re-derived nor recompiled per request.
+
+Accepted submissions go to a ``SubmissionStore``. It batches them: callers
+queue rows, and one writer thread commits each batch in a single transaction
+once ``batch_size`` rows are waiting or ``flush_interval`` has passed. With
+``wait=True`` (the default) ``add`` returns once the row is committed, so
+acknowledged submissions survive a crash and concurrent submitters share
+one commit (group commit).
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from . import PromptiusGuiSchema, SubmitFormAction, ValidateAction
+from .canonical import schema_hash
+from .events import compile_events
+from .graph import GraphIndex
+from .rules import (
+    TYPE_CHECKS,
+    CompiledRules,
+    Constraints,
+    Rule,
+    RuleError,
+    parse_rule,
+)
+
+_LAYOUT_TYPES = frozenset({"container", "card", "grid", "stack"})
+
+
+class FieldRule(NamedTuple):
+    """Constraints of one input or textarea node."""
+
+    name: str
+    type: str  # input type, "text" for textareas
+    required: bool
+    min_length: int
+    max_length: int
+
+
+class SubmissionError(ValueError):
+    """A payload rejected by its form; ``errors`` maps field to message."""
+
+    def __init__(self, errors: Dict[str, str]) -> None:
+        super().__init__("; ".join(f"{k}: {v}" for k, v in errors.items()))
+        self.errors = errors
+
+
+@dataclass
+class FormSpec:
+    endpoint: str
+    method: str
+    form_id: str
+    fields: Dict[str, FieldRule] = field(default_factory=dict)
+    # ValidateAction rules of the form, each aimed at one of ``fields``
+    rules: List[Rule] = field(default_factory=list)
+    _validator: Optional[CompiledRules] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def constraints(self) -> Dict[str, Constraints]:
+        """The props of each field tightened by ``rules``."""
+        merged: Dict[str, Constraints] = {}
+        for name, field_rule in self.fields.items():
+            merged[name] = Constraints(
+                required=field_rule.required,
+                min_length=field_rule.min_length,
+                max_length=field_rule.max_length,
+                formats=[field_rule.type] if field_rule.type in TYPE_CHECKS else [],
+            )
+        for rule in self.rules:
+            if rule.target in merged:
+                merged[rule.target].add(rule)
+        return merged
+
+    @property
+    def validator(self) -> CompiledRules:
+        """The form's checks, compiled on first use."""
+        if self._validator is None:
+            self._validator = CompiledRules(self.constraints())
+        return self._validator
+
+    def check(self, payload: Mapping[str, Any]) -> Dict[str, str]:
+        """Errors by field name for ``payload``; empty when it is accepted."""
+        return self.validator(payload)
+
+
+def _rule(node: Any) -> FieldRule:
+    props = node.props
+    if node.type == "input":
+        return FieldRule(
+            node.id,
+            props.type.value,
+            props.required,
+            props.minLength if props.minLength <= props.maxLength else 0,
+            props.maxLength,
+        )
+    return FieldRule(node.id, "text", props.required, 0, props.maxLength)
+
+
+def form_specs(
+    source: "PromptiusGuiSchema | GraphIndex",
+) -> Dict[Tuple[str, str, str], FormSpec]:
+    """``FormSpec`` per ``(endpoint, method, form_id)`` of the live submitForm
+    bindings.
+
+    Forms posting to the same endpoint and method stay separate, so one
+    form's required fields never apply to another's payload. Live validate
+    bindings inside a form add their rules: a rule with ``@node_id`` applies
+    to that field, one without to the bound field, or to every field of the
+    form when bound to another node. Rules ``compile_events`` reports as
+    ``invalid_rules`` are left out.
+    """
+    index = source if isinstance(source, GraphIndex) else GraphIndex(source)
+    parents: Dict[str, str] = {}
+    for src, edges in index.child_edges.items():
+        for edge in edges:
+            parents.setdefault(edge.dest, src)
+
+    def form_of(node_id: str) -> str:
+        seen = {node_id}
+        while index.nodes[node_id].type not in _LAYOUT_TYPES:
+            parent = parents.get(node_id)
+            if parent is None or parent in seen or parent not in index.nodes:
+                break
+            seen.add(parent)
+            node_id = parent
+        return node_id
+
+    table = compile_events(index)
+    specs: Dict[Tuple[str, str, str], FormSpec] = {}
+    validated: Dict[str, List[Rule]] = {}
+    for node_id, bindings in table.nodes.items():
+        for action_index in bindings.values():
+            action = table.actions[action_index]
+            if isinstance(action, ValidateAction):
+                form_id = form_of(node_id)
+                validated.setdefault(form_id, []).extend(
+                    _resolve_rules(index, node_id, form_id, action.rules)
+                )
+                continue
+            if not isinstance(action, SubmitFormAction):
+                continue
+            form_id = form_of(node_id)
+            key = (action.endpoint, action.method.value, form_id)
+            if key in specs:
+                continue
+            spec = specs[key] = FormSpec(key[0], key[1], form_id)
+            for node, _ in index.walk(form_id):
+                if node.type in ("input", "textarea"):
+                    spec.fields.setdefault(node.id, _rule(node))
+    for spec in specs.values():
+        spec.rules.extend(validated.get(spec.form_id, ()))
+    return specs
+
+
+def _resolve_rules(
+    index: GraphIndex, node_id: str, form_id: str, rules: List[str]
+) -> List[Rule]:
+    """Parsed ``rules`` of a binding on ``node_id``, one per target field."""
+    if index.nodes[node_id].type in ("input", "textarea"):
+        default = [node_id]
+    else:
+        default = [
+            node.id
+            for node, _ in index.walk(form_id)
+            if node.type in ("input", "textarea")
+        ]
+    resolved: List[Rule] = []
+    for text in rules:
+        try:
+            rule = parse_rule(text)
+        except RuleError:
+            continue
+        targets = default if rule.target is None else [rule.target]
+        resolved.extend(rule._replace(target=target) for target in targets)
+    return resolved
+
+
+class SubmissionRouter:
+    """Validates submissions for the forms of one schema.
+
+    ``forms`` lists the forms posting to each ``(endpoint, method)``. When
+    several share one, a payload goes to the first form it passes, trying
+    forms that have every submitted field first.
+    """
+
+    def __init__(self, schema: PromptiusGuiSchema) -> None:
+        self.forms: Dict[Tuple[str, str], List[FormSpec]] = {}
+        for spec in form_specs(schema).values():
+            self.forms.setdefault((spec.endpoint, spec.method), []).append(spec)
+
+    def validate(
+        self, endpoint: str, method: str, payload: Mapping[str, Any]
+    ) -> FormSpec:
+        """The form ``payload`` was accepted by.
+
+        Raises ``KeyError`` when no form submits to ``endpoint`` with
+        ``method`` and ``SubmissionError`` when the payload breaks a rule
+        (of the closest form when several share the endpoint).
+        """
+        specs = self.forms[(endpoint, method.upper())]
+        if len(specs) > 1:
+            names = payload.keys()
+            specs = sorted(specs, key=lambda spec: not spec.fields.keys() >= names)
+        best: Optional[Dict[str, str]] = None
+        for spec in specs:
+            errors = spec.check(payload)
+            if not errors:
+                return spec
+            if best is None or len(errors) < len(best):
+                best = errors
+        raise SubmissionError(best or {})
+
+
+class RouterCache:
+    """Thread-safe LRU of ``SubmissionRouter`` objects keyed by schema.
+
+    The key is any stable content key (a ``SchemaStore`` key, or
+    ``schema_hash(schema, relabel_ids=False)`` when none is given).
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, SubmissionRouter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def router(
+        self, schema: PromptiusGuiSchema, content_hash: Optional[str] = None
+    ) -> SubmissionRouter:
+        key = content_hash or schema_hash(schema, relabel_ids=False)
+        with self._lock:
+            router = self._data.get(key)
+            if router is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return router
+            self.misses += 1
+        router = SubmissionRouter(schema)
+        with self._lock:
+            self._data[key] = router
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return router
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schema_key TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    method TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_endpoint ON submissions (endpoint, id);
+"""
+
+
+class Submission(NamedTuple):
+    id: int
+    schema_key: str
+    endpoint: str
+    method: str
+    payload: Dict[str, Any]
+    created: float
+
+
+class SubmissionBacklogFull(RuntimeError):
+    """``SubmissionStore`` has ``max_pending`` rows waiting to be written."""
+
+
+class SubmissionStore:
+    """SQLite store of accepted submissions with batched (group) commits.
+
+    A batch that fails to commit is retried ``retries`` times with growing
+    pauses; if it still fails, only the callers waiting on its rows see the
+    error and the writer goes on with the next batch. Rows added without
+    ``wait`` in such a batch are dropped and counted in ``dropped``. At most
+    ``max_pending`` rows queue up; ``add`` then waits up to
+    ``backlog_timeout`` seconds for room and raises ``SubmissionBacklogFull``.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        batch_size: int = 500,
+        flush_interval: float = 0.005,
+        max_pending: int = 50_000,
+        retries: int = 3,
+        backlog_timeout: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backlog_timeout = backlog_timeout
+        self.batches = 0
+        self.dropped = 0
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA_SQL)
+        self._lock = threading.Lock()  # guards the connection
+        self._cond = threading.Condition()  # guards everything below
+        self._pending: List[Tuple[str, str, str, bytes, float]] = []
+        self._queued = 0  # tickets handed out
+        self._done = 0  # tickets written or failed
+        self._waiting: Dict[int, Optional[BaseException]] = {}
+        self._failed_upto = 0  # last ticket of the latest failed batch
+        self._failure: Optional[BaseException] = None
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._run, name="submission-writer", daemon=True
+        )
+        self._writer.start()
+
+    def add(
+        self,
+        schema_key: str,
+        endpoint: str,
+        method: str,
+        payload: Mapping[str, Any],
+        wait: bool = True,
+    ) -> None:
+        """Queue one submission; with ``wait`` return once it is committed."""
+        row = (
+            schema_key,
+            endpoint,
+            method,
+            json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+            time.time(),
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SubmissionStore is closed")
+            if len(self._pending) >= self.max_pending:
+                self._cond.notify_all()
+                if not self._cond.wait_for(
+                    lambda: len(self._pending) < self.max_pending or self._closed,
+                    self.backlog_timeout,
+                ):
+                    raise SubmissionBacklogFull(
+                        f"{len(self._pending)} submissions waiting to be written"
+                    )
+                if self._closed:
+                    raise RuntimeError("SubmissionStore is closed")
+            self._pending.append(row)
+            self._queued += 1
+            ticket = self._queued
+            if len(self._pending) in (1, self.batch_size):
+                self._cond.notify_all()
+            if not wait:
+                return
+            self._waiting[ticket] = None
+            try:
+                while self._done < ticket:
+                    self._cond.wait()
+            finally:
+                error = self._waiting.pop(ticket)
+        if error is not None:
+            raise error
+
+    def flush(self) -> None:
+        """Wait until every queued submission is written.
+
+        Raises the latest commit error if a batch queued before the call
+        could not be written.
+        """
+        with self._cond:
+            target = self._queued
+            start = self._done
+            self._cond.notify_all()
+            while self._done < target:
+                self._cond.wait()
+            if self._failed_upto > start and self._failure is not None:
+                raise self._failure
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # The first queued row starts the batch window
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                rows = self._pending[: self.batch_size]
+                del self._pending[: self.batch_size]
+                first = self._done + 1
+                last = self._done + len(rows)
+                self._cond.notify_all()  # room in the backlog
+            error = self._write_retrying(rows)
+            with self._cond:
+                if error is not None:
+                    self._failure = error
+                    self._failed_upto = last
+                    waiting = [t for t in range(first, last + 1) if t in self._waiting]
+                    for ticket in waiting:
+                        self._waiting[ticket] = error
+                    self.dropped += len(rows) - len(waiting)
+                self._done = last
+                self._cond.notify_all()
+
+    def _write_retrying(
+        self, rows: List[Tuple[str, str, str, bytes, float]]
+    ) -> Optional[BaseException]:
+        """Write ``rows``; the last error if every attempt failed."""
+        delay = 0.05
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(rows)
+                return None
+            except Exception as exc:
+                if attempt == self.retries:
+                    return exc
+            time.sleep(delay)
+            delay *= 4
+        return None
+
+    def _write(self, rows: List[Tuple[str, str, str, bytes, float]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO submissions "
+                "(schema_key, endpoint, method, payload, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.batches += 1
+
+    def count(self, endpoint: Optional[str] = None) -> int:
+        """Committed submissions, all or to ``endpoint``."""
+        sql = "SELECT COUNT(*) FROM submissions"
+        args: Tuple[str, ...] = ()
+        if endpoint is not None:
+            sql, args = sql + " WHERE endpoint = ?", (endpoint,)
+        with self._lock:
+            return int(self._conn.execute(sql, args).fetchone()[0])
+
+    def iter(self, endpoint: str, after: int = 0) -> Iterator[Submission]:
+        """Committed submissions to ``endpoint`` with ids above ``after``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, schema_key, endpoint, method, payload, created "
+                "FROM submissions WHERE endpoint = ? AND id > ? ORDER BY id",
+                (endpoint, after),
+            ).fetchall()
+        for row_id, schema_key, row_endpoint, method, payload, created in rows:
+            yield Submission(
+                row_id, schema_key, row_endpoint, method, json.loads(payload), created
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._conn.close()
+
+    def __enter__(self) -> "SubmissionStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
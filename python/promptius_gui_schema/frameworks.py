@@ -0,0 +1,187 @@
+"""
+Retargeting schemas between UI frameworks without an LLM call.
+
+The schema is framework neutral except for ``metadata.framework``, but the
+adapters in ``js/packages`` do not render every prop value distinctly:
+Chakra UI buttons are only solid or outline, Ant Design has no button or
+input sizes and no card shadows, Material UI text fields have no large size,
+Ant Design titles stop at level 5. ``retarget`` rewrites those props to the
+value the target adapter actually renders, so a stored schema describes what
+the user sees, and switches ``metadata.framework``.
+
+Retargeting always starts from the generated schema, never from another
+variant, because the rewrites lose information (``ghost`` and ``primary``
+are one Chakra variant). ``VariantCache`` computes all four variants on the
+first request and files them under the source's content hash and under each
+variant's own hash, so later switches are a dictionary lookup.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from . import Framework, Node, PromptiusGuiSchema
+from .canonical import schema_hash
+
+FRAMEWORKS = tuple(framework.value for framework in Framework)
+
+# Framework -> (node type, prop) -> {value: value the adapter renders alike},
+# read off each adapter's render function in js/packages/<framework>.
+# shadcn (and the pre-renderer) renders every value, so it has no rules.
+RETARGET_RULES: Dict[str, Dict[Tuple[str, str], Mapping[Any, Any]]] = {
+    "shadcn": {},
+    "material-ui": {
+        # Button gets no size prop
+        ("button", "size"): {"sm": "md", "lg": "md"},
+        # TextField is passed the raw size; only 'small' differs from medium
+        ("input", "size"): {"sm": "md", "lg": "md"},
+    },
+    "chakra-ui": {
+        # variant is 'outline' for outline and 'solid' for everything else
+        # (red for destructive)
+        ("button", "variant"): {"secondary": "primary", "ghost": "primary"},
+        # Input gets no size prop
+        ("input", "size"): {"sm": "md", "lg": "md"},
+        # Card gets no elevation prop
+        ("card", "elevation"): {0: 1, 2: 1, 3: 1, 4: 1, 5: 1},
+        # Alerts render as plain Text; the variant is dropped
+        ("alert", "variant"): {"success": "info", "warning": "info", "error": "info"},
+    },
+    "ant-design": {
+        # 'default' type for both, no size prop passed
+        ("button", "variant"): {"outline": "secondary"},
+        ("button", "size"): {"sm": "md", "lg": "md"},
+        # Input gets no size prop
+        ("input", "size"): {"sm": "md", "lg": "md"},
+        # Card gets no elevation prop
+        ("card", "elevation"): {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+        # Typography.Title levels are 1-5; span and label are both Text
+        ("text", "tag"): {"h6": "h5", "label": "span"},
+    },
+}
+
+
+def _rules_by_type(framework: str) -> Dict[str, Dict[str, Mapping[Any, Any]]]:
+    by_type: Dict[str, Dict[str, Mapping[Any, Any]]] = {}
+    for (node_type, prop), mapping in RETARGET_RULES[framework].items():
+        by_type.setdefault(node_type, {})[prop] = mapping
+    return by_type
+
+
+_RULES = {framework: _rules_by_type(framework) for framework in FRAMEWORKS}
+
+
+def _check_framework(framework: str) -> None:
+    if framework not in _RULES:
+        raise ValueError(
+            f"Unknown framework '{framework}', expected one of {FRAMEWORKS}"
+        )
+
+
+def _retarget_node(node: Node, rules: Dict[str, Mapping[Any, Any]]) -> Node:
+    props = node.props
+    update: Dict[str, Any] = {}
+    for prop, mapping in rules.items():
+        value = getattr(props, prop)
+        key = value.value if isinstance(value, Enum) else value
+        if key in mapping:
+            replacement = mapping[key]
+            if isinstance(value, Enum):
+                replacement = type(value)(replacement)
+            update[prop] = replacement
+    if not update:
+        return node
+    return node.model_copy(update={"props": props.model_copy(update=update)})
+
+
+def retarget(schema: PromptiusGuiSchema, framework: str) -> PromptiusGuiSchema:
+    """``schema`` for ``framework``: props the target adapter cannot render
+    distinctly are replaced by the value it renders, nodes without such
+    props are shared with ``schema``."""
+    _check_framework(framework)
+    by_type = _RULES[framework]
+    nodes = [
+        _retarget_node(node, by_type[node.type]) if node.type in by_type else node
+        for node in schema.nodes
+    ]
+    metadata = schema.metadata
+    if metadata.framework.value != framework:
+        metadata = metadata.model_copy(update={"framework": Framework(framework)})
+    return schema.model_copy(update={"metadata": metadata, "nodes": nodes})
+
+
+def variants(schema: PromptiusGuiSchema) -> Dict[str, PromptiusGuiSchema]:
+    """``retarget`` of ``schema`` for every framework."""
+    return {framework: retarget(schema, framework) for framework in FRAMEWORKS}
+
+
+_Entry = Tuple[str, Dict[str, PromptiusGuiSchema]]
+
+
+class VariantCache:
+    """Thread-safe LRU of framework variants keyed by content hash.
+
+    A miss computes all four variants at once. The entry is reachable from
+    the source hash and from each variant's hash, so a client holding any
+    variant switches without recomputing (or drifting from the source).
+    Retargeting is lossy, so two sources can share a variant (a ghost and an
+    outline button are one Chakra variant); such a hash belongs to neither
+    source and is never used as an alias. Requests for it retarget the
+    schema as given, uncached.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # hash -> (source hash, variants); None marks a hash shared by sources
+        self._data: "OrderedDict[str, Optional[_Entry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        schema: PromptiusGuiSchema,
+        framework: str,
+        content_hash: Optional[str] = None,
+    ) -> PromptiusGuiSchema:
+        """``schema`` retargeted to ``framework``.
+
+        Pass ``content_hash`` (``schema_hash(schema, relabel_ids=False)``)
+        when it is already known to skip rehashing.
+        """
+        _check_framework(framework)
+        key = content_hash or schema_hash(schema, relabel_ids=False)
+        with self._lock:
+            ambiguous = key in self._data and self._data[key] is None
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1][framework]
+            self.misses += 1
+        if ambiguous:
+            return retarget(schema, framework)
+        computed = variants(schema)
+        keys = {
+            schema_hash(variant, relabel_ids=False) for variant in computed.values()
+        }
+        keys.discard(key)
+        with self._lock:
+            self._data[key] = (key, computed)
+            self._data.move_to_end(key)
+            for alias in keys:
+                current = self._data.get(alias, (key, computed))
+                if current is not None and current[0] == key:
+                    self._data[alias] = (key, computed)
+                elif current is not None and current[0] != alias:
+                    self._data[alias] = None
+                self._data.move_to_end(alias)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return computed[framework]
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,277 @@
+"""
+Graph index over a PromptiusGuiSchema.
+
+The schema stores nodes, edges and events as flat lists. ``GraphIndex`` builds
+the lookup maps the renderer needs (node by id, ``order``-sorted children,
+events by node) once, and provides iterative traversals from ``rootId`` so deep
+UIs never hit the recursion limit.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from . import Edge, Event, Node, PromptiusGuiSchema
+
+_by_order = attrgetter("order")
+
+
+@dataclass
+class Subgraph:
+    """Part of a schema: nodes, the edges among them and their events.
+
+    ``more`` maps each node whose children were cut off to its total number
+    of children in the full graph.
+    """
+
+    nodes: List[Node] = field(default_factory=list)
+    edges: List[Edge] = field(default_factory=list)
+    events: List[Event] = field(default_factory=list)
+    more: Dict[str, int] = field(default_factory=dict)
+
+
+class GraphIndex:
+    """Lookup maps and traversals for one schema.
+
+    Built from a complete schema, or incrementally with ``add_node``,
+    ``add_edge`` and ``add_event`` followed by ``finish`` (as the streaming
+    loader does).
+    """
+
+    def __init__(
+        self, schema: Optional[PromptiusGuiSchema] = None, root_id: str = ""
+    ) -> None:
+        self.schema = schema
+        self.root_id = schema.metadata.rootId if schema is not None else root_id
+        self.nodes: Dict[str, Node] = {}
+        self.child_edges: Dict[str, List[Edge]] = {}
+        self.events: Dict[str, List[Event]] = {}
+        if schema is not None:
+            for node in schema.nodes:
+                self.add_node(node)
+            for edge in schema.edges:
+                self.add_edge(edge)
+            for event in schema.events:
+                self.add_event(event)
+            self.finish()
+
+    def add_node(self, node: Node) -> None:
+        self.nodes[node.id] = node
+
+    def add_edge(self, edge: Edge) -> None:
+        self.child_edges.setdefault(edge.src, []).append(edge)
+
+    def add_event(self, event: Event) -> None:
+        self.events.setdefault(event.nodeId, []).append(event)
+
+    def finish(self) -> "GraphIndex":
+        """Sort children by ``order`` (stable for equal orders)."""
+        for edges in self.child_edges.values():
+            edges.sort(key=_by_order)
+        return self
+
+    def children(self, node_id: str) -> List[str]:
+        """Child ids of ``node_id`` in rendering order."""
+        return [edge.dest for edge in self.child_edges.get(node_id, ())]
+
+    def walk(self, start: Optional[str] = None) -> Iterator[Tuple[Node, int]]:
+        """Yield ``(node, depth)`` in rendering (pre-)order from ``start``.
+
+        Each node is visited once; edges to unknown ids and edges that would
+        revisit a node (shared children, cycles) are skipped.
+        """
+        start = self.root_id if start is None else start
+        if start not in self.nodes:
+            return
+        seen: Set[str] = {start}
+        stack = [(start, 0)]
+        while stack:
+            node_id, depth = stack.pop()
+            yield self.nodes[node_id], depth
+            for edge in reversed(self.child_edges.get(node_id, ())):
+                if edge.dest in self.nodes and edge.dest not in seen:
+                    seen.add(edge.dest)
+                    stack.append((edge.dest, depth + 1))
+
+    def subgraph(
+        self,
+        roots: Iterable[str],
+        max_fan_out: Optional[int] = None,
+        page_size: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ) -> Subgraph:
+        """Nodes reachable from ``roots`` (pre-order), with edges and events.
+
+        A node with more than ``max_fan_out`` children keeps only its first
+        ``page_size`` (default ``max_fan_out``); nodes at ``max_depth`` below
+        a root keep none. Both are listed in ``more``. Cost is proportional to
+        the returned subgraph, not to the whole schema.
+        """
+        limit = page_size if page_size is not None else max_fan_out
+        result = Subgraph()
+        seen: Set[str] = set()
+        stack = [(r, 0) for r in reversed(list(roots)) if r in self.nodes]
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            result.nodes.append(self.nodes[node_id])
+            result.events.extend(self.events.get(node_id, ()))
+            edges = self.child_edges.get(node_id, ())
+            if max_depth is not None and depth >= max_depth:
+                if edges:
+                    result.more[node_id] = len(edges)
+                continue
+            if max_fan_out is not None and len(edges) > max_fan_out:
+                result.more[node_id] = len(edges)
+                edges = edges[:limit]
+            for edge in edges:
+                if edge.dest in self.nodes:
+                    result.edges.append(edge)
+            for edge in reversed(edges):
+                if edge.dest in self.nodes and edge.dest not in seen:
+                    stack.append((edge.dest, depth + 1))
+        return result
+
+    def orphans(self) -> List[str]:
+        """Ids of nodes not reachable from the root, in insertion order."""
+        reachable = {node.id for node, _ in self.walk()}
+        return [node_id for node_id in self.nodes if node_id not in reachable]
+
+
+def subtree(
+    source: "PromptiusGuiSchema | GraphIndex",
+    node_id: str,
+    depth: Optional[int] = None,
+) -> Subgraph:
+    """Subgraph rooted at ``node_id``, ``depth`` levels deep (all if ``None``).
+
+    Nodes whose children lie beyond ``depth`` are listed in ``more`` with
+    their child counts. Pass a ``GraphIndex`` that is kept around to make
+    repeated fetches cost only the size of the returned subtree. Raises
+    ``KeyError`` for an unknown node.
+    """
+    index = source if isinstance(source, GraphIndex) else GraphIndex(source)
+    if node_id not in index.nodes:
+        raise KeyError(node_id)
+    return index.subgraph([node_id], max_depth=depth)
+
+
+class GraphIssue(NamedTuple):
+    """A structural problem that field validation cannot see."""
+
+    code: str
+    node_id: str
+    node_type: str
+    field: str
+    message: str
+
+
+def check_graph(
+    source: "PromptiusGuiSchema | GraphIndex",
+) -> List[GraphIssue]:
+    """Structural checks on a validated schema.
+
+    Reports duplicate node ids, a ``rootId`` that is not a node, edges and
+    events pointing at unknown nodes, and edges closing a cycle. Orphan nodes
+    are allowed by the schema and are not reported. Duplicate ids are only
+    visible when given the schema itself.
+    """
+    if isinstance(source, GraphIndex):
+        index, schema = source, source.schema
+    else:
+        index, schema = GraphIndex(source), source
+    nodes = index.nodes
+    issues: List[GraphIssue] = []
+
+    def type_of(node_id: str, default: str) -> str:
+        node = nodes.get(node_id)
+        return node.type if node is not None else default
+
+    if schema is not None:
+        seen: Set[str] = set()
+        for node in schema.nodes:
+            if node.id in seen:
+                issues.append(
+                    GraphIssue(
+                        "duplicate_id",
+                        node.id,
+                        node.type,
+                        "id",
+                        f"duplicate node id {node.id!r}",
+                    )
+                )
+            seen.add(node.id)
+    if index.root_id not in nodes:
+        issues.append(
+            GraphIssue(
+                "missing_root",
+                index.root_id,
+                "metadata",
+                "rootId",
+                f"rootId {index.root_id!r} is not a node",
+            )
+        )
+    for src, edges in index.child_edges.items():
+        for edge in edges:
+            for end, name in ((src, "src"), (edge.dest, "dest")):
+                if end not in nodes:
+                    other = edge.dest if name == "src" else src
+                    issues.append(
+                        GraphIssue(
+                            "dangling_edge",
+                            end,
+                            type_of(other, "edge"),
+                            f"edges.{name}",
+                            f"edge {src!r} -> {edge.dest!r}: unknown {name}",
+                        )
+                    )
+    for node_id, events in index.events.items():
+        if node_id not in nodes:
+            for event in events:
+                issues.append(
+                    GraphIssue(
+                        "unknown_event_node",
+                        node_id,
+                        f"{event.action.type} action",
+                        "events.nodeId",
+                        f"{event.eventType.value} event on unknown node {node_id!r}",
+                    )
+                )
+
+    # Iterative three-colour DFS; an edge into a node still on the stack
+    # closes a cycle.
+    state: Dict[str, int] = {}
+    for start in nodes:
+        if start in state:
+            continue
+        state[start] = 1
+        stack = [(start, iter(index.child_edges.get(start, ())))]
+        while stack:
+            node_id, edges = stack[-1]
+            for edge in edges:
+                dest = edge.dest
+                if dest not in nodes:
+                    continue
+                mark = state.get(dest)
+                if mark is None:
+                    state[dest] = 1
+                    stack.append((dest, iter(index.child_edges.get(dest, ()))))
+                    break
+                if mark == 1:
+                    issues.append(
+                        GraphIssue(
+                            "cycle",
+                            dest,
+                            nodes[dest].type,
+                            "edges.dest",
+                            f"edge {node_id!r} -> {dest!r} closes a cycle",
+                        )
+                    )
+            else:
+                state[node_id] = 2
+                stack.pop()
+    return issues
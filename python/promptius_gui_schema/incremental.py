@@ -0,0 +1,370 @@
+"""
+Incremental validation of a schema document while it is being generated.
+
+``IncrementalValidator`` is fed the LLM's output as it streams in. A push
+scanner tracks the JSON path of every value and validates each value as soon
+as its closing byte arrives, most specific first: a node's ``type`` when the
+string ends, each prop against its field's type and constraints once the
+node type is known, then the whole ``props`` object and the whole node (same
+for ``metadata`` fields, edges and event actions). The first hard error is
+raised as ``IncrementalError`` with its byte offset, so a caller can stop the
+upstream generation instead of paying for the remaining tokens.
+
+Validation uses the Pydantic models; ``close()`` returns the assembled
+``PromptiusGuiSchema`` once the document is complete. With ``chart_free``
+the document is expected to follow ``chart_free_schema()``: chart props get
+the placeholders of ``complete_charts`` before they are checked, and
+``fix_charts`` computes the real values afterwards.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing_extensions import Annotated
+
+from . import Edge, Event, EventAction, Node, PromptiusGuiSchema, UIMetadata
+from .charts import chart_placeholders
+from .compact import NODE_TYPES
+
+Path = Tuple[Union[str, int], ...]
+
+_STRING_END = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb"[,\]}\s]")
+_WHITESPACE = b" \t\r\n"
+_REQUIRED = ("metadata", "nodes", "edges", "events")
+
+_node_adapter: TypeAdapter[Node] = TypeAdapter(
+    Annotated[Node, Field(discriminator="type")]
+)
+_action_adapter: TypeAdapter[EventAction] = TypeAdapter(
+    Annotated[EventAction, Field(discriminator="type")]
+)
+
+# Scanner states
+_VALUE = 0  # a value (or, right after '[', the end of the array)
+_KEY = 1  # an object key (or, right after '{', the end of the object)
+_COLON = 2
+_NEXT = 3  # ',' or the end of the current container
+_DONE = 4  # the root value is complete
+
+
+class IncrementalError(ValueError):
+    """First hard error in a streamed document, at byte ``offset``."""
+
+    def __init__(self, message: str, offset: int, path: Path = ()) -> None:
+        where = "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in path)
+        where = where.lstrip(".") or "document"
+        super().__init__(f"{message} at {where} (byte {offset})")
+        self.offset = offset
+        self.path = path
+
+
+_field_adapters: Dict[Tuple[Type[BaseModel], str], Optional[TypeAdapter]] = {}
+
+
+def _field_adapter(model: Type[BaseModel], name: str) -> Optional[TypeAdapter]:
+    """Adapter validating one field of ``model`` on its own, constraints
+    included; ``None`` for names that are not fields (ignored as extras)."""
+    key = (model, name)
+    if key not in _field_adapters:
+        info = model.model_fields.get(name)
+        if info is None:
+            _field_adapters[key] = None
+        elif info.metadata:
+            annotated = Annotated[tuple([info.annotation] + list(info.metadata))]
+            _field_adapters[key] = TypeAdapter(annotated)
+        else:
+            _field_adapters[key] = TypeAdapter(info.annotation)
+    return _field_adapters[key]
+
+
+def _props_model(node_type: str) -> Type[BaseModel]:
+    return NODE_TYPES[node_type].model_fields["props"].annotation
+
+
+class _Frame:
+    __slots__ = ("is_object", "start", "key")
+
+    def __init__(self, is_object: bool, start: int) -> None:
+        self.is_object = is_object
+        self.start = start
+        self.key: Union[str, int] = "" if is_object else 0
+
+
+class IncrementalValidator:
+    """Validates a ``PromptiusGuiSchema`` JSON document fed in pieces.
+
+    ``feed`` returns the ``(section, item)`` pairs completed by the new data
+    (``"metadata"``, ``"nodes"``, ``"edges"`` or ``"events"`` with the
+    validated model) and raises ``IncrementalError`` on the first invalid
+    value; after an error every further call raises it again.
+    """
+
+    def __init__(self, chart_free: bool = False) -> None:
+        self.chart_free = chart_free
+        self.buffer = bytearray()
+        self.error: Optional[IncrementalError] = None
+        self.keys: Set[str] = set()
+        self.metadata: Optional[UIMetadata] = None
+        self.nodes: List[Any] = []
+        self.edges: List[Edge] = []
+        self.events: List[Event] = []
+        self._pos = 0
+        self._state = _VALUE
+        self._stack: List[_Frame] = []
+        self._node_types: Dict[int, str] = {}
+        self._done: List[Tuple[str, Any]] = []
+
+    @property
+    def offset(self) -> int:
+        """Bytes scanned so far."""
+        return self._pos
+
+    def feed(self, data: Union[str, bytes]) -> List[Tuple[str, Any]]:
+        if self.error is not None:
+            raise self.error
+        self.buffer += data.encode("utf-8") if isinstance(data, str) else data
+        self._done = []
+        try:
+            self._scan(final=False)
+        except IncrementalError as exc:
+            self.error = exc
+            raise
+        return self._done
+
+    def close(self) -> PromptiusGuiSchema:
+        """Finish the document and return the schema built from its items."""
+        if self.error is not None:
+            raise self.error
+        try:
+            self._scan(final=True)
+            if self._state != _DONE:
+                raise IncrementalError("Unexpected end of input", len(self.buffer))
+            end = len(self.buffer)
+            missing = [key for key in _REQUIRED if key not in self.keys]
+            if missing:
+                raise IncrementalError(f"Missing required keys {missing}", end)
+            if not self.nodes:
+                raise IncrementalError("nodes must not be empty", end, ("nodes",))
+        except IncrementalError as exc:
+            self.error = exc
+            raise
+        return PromptiusGuiSchema.model_construct(
+            metadata=self.metadata,
+            nodes=self.nodes,
+            edges=self.edges,
+            events=self.events,
+        )
+
+    # ------------------------------------------------------------------ scan
+
+    def _path(self) -> Path:
+        return tuple(frame.key for frame in self._stack)
+
+    def _scan(self, final: bool) -> None:
+        buf = self.buffer
+        end = len(buf)
+        i = self._pos
+        stack = self._stack
+        while i < end:
+            char = buf[i]
+            if char in _WHITESPACE:
+                i += 1
+                continue
+            state = self._state
+            if state == _DONE:
+                raise IncrementalError("Unexpected data after the document", i)
+            if state == _COLON:
+                if char != 0x3A:  # ':'
+                    raise IncrementalError("Expected ':'", i, self._path())
+                self._state = _VALUE
+                i += 1
+            elif state == _NEXT or (
+                state in (_VALUE, _KEY) and char in (0x5D, 0x7D) and stack
+            ):
+                i = self._after_value(char, i, state)
+            elif state == _KEY:
+                if char != 0x22:
+                    raise IncrementalError("Expected an object key", i, self._path())
+                stop = self._string_end(i + 1)
+                if stop < 0:
+                    break
+                try:
+                    stack[-1].key = json.loads(bytes(buf[i:stop]))
+                except ValueError:
+                    raise IncrementalError(
+                        "Invalid object key", i, self._path()
+                    ) from None
+                if len(stack) == 1:
+                    self.keys.add(stack[-1].key)  # type: ignore[arg-type]
+                self._state = _COLON
+                i = stop
+            elif char == 0x7B or char == 0x5B:  # '{' or '['
+                stack.append(_Frame(char == 0x7B, i))
+                self._state = _KEY if char == 0x7B else _VALUE
+                i += 1
+            else:
+                if char == 0x22:
+                    stop = self._string_end(i + 1)
+                else:
+                    found = _SCALAR_END.search(buf, i)
+                    stop = found.start() if found else (end if final else -1)
+                if stop < 0:
+                    break
+                try:
+                    json.loads(bytes(buf[i:stop]))
+                except ValueError:
+                    raise IncrementalError(
+                        "Invalid JSON value", i, self._path()
+                    ) from None
+                self._check(self._path(), i, stop)
+                self._value_done()
+                i = stop
+        self._pos = i
+
+    def _after_value(self, char: int, i: int, state: int) -> int:
+        stack = self._stack
+        frame = stack[-1]
+        if char == 0x2C and state == _NEXT:  # ','
+            if frame.is_object:
+                self._state = _KEY
+            else:
+                frame.key += 1  # type: ignore[operator]
+                self._state = _VALUE
+            return i + 1
+        closing = 0x7D if frame.is_object else 0x5D
+        if char != closing or (state == _KEY and frame.key != "") or (
+            state == _VALUE and (frame.is_object or frame.key != 0)
+        ):
+            # Trailing commas and mismatched brackets.
+            raise IncrementalError("Unexpected character", i, self._path())
+        stack.pop()
+        self._check(self._path(), frame.start, i + 1)
+        self._value_done()
+        return i + 1
+
+    def _value_done(self) -> None:
+        self._state = _NEXT if self._stack else _DONE
+
+    def _string_end(self, i: int) -> int:
+        """Index just past the closing quote, or -1 if it has not arrived."""
+        buf = self.buffer
+        while True:
+            found = _STRING_END.search(buf, i)
+            if found is None:
+                return -1
+            if buf[found.start()] == 0x5C:  # backslash escape
+                i = found.start() + 2
+                continue
+            return found.start() + 1
+
+    # -------------------------------------------------------------- validate
+
+    def _validate(
+        self,
+        target: Any,
+        start: int,
+        stop: int,
+        path: Path,
+        fill: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Validate ``buffer[start:stop]`` against a model or ``TypeAdapter``,
+        after passing the parsed value through ``fill`` if given."""
+        data = bytes(self.buffer[start:stop])
+        if fill is not None:
+            data = json.dumps(fill(json.loads(data))).encode("utf-8")
+        try:
+            if isinstance(target, TypeAdapter):
+                return target.validate_json(data)
+            return target.model_validate_json(data)
+        except ValidationError as exc:
+            error = exc.errors(include_url=False)[0]
+            loc = tuple(p for p in error["loc"] if p not in NODE_TYPES)
+            raise IncrementalError(error["msg"], start, path + loc) from None
+
+    def _check(self, path: Path, start: int, stop: int) -> None:
+        depth = len(path)
+        if path == ("metadata",):
+            self.metadata = self._validate(UIMetadata, start, stop, path)
+            self._done.append(("metadata", self.metadata))
+            return
+        if depth < 2:
+            if depth == 1 and path[0] in _REQUIRED and self.buffer[start] != 0x5B:
+                raise IncrementalError("Input should be a valid array", start, path)
+            return
+        section, index = path[0], path[1]
+        if section == "metadata":
+            if depth == 2 and isinstance(index, str):
+                adapter = _field_adapter(UIMetadata, index)
+                if adapter is not None:
+                    self._validate(adapter, start, stop, path)
+            return
+        if not isinstance(index, int):
+            return
+        if section == "nodes":
+            self._check_node(path, index, start, stop)
+        elif section == "edges":
+            if depth == 2:
+                edge = self._validate(Edge, start, stop, path)
+                self.edges.append(edge)
+                self._done.append(("edges", edge))
+            elif depth == 3:
+                adapter = _field_adapter(Edge, str(path[2]))
+                if adapter is not None:
+                    self._validate(adapter, start, stop, path)
+        elif section == "events":
+            if depth == 2:
+                event = self._validate(Event, start, stop, path)
+                self.events.append(event)
+                self._done.append(("events", event))
+            elif depth == 3 and path[2] == "action":
+                self._validate(_action_adapter, start, stop, path)
+            elif depth == 3:
+                adapter = _field_adapter(Event, str(path[2]))
+                if adapter is not None:
+                    self._validate(adapter, start, stop, path)
+
+    def _check_node(self, path: Path, index: int, start: int, stop: int) -> None:
+        depth = len(path)
+        chart = self.chart_free and self._node_types.get(index) == "chart"
+        if depth == 2:
+            fill = _fill_chart_node if chart else None
+            node = self._validate(_node_adapter, start, stop, path, fill)
+            self.nodes.append(node)
+            self._done.append(("nodes", node))
+            return
+        field = path[2]
+        if depth == 3 and field == "type":
+            node_type = json.loads(bytes(self.buffer[start:stop]))
+            if not isinstance(node_type, str) or node_type not in NODE_TYPES:
+                raise IncrementalError(
+                    f"Unknown node type {node_type!r}", start, path
+                )
+            self._node_types[index] = node_type
+            return
+        node_type = self._node_types.get(index)
+        if node_type is None or field != "props":
+            return
+        if depth == 3:
+            props_fill = _fill_chart_props if chart else None
+            self._validate(_props_model(node_type), start, stop, path, props_fill)
+        elif depth == 4 and chart and path[3] in ("xAxis", "yAxis"):
+            return  # incomplete on its own; checked with the whole props
+        elif depth == 4:
+            adapter = _field_adapter(_props_model(node_type), str(path[3]))
+            if adapter is not None:
+                self._validate(adapter, start, stop, path)
+
+
+def _fill_chart_props(props: Any) -> Any:
+    return chart_placeholders(props) if isinstance(props, dict) else props
+
+
+def _fill_chart_node(node: Any) -> Any:
+    if isinstance(node, dict):
+        _fill_chart_props(node.get("props"))
+    return node
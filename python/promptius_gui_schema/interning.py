@@ -0,0 +1,99 @@
+"""
+String interning for large in-process caches of validated schemas.
+
+Schemas generated for one product repeat the same strings over and over:
+``type`` literals, enum-like values, ids such as ``"root"`` or
+``"submit-btn"``, labels and descriptions. Pydantic's JSON parser only shares
+short strings through a small global cache, so a cache of many schemas holds
+many copies. ``StringPool`` validates as usual and then swaps every string in
+the resulting models for one pooled copy, and shares the per-model
+``__pydantic_fields_set__`` sets, which are identical for fully populated
+models of one class. Enum fields already hold the enum singletons.
+
+The pool keeps its strings alive. It holds at most ``max_strings`` of them
+and starts over when full, so a long-running process whose schemas keep
+bringing new labels does not grow it without bound; models interned before
+keep the copies they share. A pool per cache (or per batch) scopes it further.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, Optional, Set, Union
+
+from pydantic import BaseModel
+
+from . import PromptiusGuiSchema
+
+DEFAULT_MAX_STRINGS = 100_000
+
+
+class StringPool:
+    """Validates schemas, sharing equal strings and field sets between them.
+
+    ``max_strings`` caps the pool (``None`` for no cap); see the module.
+    """
+
+    def __init__(
+        self,
+        share_fields_set: bool = True,
+        max_strings: Optional[int] = DEFAULT_MAX_STRINGS,
+    ) -> None:
+        self.share_fields_set = share_fields_set
+        self.max_strings = max_strings
+        self._strings: Dict[str, str] = {}
+        self._fields_sets: Dict[FrozenSet[str], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def intern(self, value: str) -> str:
+        pooled = self._strings.get(value)
+        return self._add(value) if pooled is None else pooled
+
+    def _add(self, value: str) -> str:
+        if self.max_strings is not None and len(self._strings) >= self.max_strings:
+            self._strings.clear()
+        self._strings[value] = value
+        return value
+
+    def validate_json(self, data: Union[str, bytes, bytearray]) -> PromptiusGuiSchema:
+        return self.intern_model(PromptiusGuiSchema.model_validate_json(data))
+
+    def validate_python(self, data: Any) -> PromptiusGuiSchema:
+        return self.intern_model(PromptiusGuiSchema.model_validate(data))
+
+    def intern_model(self, model: BaseModel) -> BaseModel:
+        """Replace the strings inside ``model`` (recursively) with pooled ones.
+
+        Works in place and returns ``model``; the models must not be mutated
+        afterwards if field sets are shared.
+        """
+        strings = self._strings
+        add = self._add
+        fields_sets = self._fields_sets
+        share = self.share_fields_set
+        stack = [model]
+        while stack:
+            obj = stack.pop()
+            fields = obj.__dict__
+            for name, value in fields.items():
+                kind = type(value)
+                if kind is str:
+                    pooled = strings.get(value)
+                    fields[name] = add(value) if pooled is None else pooled
+                elif kind is list:
+                    for i, item in enumerate(value):
+                        if type(item) is str:
+                            pooled = strings.get(item)
+                            value[i] = add(item) if pooled is None else pooled
+                        elif isinstance(item, BaseModel):
+                            stack.append(item)
+                elif isinstance(value, BaseModel):
+                    stack.append(value)
+            if share:
+                own = obj.__pydantic_fields_set__
+                key = frozenset(own)
+                shared = fields_sets.setdefault(key, own)
+                if shared is not own:
+                    object.__setattr__(obj, "__pydantic_fields_set__", shared)
+        return model
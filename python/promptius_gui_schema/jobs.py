@@ -0,0 +1,348 @@
+"""
+SQLite-backed job queue for asynchronous UI generation.
+
+Clients submit a prompt and get a job id straight away; worker threads claim
+jobs in priority order and store the result for the client to fetch. Claims run
+in an ``IMMEDIATE`` transaction, so several server processes can share one
+queue file, and per-tenant concurrency caps count running jobs across all of
+them. Bursts wait in the queue instead of being rejected.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+FINISHED = (DONE, FAILED)
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result BLOB,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, created);
+CREATE INDEX IF NOT EXISTS jobs_tenant ON jobs (tenant, status);
+"""
+
+_COLUMNS = (
+    "id, tenant, priority, payload, status, result, error, created, started, finished"
+)
+
+
+@dataclass
+class Job:
+    """One queued generation; ``payload`` is the submitted request body."""
+
+    id: str
+    tenant: str
+    priority: int
+    payload: Dict[str, Any]
+    status: str
+    result: Optional[bytes] = None
+    error: Optional[str] = None
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> "Job":
+        (id_, tenant, priority, payload, status, result, error, created, started,
+         finished) = row
+        return cls(
+            id=id_,
+            tenant=tenant,
+            priority=priority,
+            payload=json.loads(payload),
+            status=status,
+            result=bytes(result) if result is not None else None,
+            error=error,
+            created=created,
+            started=started,
+            finished=finished,
+        )
+
+
+class JobQueue:
+    """Persistent priority queue with per-tenant running caps.
+
+    Higher ``priority`` runs first; equal priorities run in submission order.
+    A tenant with ``cap`` running jobs is skipped until one finishes, so one
+    tenant's burst cannot occupy every worker.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        default_cap: int = 2,
+        tenant_caps: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        self.path = path
+        self.default_cap = default_cap
+        self.tenant_caps: Dict[str, int] = dict(tenant_caps or {})
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA_SQL)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def cap(self, tenant: str) -> int:
+        return self.tenant_caps.get(tenant, self.default_cap)
+
+    def submit(
+        self, payload: Mapping[str, Any], tenant: str = "default", priority: int = 0
+    ) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex,
+            tenant=tenant,
+            priority=priority,
+            payload=dict(payload),
+            status=QUEUED,
+            created=time.time(),
+        )
+        with self._changed:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tenant, priority, payload, status, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, tenant, priority, json.dumps(job.payload), QUEUED, job.created),
+            )
+            self._changed.notify_all()
+        return job
+
+    def claim(self) -> Optional[Job]:
+        """Mark the next runnable job as running and return it, if any."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                running = dict(
+                    self._conn.execute(
+                        "SELECT tenant, COUNT(*) FROM jobs WHERE status = ? "
+                        "GROUP BY tenant",
+                        (RUNNING,),
+                    ).fetchall()
+                )
+                blocked = [t for t, n in running.items() if n >= self.cap(t)]
+                query = f"SELECT {_COLUMNS} FROM jobs WHERE status = ?"
+                if blocked:
+                    query += f" AND tenant NOT IN ({', '.join('?' * len(blocked))})"
+                query += " ORDER BY priority DESC, created LIMIT 1"
+                row = self._conn.execute(query, (QUEUED, *blocked)).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = Job._from_row(row)
+                job.status = RUNNING
+                job.started = time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started = ? WHERE id = ?",
+                    (RUNNING, job.started, job.id),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _finish(
+        self, job_id: str, status: str, result: Optional[bytes], error: Optional[str]
+    ) -> None:
+        with self._changed:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? "
+                "WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            self._changed.notify_all()
+
+    def complete(self, job_id: str, result: bytes) -> None:
+        self._finish(job_id, DONE, result, None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, FAILED, None, error)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return Job._from_row(row) if row is not None else None
+
+    def wait(
+        self, job_id: str, timeout: float, poll_interval: float = 0.25
+    ) -> Optional[Job]:
+        """Return the job once finished or when ``timeout`` expires.
+
+        Completions in this process wake the waiter at once; completions in
+        other processes are noticed within ``poll_interval``.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in FINISHED or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(poll_interval, remaining))
+
+    def position(self, job: Job) -> int:
+        """Number of queued jobs that will be considered before ``job``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND "
+                "(priority > ? OR (priority = ? AND created < ?))",
+                (QUEUED, job.priority, job.priority, job.created),
+            ).fetchone()
+        return int(row[0])
+
+    def depth(self) -> Dict[str, Any]:
+        """Job counts by status, plus queued and running counts per tenant."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tenant, status, COUNT(*) FROM jobs "
+                "WHERE status IN (?, ?) GROUP BY tenant, status",
+                (QUEUED, RUNNING),
+            ).fetchall()
+            totals = dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+        tenants: Dict[str, Dict[str, int]] = {}
+        for tenant, status, count in rows:
+            tenants.setdefault(tenant, {QUEUED: 0, RUNNING: 0})[status] = count
+        return {
+            "status": {s: totals.get(s, 0) for s in (QUEUED, RUNNING, DONE, FAILED)},
+            "tenants": tenants,
+        }
+
+    def requeue_stale(self, older_than: float) -> int:
+        """Put jobs running for more than ``older_than`` seconds back in the queue.
+
+        Recovers jobs whose worker process died mid-generation.
+        """
+        with self._changed:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started = NULL "
+                "WHERE status = ? AND started < ?",
+                (QUEUED, RUNNING, time.time() - older_than),
+            )
+            self._changed.notify_all()
+        return cursor.rowcount
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs older than ``older_than`` seconds."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                (*FINISHED, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+
+class JobWorkerPool:
+    """Threads that claim jobs from ``queue`` and run ``handler`` on them.
+
+    ``handler`` receives the job and returns the result bytes; an exception
+    marks the job failed with the exception message. With ``retention`` set,
+    one more thread purges jobs finished longer than ``retention`` seconds ago
+    every ``purge_interval`` seconds, so the queue file stops growing.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Job], bytes],
+        workers: int = 4,
+        poll_interval: float = 0.25,
+        retention: Optional[float] = None,
+        purge_interval: float = 60.0,
+    ) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.purged = 0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "JobWorkerPool":
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self.retention is not None:
+            thread = threading.Thread(
+                target=self._purge, args=(self.retention,), name="job-purger",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming new jobs and wait for running ones to finish."""
+        self._stop.set()
+        with self.queue._changed:
+            self.queue._changed.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        queue = self.queue
+        while not self._stop.is_set():
+            job = queue.claim()
+            if job is None:
+                with queue._changed:
+                    queue._changed.wait(self.poll_interval)
+                continue
+            try:
+                result = self.handler(job)
+            except Exception as exc:
+                queue.fail(job.id, f"{type(exc).__name__}: {exc}")
+            else:
+                queue.complete(job.id, result)
+
+    def _purge(self, retention: float) -> None:
+        while True:
+            try:
+                self.purged += self.queue.purge(retention)
+            except sqlite3.Error:
+                pass  # e.g. the file is locked by another process; next round
+            if self._stop.wait(self.purge_interval):
+                return
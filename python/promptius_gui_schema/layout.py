@@ -0,0 +1,517 @@
+"""
+Box layout of PromptiusGuiSchema graphs for a given viewport width.
+
+Approximates what the shadcn components (see ``prerender``) produce in a
+browser: containers cap their width at ``maxWidth``, grids split their width
+into ``columns`` tracks (one track below the ``md`` breakpoint when
+``responsive``), stacks flow along ``direction`` with ``gap`` and cards add
+their header and ``padding``. Leaf heights come from the Tailwind line heights
+and control sizes; text wraps at an average glyph width. The result is good
+enough for thumbnails, overflow checks on LLM output and virtualized
+rendering, not for pixel-exact placement.
+
+One iterative traversal from ``rootId`` sizes every subtree bottom-up; a
+second pass turns relative offsets into absolute boxes.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from . import CardNode, GridNode, Node, PromptiusGuiSchema
+from .canonical import Canonical, render_keys
+from .graph import GraphIndex
+
+# Tailwind breakpoints (min widths); "base" is a typical phone.
+BREAKPOINTS: Dict[str, int] = {
+    "base": 375,
+    "sm": 640,
+    "md": 768,
+    "lg": 1024,
+    "xl": 1280,
+    "2xl": 1536,
+}
+
+# (font size, line height) in pixels for each text tag, from prerender.TEXT_TAGS.
+TEXT_METRICS: Dict[str, Tuple[float, float]] = {
+    "h1": (36, 40),
+    "h2": (30, 36),
+    "h3": (24, 32),
+    "h4": (20, 28),
+    "h5": (18, 28),
+    "h6": (16, 24),
+    "p": (16, 28),
+    "span": (16, 24),
+    "label": (14, 14),
+}
+SMALL_TEXT = (14, 20)
+GLYPH_WIDTH = 0.5  # average advance as a fraction of the font size
+BOLD_GLYPH_WIDTH = 0.55
+
+BUTTON_HEIGHTS = {"sm": 36, "md": 40, "lg": 44}
+BUTTON_PADDING = {"sm": 24, "md": 32, "lg": 64}
+INPUT_HEIGHTS = {"sm": 36, "md": 40, "lg": 44}
+FIELD_SPACING = 8  # space-y-2
+BORDER = 1
+CARD_HEADER_PADDING = 24  # p-6
+CARD_TITLE_HEIGHT = 24
+CARD_HEADER_SPACING = 6  # space-y-1.5
+ALERT_PADDING = 16  # p-4
+ALERT_TITLE_HEIGHT = 20  # leading-none title plus mb-1
+CHART_CAPTION_HEIGHT = 32  # caption line plus mb-2
+CHART_LEGEND_HEIGHT = 28  # mt-2 plus one row of entries
+
+_CONTAINERS = frozenset({"container", "card", "grid", "stack"})
+
+
+class Box(NamedTuple):
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @property
+    def right(self) -> float:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> float:
+        return self.y + self.height
+
+    def intersects(self, other: "Box") -> bool:
+        return (
+            self.x < other.right
+            and other.x < self.right
+            and self.y < other.bottom
+            and other.y < self.bottom
+        )
+
+
+def breakpoint_for(width: float) -> str:
+    """Name of the largest breakpoint whose min width is at most ``width``."""
+    name = "base"
+    for candidate, min_width in BREAKPOINTS.items():
+        if candidate != "base" and width >= min_width:
+            name = candidate
+    return name
+
+
+def _text_height(
+    text: str, width: float, metrics: Tuple[float, float], bold: bool = False
+) -> float:
+    size, line = metrics
+    if not text:
+        return 0.0
+    advance = size * (BOLD_GLYPH_WIDTH if bold else GLYPH_WIDTH)
+    per_line = max(1, int(width // advance)) if width > 0 else 1
+    lines = sum(max(1, math.ceil(len(part) / per_line)) for part in text.split("\n"))
+    return lines * line
+
+
+def _text_width(text: str, metrics: Tuple[float, float], bold: bool = False) -> float:
+    size = metrics[0]
+    advance = size * (BOLD_GLYPH_WIDTH if bold else GLYPH_WIDTH)
+    return max((len(part) for part in text.split("\n")), default=0) * advance
+
+
+def preferred_width(node: Node) -> Optional[float]:
+    """Intrinsic width of ``node``, or ``None`` if it fills the space given."""
+    if node.type == "button":
+        button = node.props
+        if button.fullWidth:
+            return None
+        return _text_width(button.label, SMALL_TEXT) + BUTTON_PADDING[button.size.value]
+    if node.type == "text" and node.props.tag.value in ("span", "label"):
+        text = node.props
+        return _text_width(text.content, TEXT_METRICS[text.tag.value], text.bold)
+    if node.type == "chart":
+        return float(node.props.width)
+    return None
+
+
+def _leaf_size(node: Node, width: float) -> Tuple[float, float]:
+    """``(width, height)`` of a component without laid-out children."""
+    if node.type == "button":
+        preferred = preferred_width(node)
+        w = width if preferred is None else min(preferred, width)
+        return w, BUTTON_HEIGHTS[node.props.size.value]
+    if node.type == "input" or node.type == "textarea":
+        h = 0.0
+        if node.props.label:
+            h += TEXT_METRICS["label"][1] + FIELD_SPACING
+        if node.type == "input":
+            h += INPUT_HEIGHTS[node.props.size.value]
+        else:
+            h += max(80, node.props.rows * SMALL_TEXT[1] + 16 + 2 * BORDER)
+        if node.props.helperText:
+            h += FIELD_SPACING + _text_height(node.props.helperText, width, SMALL_TEXT)
+        return width, h
+    if node.type == "text":
+        text = node.props
+        metrics = TEXT_METRICS[text.tag.value]
+        bold = text.bold or text.tag.value.startswith("h")
+        preferred = preferred_width(node)
+        w = width if preferred is None else min(preferred, width)
+        return w, max(metrics[1], _text_height(text.content, w, metrics, bold))
+    if node.type == "alert":
+        alert = node.props
+        inner = width - 2 * (ALERT_PADDING + BORDER)
+        h = 2 * (ALERT_PADDING + BORDER) + _text_height(alert.message, inner, (14, 23))
+        if alert.title:
+            h += ALERT_TITLE_HEIGHT
+        return width, h
+    if node.type == "chart":
+        chart = node.props
+        h = float(chart.height)
+        if chart.title:
+            h += CHART_CAPTION_HEIGHT
+        if chart.showLegend:
+            h += CHART_LEGEND_HEIGHT
+        return float(chart.width), h
+    return width, 0.0
+
+
+def _card_header(node: CardNode, width: float) -> float:
+    p = node.props
+    if not (p.title or p.description):
+        return 0.0
+    h = 2.0 * CARD_HEADER_PADDING
+    inner = width - 2 * CARD_HEADER_PADDING
+    if p.title:
+        h += max(CARD_TITLE_HEIGHT, _text_height(p.title, inner, (24, 24), True))
+    if p.description:
+        h += (CARD_HEADER_SPACING if p.title else 0) + _text_height(
+            p.description, inner, SMALL_TEXT
+        )
+    return h
+
+
+def _grid_columns(node: GridNode, viewport: float) -> int:
+    p = node.props
+    if p.responsive and viewport < BREAKPOINTS["md"]:
+        return 1
+    return int(p.columns)
+
+
+class _Frame:
+    """Layout state of one container while its children are being sized."""
+
+    __slots__ = (
+        "node", "available", "width", "inner_x", "inner_y", "child_widths", "children"
+    )
+
+    def __init__(self, node: Node, width: float) -> None:
+        self.node = node
+        self.available = width
+        self.width = width
+        self.inner_x = 0.0
+        self.inner_y = 0.0
+        self.child_widths: List[float] = []
+        self.children: List[str] = []
+
+
+class Layout:
+    """Absolute boxes for every node reachable from the root.
+
+    ``boxes`` maps node id to its ``Box``; ``order`` lists ids in rendering
+    pre-order and ``parent`` maps each laid-out child to its container.
+    """
+
+    def __init__(
+        self,
+        width: float,
+        boxes: Dict[str, Box],
+        order: List[str],
+        parent: Dict[str, str],
+    ) -> None:
+        self.width = width
+        self.breakpoint = breakpoint_for(width)
+        self.boxes = boxes
+        self.order = order
+        self.parent = parent
+
+    @property
+    def height(self) -> float:
+        return max((box.bottom for box in self.boxes.values()), default=0.0)
+
+    def overflows(self) -> List[str]:
+        """Ids whose box sticks out of their container or the viewport."""
+        found = []
+        for node_id in self.order:
+            box = self.boxes[node_id]
+            parent = self.parent.get(node_id)
+            bound = self.boxes[parent] if parent is not None else None
+            outside = bound is not None and (
+                box.right > bound.right + 0.5 or box.x < bound.x - 0.5
+            )
+            if outside or box.right > self.width + 0.5:
+                found.append(node_id)
+        return found
+
+    def overlaps(self) -> List[Tuple[str, str]]:
+        """Pairs of sibling ids whose boxes intersect."""
+        siblings: Dict[str, List[str]] = {}
+        for node_id in self.order:
+            parent = self.parent.get(node_id)
+            if parent is not None:
+                siblings.setdefault(parent, []).append(node_id)
+        pairs = []
+        for ids in siblings.values():
+            # Siblings are laid out in order, so sort by position and sweep.
+            ordered = sorted(ids, key=lambda i: (self.boxes[i].y, self.boxes[i].x))
+            for i, first in enumerate(ordered):
+                a = self.boxes[first]
+                for second in ordered[i + 1 :]:
+                    b = self.boxes[second]
+                    if b.y >= a.bottom:
+                        break
+                    if a.intersects(b):
+                        pairs.append((first, second))
+        return pairs
+
+    def visible(self, top: float, bottom: float) -> Iterator[str]:
+        """Ids (in rendering order) whose boxes intersect rows ``top..bottom``."""
+        for node_id in self.order:
+            box = self.boxes[node_id]
+            if box.y < bottom and box.bottom > top:
+                yield node_id
+
+
+def compute_layout(
+    schema: Union[PromptiusGuiSchema, GraphIndex], width: float
+) -> Layout:
+    """Lay out ``schema`` for a viewport ``width`` pixels wide."""
+    index = schema if isinstance(schema, GraphIndex) else GraphIndex(schema)
+    nodes = index.nodes
+    root = index.root_id
+    if root not in nodes:
+        return Layout(width, {}, [], {})
+
+    size: Dict[str, Tuple[float, float]] = {}
+    offset: Dict[str, Tuple[float, float]] = {root: (0.0, 0.0)}
+    shift: Dict[str, float] = {}
+    kids: Dict[str, List[str]] = {}
+    seen: Set[str] = {root}
+    # Stack of (node id, available width) to enter, or a _Frame to finish.
+    stack: List[Union[Tuple[str, float], _Frame]] = [(root, float(width))]
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _Frame):
+            _finish(item, size, offset, shift, width)
+            continue
+        node_id, available = item
+        node = nodes[node_id]
+        if node.type not in _CONTAINERS:
+            size[node_id] = _leaf_size(node, available)
+            continue
+        children = [
+            edge.dest
+            for edge in index.child_edges.get(node_id, ())
+            if edge.dest in nodes and edge.dest not in seen
+        ]
+        seen.update(children)
+        frame = _plan(node, available, children, nodes, width)
+        kids[node_id] = children
+        stack.append(frame)
+        for child, child_width in zip(reversed(children), reversed(frame.child_widths)):
+            stack.append((child, child_width))
+
+    boxes: Dict[str, Box] = {}
+    parent: Dict[str, str] = {}
+    order: List[str] = []
+    place = [(root, 0.0, 0.0)]
+    while place:
+        node_id, x, y = place.pop()
+        dx, dy = offset[node_id]
+        w, h = size[node_id]
+        box = Box(x + dx + shift.get(node_id, 0.0), y + dy, w, h)
+        boxes[node_id] = box
+        order.append(node_id)
+        for child in reversed(kids.get(node_id, ())):
+            parent[child] = node_id
+            place.append((child, box.x, box.y))
+    return Layout(width, boxes, order, parent)
+
+
+def _plan(
+    node: Node,
+    available: float,
+    children: List[str],
+    nodes: Dict[str, Node],
+    viewport: float,
+) -> _Frame:
+    """Fix the container's width and the width offered to each child."""
+    frame = _Frame(node, available)
+    frame.children = children
+    n = len(children)
+    if node.type == "container":
+        container = node.props
+        frame.width = min(available, container.maxWidth)
+        frame.inner_x = frame.inner_y = container.padding
+        frame.child_widths = [max(0.0, frame.width - 2 * container.padding)] * n
+    elif node.type == "card":
+        padding = node.props.padding
+        frame.inner_x = BORDER + padding
+        frame.inner_y = BORDER + _card_header(node, available - 2 * BORDER) + padding
+        frame.child_widths = [max(0.0, available - 2 * frame.inner_x)] * n
+    elif node.type == "grid":
+        columns = _grid_columns(node, viewport)
+        track = max(0.0, (available - node.props.gap * (columns - 1)) / columns)
+        frame.child_widths = [track] * n
+    elif node.type == "stack":
+        stack = node.props
+        if stack.direction.value == "column" or n == 0:
+            frame.child_widths = [available] * n
+            if stack.align.value != "stretch":
+                for i, child in enumerate(children):
+                    preferred = preferred_width(nodes[child])
+                    if preferred is not None:
+                        frame.child_widths[i] = min(preferred, available)
+        else:
+            # Row: intrinsic items keep their width, the rest share what is left.
+            widths = [preferred_width(nodes[child]) for child in children]
+            fixed = sum(w for w in widths if w is not None)
+            flexible = sum(1 for w in widths if w is None)
+            free = max(0.0, available - fixed - stack.gap * (n - 1))
+            share = free / flexible if flexible else 0.0
+            frame.child_widths = [share if w is None else w for w in widths]
+    return frame
+
+
+def _finish(
+    frame: _Frame,
+    size: Dict[str, Tuple[float, float]],
+    offset: Dict[str, Tuple[float, float]],
+    shift: Dict[str, float],
+    viewport: float,
+) -> None:
+    """Place sized children inside the container and size the container."""
+    node = frame.node
+    children = frame.children
+    x0, y0 = frame.inner_x, frame.inner_y
+    height = 0.0
+    if node.type == "container" or node.type == "card":
+        y = y0
+        for child in children:
+            offset[child] = (x0, y)
+            y += size[child][1]
+        height = y + node.props.padding
+        if node.type == "card":
+            height += BORDER
+        elif node.props.centered:
+            # mx-auto: the container is centred in the width it was offered.
+            shift[node.id] = (frame.available - frame.width) / 2
+    elif node.type == "grid":
+        gap = node.props.gap
+        columns = _grid_columns(node, viewport)
+        track = frame.child_widths[0] if children else 0.0
+        y = 0.0
+        for start in range(0, len(children), columns):
+            row = children[start : start + columns]
+            for col, child in enumerate(row):
+                offset[child] = (col * (track + gap), y)
+            y += max(size[child][1] for child in row) + gap
+        height = max(0.0, y - gap) if children else 0.0
+    elif node.type == "stack":
+        gap = node.props.gap
+        align = node.props.align.value
+        if node.props.direction.value == "column":
+            y = 0.0
+            for child in children:
+                w = size[child][0]
+                if align == "center":
+                    x = (frame.width - w) / 2
+                elif align == "end":
+                    x = frame.width - w
+                else:
+                    x = 0.0
+                offset[child] = (x, y)
+                y += size[child][1] + gap
+            height = max(0.0, y - gap) if children else 0.0
+        else:
+            height = max((size[child][1] for child in children), default=0.0)
+            x = 0.0
+            for child in children:
+                h = size[child][1]
+                if align == "center":
+                    y = (height - h) / 2
+                elif align == "end":
+                    y = height - h
+                else:
+                    y = 0.0
+                offset[child] = (x, y)
+                x += size[child][0] + gap
+    size[node.id] = (frame.width, height)
+
+
+def layout_key(schema: PromptiusGuiSchema) -> str:
+    """Key that is equal for schemas laying out to the same boxes.
+
+    ``schema_hash`` is not: it ignores the list order of siblings with equal
+    ``order``, which decides where they are placed. This is the root's
+    ``render_keys`` entry (node ids included), or ``""`` without a root.
+    """
+    form = Canonical(schema, include_ids=True)
+    root = form.index.root_id
+    if root not in form.subtree:
+        return ""
+    return render_keys(form)[root].hex()
+
+
+class LayoutCache:
+    """Thread-safe LRU of layouts keyed by ``(layout_key, breakpoint)``.
+
+    Layouts are computed at the breakpoint's own width (see ``BREAKPOINTS``),
+    so every viewport in the same breakpoint shares one entry.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[str, str], Layout]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def layout(
+        self,
+        schema: PromptiusGuiSchema,
+        breakpoint: str = "lg",
+        key: Optional[str] = None,
+    ) -> Layout:
+        """Layout of ``schema`` at ``breakpoint``, computed on a miss.
+
+        Pass ``key`` (``layout_key(schema)``) when it is already known.
+        """
+        if breakpoint not in BREAKPOINTS:
+            raise ValueError(f"Unknown breakpoint '{breakpoint}'")
+        entry = (key if key is not None else layout_key(schema), breakpoint)
+        with self._lock:
+            layout = self._data.get(entry)
+            if layout is not None:
+                self._data.move_to_end(entry)
+                self.hits += 1
+                return layout
+            self.misses += 1
+        layout = compute_layout(schema, BREAKPOINTS[breakpoint])
+        with self._lock:
+            self._data[entry] = layout
+            self._data.move_to_end(entry)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return layout
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,478 @@
+"""
+Version-to-version migrations for stored schema documents.
+
+A ``MigrationRegistry`` holds transforms between schema versions, each a
+function from one JSON document (a plain dict) to the next version's
+document. ``migrate`` finds the shortest chain from a document's version to
+the target (chains are memoized per version pair) and applies it, stamping
+each step's version into ``metadata.version``. Old cached documents can then
+be upgraded when read (``load``) and whole archives rewritten in parallel
+(``migrate_archive``) instead of being regenerated by the LLM.
+
+The default registry knows the legacy nested ``UISchema`` format of
+``main.py`` (version ``1.0.0``: a ``root`` component tree with inline
+children and events) and converts it to the ``2.0.0`` graph layout.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from pydantic import ValidationError
+
+from . import PromptiusGuiSchema
+from .bulk import DEFAULT_CHUNK_BYTES, Chunk, iter_documents, plan_tasks
+
+Document = Dict[str, Any]
+Transform = Callable[[Document], Document]
+
+LEGACY_VERSION = "1.0.0"
+# Version of schema/promptius-gui-schema.json the Pydantic models follow.
+SCHEMA_VERSION = "2.0.0"
+
+
+class MigrationError(ValueError):
+    """No migration path exists, or a transform failed."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    source: str
+    target: str
+    transform: Transform
+    description: str = ""
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in version.split("."))
+    except (AttributeError, ValueError):
+        raise MigrationError(f"Invalid schema version {version!r}") from None
+
+
+def document_version(document: Mapping[str, Any]) -> str:
+    """Schema version of a raw document.
+
+    ``metadata.version`` decides, except that the layout overrides it across
+    the tree/graph boundary: a ``root`` tree without ``nodes`` is always
+    ``LEGACY_VERSION`` and a graph is never older than ``2.0.0`` (generated
+    graphs often carry ``"1.0.0"`` as their own version).
+    """
+    if "nodes" not in document and "root" in document:
+        return LEGACY_VERSION
+    metadata = document.get("metadata")
+    declared = metadata.get("version") if isinstance(metadata, dict) else None
+    if not isinstance(declared, str):
+        return "2.0.0"
+    try:
+        if parse_version(declared) < (2, 0, 0):
+            return "2.0.0"
+    except MigrationError:
+        return "2.0.0"
+    return declared
+
+
+class MigrationRegistry:
+    """Migrations between schema versions, applied along shortest chains."""
+
+    def __init__(self, target: str = SCHEMA_VERSION) -> None:
+        self.target = target
+        self._edges: Dict[str, Dict[str, Migration]] = {}
+        self._paths: Dict[Tuple[str, str], Tuple[Migration, ...]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, migration: Migration) -> Migration:
+        parse_version(migration.source)
+        parse_version(migration.target)
+        with self._lock:
+            targets = self._edges.setdefault(migration.source, {})
+            targets[migration.target] = migration
+            self._paths.clear()
+        return migration
+
+    def register(
+        self, source: str, target: str, description: str = ""
+    ) -> Callable[[Transform], Transform]:
+        """Decorator registering ``transform`` from ``source`` to ``target``."""
+
+        def decorator(transform: Transform) -> Transform:
+            doc = (transform.__doc__ or "").strip()
+            self.add(Migration(source, target, transform, description or doc))
+            return transform
+
+        return decorator
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Registries are shipped to worker processes; locks do not pickle.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def migrations(self) -> List[Migration]:
+        return [m for targets in self._edges.values() for m in targets.values()]
+
+    def path(
+        self, source: str, target: Optional[str] = None
+    ) -> Tuple[Migration, ...]:
+        """Shortest chain of migrations from ``source`` to ``target``."""
+        target = target or self.target
+        key = (source, target)
+        found = self._paths.get(key)
+        if found is not None:
+            return found
+        with self._lock:
+            previous: Dict[str, Migration] = {}
+            queue = deque([source])
+            seen = {source}
+            while queue and target not in seen:
+                version = queue.popleft()
+                for migration in self._edges.get(version, {}).values():
+                    if migration.target not in seen:
+                        seen.add(migration.target)
+                        previous[migration.target] = migration
+                        queue.append(migration.target)
+            if target not in seen:
+                raise MigrationError(f"No migration path from {source} to {target}")
+            chain: List[Migration] = []
+            version = target
+            while version != source:
+                chain.append(previous[version])
+                version = previous[version].source
+            found = self._paths[key] = tuple(reversed(chain))
+        return found
+
+    def migrate(self, document: Document, target: Optional[str] = None) -> Document:
+        """Return ``document`` converted to ``target`` (default: current).
+
+        Documents already at ``target`` are returned as they are; transforms
+        may modify their input.
+        """
+        for migration in self.path(document_version(document), target):
+            try:
+                document = migration.transform(document)
+            except (KeyError, TypeError, ValueError, AttributeError) as exc:
+                raise MigrationError(
+                    f"Migration {migration.source} -> {migration.target} "
+                    f"failed: {exc!r}"
+                ) from exc
+            document.setdefault("metadata", {})["version"] = migration.target
+        return document
+
+    def load(self, data: Union[str, bytes]) -> Tuple[PromptiusGuiSchema, bool]:
+        """Validate stored JSON, migrating it first if it is out of date.
+
+        Current documents cost one ``model_validate_json``; only documents
+        failing it are parsed and migrated. Returns the schema and whether a
+        migration ran, so callers can write the upgraded document back.
+        """
+        try:
+            return PromptiusGuiSchema.model_validate_json(data), False
+        except ValidationError as exc:
+            error = exc
+        try:
+            document = json.loads(data)
+        except ValueError:
+            raise error from None
+        if not isinstance(document, dict) or document_version(document) == self.target:
+            raise error
+        return PromptiusGuiSchema.model_validate(self.migrate(document)), True
+
+    def iter_migrate(
+        self, lines: Iterable[Union[str, bytes]], target: Optional[str] = None
+    ) -> Iterator[str]:
+        """Migrate a JSONL stream one document at a time."""
+        for line in lines:
+            if line.strip():
+                document = self.migrate(json.loads(line), target)
+                yield json.dumps(document, separators=(",", ":"))
+
+
+# ============================================================================
+# ARCHIVES
+# ============================================================================
+
+
+@dataclass
+class MigrationReport:
+    documents: int = 0
+    migrated: int = 0
+    failed: int = 0
+    paths: Counter = field(default_factory=Counter)
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+    def merge(self, other: "MigrationReport", max_errors: int = 20) -> None:
+        self.documents += other.documents
+        self.migrated += other.migrated
+        self.failed += other.failed
+        self.paths.update(other.paths)
+        self.errors.extend(other.errors[: max_errors - len(self.errors)])
+
+
+_worker_registry: Optional[MigrationRegistry] = None
+_worker_target: Optional[str] = None
+
+
+def _init_worker(
+    registry: Optional[MigrationRegistry], target: Optional[str]
+) -> None:
+    global _worker_registry, _worker_target
+    _worker_registry, _worker_target = registry, target
+
+
+def _migrate_task(task: List[Chunk]) -> Tuple[bytes, MigrationReport]:
+    registry = _worker_registry or default_migrations
+    report = MigrationReport()
+    out: List[bytes] = []
+    for chunk in task:
+        for location, data in iter_documents(chunk):
+            report.documents += 1
+            try:
+                document = json.loads(data)
+                source = document_version(document)
+                migrated = registry.migrate(document, _worker_target)
+            except (ValueError, TypeError, AttributeError) as exc:
+                report.failed += 1
+                report.errors.append((location, str(exc)))
+                continue
+            target = _worker_target or registry.target
+            if source != target:
+                report.migrated += 1
+                report.paths[f"{source} -> {target}"] += 1
+            out.append(json.dumps(migrated, separators=(",", ":")).encode("utf-8"))
+    return b"".join(line + b"\n" for line in out), report
+
+
+def migrate_archive(
+    paths: Sequence[str],
+    output: str,
+    registry: Optional[MigrationRegistry] = None,
+    target: Optional[str] = None,
+    jobs: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> MigrationReport:
+    """Migrate every document under ``paths`` into the JSONL file ``output``.
+
+    Inputs are split like ``bulk.validate_archive`` does and migrated on
+    ``jobs`` processes; output keeps input order. Documents that cannot be
+    migrated are left out and listed in the report. A custom ``registry``
+    must be picklable (transforms defined at module level).
+    """
+    registry = registry or default_migrations
+    jobs = jobs or os.cpu_count() or 1
+    report = MigrationReport()
+    tasks = plan_tasks(paths, chunk_bytes)
+    with open(output, "wb") as fp:
+        if jobs == 1:
+            _init_worker(registry, target)
+            try:
+                for task in tasks:
+                    body, part = _migrate_task(task)
+                    fp.write(body)
+                    report.merge(part)
+            finally:
+                _init_worker(None, None)
+        else:
+            with multiprocessing.Pool(
+                jobs, initializer=_init_worker, initargs=(registry, target)
+            ) as pool:
+                for body, part in pool.imap(_migrate_task, tasks):
+                    fp.write(body)
+                    report.merge(part)
+    return report
+
+
+# ============================================================================
+# BUILT-IN MIGRATIONS
+# ============================================================================
+
+
+def rename_props(node_type: str, renames: Mapping[str, str]) -> Transform:
+    """Transform renaming props of every ``node_type`` node (graph layout)."""
+    renames = dict(renames)
+
+    def transform(document: Document) -> Document:
+        for node in document.get("nodes", ()):
+            if node.get("type") == node_type:
+                props = node.get("props") or {}
+                for old, new in renames.items():
+                    if old in props:
+                        props[new] = props.pop(old)
+        return document
+
+    return transform
+
+
+# Legacy props were optional with defaults (and dumped with exclude_none);
+# version 2 requires every key. Missing or null props take these values:
+# the legacy defaults, or neutral fillers where the legacy default was None.
+_LEGACY_PROPS: Dict[str, Dict[str, Any]] = {
+    "button": {
+        "variant": "primary",
+        "size": "md",
+        "disabled": False,
+        "fullWidth": False,
+        "loading": False,
+    },
+    "input": {
+        "placeholder": "",
+        "type": "text",
+        "size": "md",
+        "disabled": False,
+        "required": False,
+        "label": "",
+        "helperText": "",
+        "defaultValue": "",
+        "maxLength": 524288,
+        "minLength": 0,
+    },
+    "textarea": {
+        "placeholder": "",
+        "rows": 4,
+        "disabled": False,
+        "required": False,
+        "label": "",
+        "helperText": "",
+        "maxLength": 524288,
+    },
+    "text": {
+        "tag": "p",
+        "align": "left",
+        "bold": False,
+        "italic": False,
+        "color": "inherit",
+    },
+    "card": {"title": "", "description": "", "elevation": 1, "padding": 16},
+    "alert": {"title": "", "variant": "info", "dismissible": False},
+    "container": {"maxWidth": 1920, "padding": 16, "centered": False},
+    "grid": {"columns": 1, "gap": 16, "responsive": True},
+    "stack": {"direction": "column", "gap": 8, "align": "stretch"},
+    "chart": {
+        "width": 600,
+        "height": 400,
+        "labels": [],
+        "colors": [],
+        "title": "",
+        "showLegend": True,
+        "legendPosition": "top",
+        "annotations": [],
+    },
+}
+
+_LEGACY_ACTIONS: Dict[str, Dict[str, Any]] = {
+    "navigate": {"target": "_self"},
+    "submitForm": {"endpoint": "", "method": "POST"},
+    "validate": {"rules": []},
+}
+
+
+def _fill(values: Mapping[str, Any], defaults: Mapping[str, Any]) -> Dict[str, Any]:
+    filled = {k: v for k, v in values.items() if v is not None}
+    for key, default in defaults.items():
+        if key not in filled:
+            filled[key] = list(default) if isinstance(default, list) else default
+    return filled
+
+
+def _legacy_chart(props: Dict[str, Any]) -> Dict[str, Any]:
+    series = [
+        _fill(s, {"name": f"Series {i + 1}"})
+        for i, s in enumerate(props.get("series") or ())
+    ]
+    values = [v for s in series for v in s.get("data") or ()]
+    labels = props.get("labels") or []
+    filled = _fill(props, _LEGACY_PROPS["chart"])
+    filled["series"] = series
+    filled["xAxis"] = _fill(
+        props.get("xAxis") or {},
+        {"label": "", "ticks": list(labels), "showGrid": False},
+    )
+    filled["yAxis"] = _fill(
+        props.get("yAxis") or {},
+        {
+            "label": "",
+            "min": min([0.0] + values),
+            "max": max([0.0] + values),
+            "showGrid": False,
+        },
+    )
+    filled["annotations"] = [
+        _fill(a, {"x": 0.0, "y": 0.0}) for a in props.get("annotations") or ()
+    ]
+    return filled
+
+
+default_migrations = MigrationRegistry()
+
+
+@default_migrations.register(LEGACY_VERSION, "2.0.0")
+def legacy_tree_to_graph(document: Document) -> Document:
+    """Nested ``root`` component tree to nodes, edges and events."""
+    root = document["root"]
+    metadata = document.get("metadata") or {}
+    nodes: List[Document] = []
+    edges: List[Document] = []
+    events: List[Document] = []
+    stack = [root]
+    while stack:
+        component = stack.pop()
+        node_type = component["type"]
+        node_id = component["id"]
+        props = component.get("props") or {}
+        nodes.append(
+            {
+                "id": node_id,
+                "type": node_type,
+                "props": _legacy_chart(props)
+                if node_type == "chart"
+                else _fill(props, _LEGACY_PROPS[node_type]),
+            }
+        )
+        for binding in component.get("events") or ():
+            action = binding["action"]
+            events.append(
+                {
+                    "nodeId": node_id,
+                    "eventType": binding["event"],
+                    "action": _fill(action, _LEGACY_ACTIONS.get(action["type"], {})),
+                }
+            )
+        children = component.get("children") or []
+        edges.extend(
+            {"src": node_id, "dest": child["id"], "order": order}
+            for order, child in enumerate(children)
+        )
+        stack.extend(reversed(children))
+    return {
+        "metadata": {
+            "title": metadata.get("title") or "Untitled",
+            "description": metadata.get("description") or "",
+            "version": "2.0.0",
+            "framework": metadata.get("framework") or "shadcn",
+            "rootId": root["id"],
+        },
+        "nodes": nodes,
+        "edges": edges,
+        "events": events,
+    }
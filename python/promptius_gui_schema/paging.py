@@ -0,0 +1,96 @@
+"""
+Paging of oversized sibling lists for lazy loading.
+
+Data-driven dashboards can hang hundreds of cards or text rows under one grid
+or stack. ``paginate`` ships only the first page of every such list together
+with a ``PageHint`` per truncated parent; the client renders what it has and
+fetches further pages with ``children_page`` (``GET
+/schemas/{key}/children/{node_id}``) as they scroll into view.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from . import PromptiusGuiSchema
+from .graph import GraphIndex, Subgraph
+
+DEFAULT_MAX_FAN_OUT = 100
+DEFAULT_PAGE_SIZE = 50
+
+
+@dataclass
+class PageHint:
+    """Children of ``node_id`` currently loaded, out of ``total``."""
+
+    node_id: str
+    total: int
+    loaded: int
+    page_size: int
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "nodeId": self.node_id,
+            "total": self.total,
+            "loaded": self.loaded,
+            "pageSize": self.page_size,
+        }
+
+
+def _hints(sub: Subgraph, page_size: int) -> Dict[str, PageHint]:
+    return {
+        node_id: PageHint(node_id, total, min(page_size, total), page_size)
+        for node_id, total in sub.more.items()
+    }
+
+
+def paginate(
+    schema: PromptiusGuiSchema,
+    max_fan_out: int = DEFAULT_MAX_FAN_OUT,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    index: Optional[GraphIndex] = None,
+) -> Tuple[PromptiusGuiSchema, Dict[str, PageHint]]:
+    """Cut every child list longer than ``max_fan_out`` to its first page.
+
+    Returns the trimmed schema and the hints for the cut lists; the schema is
+    returned unchanged when nothing needs paging. Nodes only reachable through
+    cut edges, and nodes unreachable from the root, are left out.
+    """
+    index = index or GraphIndex(schema)
+    if all(len(edges) <= max_fan_out for edges in index.child_edges.values()):
+        return schema, {}
+    sub = index.subgraph([index.root_id], max_fan_out, page_size)
+    trimmed = PromptiusGuiSchema.model_construct(
+        metadata=schema.metadata,
+        nodes=sub.nodes,
+        edges=sub.edges,
+        events=sub.events,
+    )
+    return trimmed, _hints(sub, page_size)
+
+
+def children_page(
+    index: GraphIndex,
+    node_id: str,
+    start: int,
+    stop: int,
+    max_fan_out: int = DEFAULT_MAX_FAN_OUT,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[Subgraph, Dict[str, PageHint]]:
+    """Children ``start:stop`` of ``node_id`` with their subtrees.
+
+    The edges from ``node_id`` to the returned children come first in
+    ``edges``; long child lists inside the page are paged in turn. Raises
+    ``KeyError`` for an unknown node.
+    """
+    if node_id not in index.nodes:
+        raise KeyError(node_id)
+    edges = [
+        edge
+        for edge in index.child_edges.get(node_id, ())[start:stop]
+        if edge.dest in index.nodes
+    ]
+    sub = index.subgraph([e.dest for e in edges], max_fan_out, page_size)
+    sub.edges[:0] = edges
+    return sub, _hints(sub, page_size)
@@ -0,0 +1,344 @@
+"""
+Linear-time regular expression search for patterns from generated schemas.
+
+``re`` backtracks, so a pattern such as ``(a|aa)*b`` or ``a*a*a*x`` takes
+exponential or high-polynomial time on a value that almost matches, and
+``pattern`` rules run on unauthenticated form submissions. ``LinearPattern``
+parses the source with the ``re`` parser, compiles it to a Thompson NFA and
+simulates all threads at once, so a search costs at most
+``len(text) * states`` steps whatever the pattern. Sets of NFA states are
+memoised per input character (a lazily built DFA), which makes repeated
+searches with the same pattern close to one dictionary lookup per character.
+
+The answer is the same as ``bool(re.search(source, text))`` for the regular
+subset of the syntax: literals, classes, ``.``, groups, alternation, greedy
+and lazy repeats, the anchors ``^ $ \\A \\Z \\b \\B`` and the flags ``i m s a
+x``. Backreferences, lookarounds, conditionals, atomic groups and possessive
+repeats have no NFA and raise ``PatternError``, as do programs over
+``MAX_STATES`` instructions once bounded repeats are expanded.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    from re import _parser as _sre_parse  # type: ignore[attr-defined]
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+MAX_STATES = 1000
+# Memoised DFA transitions kept per pattern before the table is reset.
+MAX_TRANSITIONS = 4096
+
+_CHAR, _SPLIT, _JMP, _ASSERT, _MATCH = range(5)
+
+# Position facts the anchors look at, as bits of a context mask.
+_START, _END, _LAST_NEWLINE, _PREV_NEWLINE, _NEXT_NEWLINE = 1, 2, 4, 8, 16
+_PREV_WORD, _NEXT_WORD = 32, 64
+
+_REPEATS = {
+    getattr(_sre_parse, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT")
+    if hasattr(_sre_parse, name)
+}
+
+Predicate = Callable[[str], bool]
+
+
+class PatternError(ValueError):
+    """A pattern ``LinearPattern`` cannot run in linear time."""
+
+
+def _ascii_word(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+def _unicode_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _category(code: object, ascii_only: bool) -> Predicate:
+    name = str(code).upper()
+    negate = "NOT_" in name
+    if "DIGIT" in name:
+        test: Predicate = (
+            (lambda ch: "0" <= ch <= "9") if ascii_only else str.isdecimal
+        )
+    elif "SPACE" in name:
+        test = (lambda ch: ch in " \t\n\r\f\v") if ascii_only else str.isspace
+    elif "WORD" in name:
+        test = _ascii_word if ascii_only else _unicode_word
+    else:
+        raise PatternError(f"unsupported character class {name}")
+    if negate:
+        return lambda ch: not test(ch)
+    return test
+
+
+def _folded(ch: str) -> Tuple[str, ...]:
+    return tuple({ch, ch.lower(), ch.upper()})
+
+
+def _class(items: list, flags: int) -> Predicate:
+    """Predicate for the items of an ``IN`` node (``[...]``, ``\\d``)."""
+    ascii_only = bool(flags & re.ASCII)
+    ignore_case = bool(flags & re.IGNORECASE)
+    negate = False
+    chars = set()
+    ranges: List[Tuple[int, int]] = []
+    tests: List[Predicate] = []
+    for op, av in items:
+        if op is _sre_parse.NEGATE:
+            negate = True
+        elif op is _sre_parse.LITERAL:
+            chars.add(chr(av))
+        elif op is _sre_parse.RANGE:
+            ranges.append(av)
+        elif op is _sre_parse.CATEGORY:
+            tests.append(_category(av, ascii_only))
+        else:
+            raise PatternError(f"unsupported class item {op}")
+
+    def member(ch: str) -> bool:
+        candidates = _folded(ch) if ignore_case else (ch,)
+        for c in candidates:
+            if c in chars:
+                return True
+            code = ord(c)
+            if any(low <= code <= high for low, high in ranges):
+                return True
+        return any(test(ch) for test in tests)
+
+    if negate:
+        return lambda ch: not member(ch)
+    return member
+
+
+def _literal(code: int, flags: int, negate: bool = False) -> Predicate:
+    char = chr(code)
+    if flags & re.IGNORECASE:
+        forms = set(_folded(char))
+
+        def same(ch: str) -> bool:
+            return any(c in forms for c in _folded(ch))
+
+    else:
+
+        def same(ch: str) -> bool:
+            return ch == char
+
+    if negate:
+        return lambda ch: not same(ch)
+    return same
+
+
+class LinearPattern:
+    """A compiled pattern whose ``search`` runs in linear time; see the module."""
+
+    def __init__(self, source: str, max_states: int = MAX_STATES) -> None:
+        self.source = source
+        self.max_states = max_states
+        try:
+            parsed = _sre_parse.parse(source)
+        except (re.error, OverflowError, RecursionError) as exc:
+            raise PatternError(f"invalid pattern: {exc}") from None
+        state = getattr(parsed, "state", None) or parsed.pattern
+        flags = state.flags
+        if flags & re.LOCALE:
+            raise PatternError("locale-dependent patterns are not supported")
+        self._word = _ascii_word if flags & re.ASCII else _unicode_word
+        self._program: List[list] = []
+        self._emit_sequence(parsed, flags)
+        self._match = self._add(_MATCH)
+        self._anchored = any(op == _ASSERT for op, *_ in self._program)
+        self._closures: Dict[Tuple[int, int], FrozenSet[int]] = {}
+        self._transitions: Dict[Tuple[FrozenSet[int], str, int], FrozenSet[int]]
+        self._transitions = {}
+
+    def __repr__(self) -> str:
+        return f"LinearPattern({self.source!r})"
+
+    # -- compilation --------------------------------------------------------
+
+    def _add(self, op: int, a: object = None, b: object = None) -> int:
+        if len(self._program) >= self.max_states:
+            raise PatternError(
+                f"pattern needs more than {self.max_states} states"
+            )
+        self._program.append([op, a, b])
+        return len(self._program) - 1
+
+    def _emit_sequence(self, items: object, flags: int) -> None:
+        for op, av in items:  # type: ignore[attr-defined]
+            self._emit(op, av, flags)
+
+    def _emit(self, op: object, av: object, flags: int) -> None:
+        sre = _sre_parse
+        if op is sre.LITERAL:
+            self._add(_CHAR, _literal(av, flags))  # type: ignore[arg-type]
+        elif op is sre.NOT_LITERAL:
+            negated = _literal(av, flags, negate=True)  # type: ignore[arg-type]
+            self._add(_CHAR, negated)
+        elif op is sre.ANY:
+            if flags & re.DOTALL:
+                self._add(_CHAR, lambda ch: True)
+            else:
+                self._add(_CHAR, lambda ch: ch != "\n")
+        elif op is sre.IN:
+            self._add(_CHAR, _class(av, flags))  # type: ignore[arg-type]
+        elif op is sre.BRANCH:
+            self._emit_branch(av[1], flags)  # type: ignore[index]
+        elif op is sre.SUBPATTERN:
+            _, add_flags, del_flags, items = av  # type: ignore[misc]
+            self._emit_sequence(items, (flags | add_flags) & ~del_flags)
+        elif op in _REPEATS:
+            low, high, items = av  # type: ignore[misc]
+            self._emit_repeat(low, high, items, flags)
+        elif op is sre.AT:
+            self._add(_ASSERT, self._anchor(av, flags))
+        else:
+            raise PatternError(f"{str(op).lower()} is not supported")
+
+    def _emit_branch(self, alternatives: list, flags: int) -> None:
+        jumps = []
+        for position, items in enumerate(alternatives):
+            if position == len(alternatives) - 1:
+                self._emit_sequence(items, flags)
+                break
+            split = self._add(_SPLIT, len(self._program) + 1)
+            self._emit_sequence(items, flags)
+            jumps.append(self._add(_JMP))
+            self._program[split][2] = len(self._program)
+        for jump in jumps:
+            self._program[jump][1] = len(self._program)
+
+    def _emit_repeat(self, low: int, high: int, items: object, flags: int) -> None:
+        for _ in range(low):
+            self._emit_sequence(items, flags)
+        if high == _sre_parse.MAXREPEAT:
+            loop = self._add(_SPLIT, len(self._program) + 1)
+            self._emit_sequence(items, flags)
+            self._add(_JMP, loop)
+            self._program[loop][2] = len(self._program)
+            return
+        splits = []
+        for _ in range(high - low):
+            splits.append(self._add(_SPLIT, len(self._program) + 1))
+            self._emit_sequence(items, flags)
+        for split in splits:
+            self._program[split][2] = len(self._program)
+
+    @staticmethod
+    def _anchor(code: object, flags: int) -> Tuple[int, bool]:
+        """``(mask, negate)``: the anchor holds when any bit of ``mask`` is
+        set in the position's context (or none is, when negated)."""
+        name = str(code).upper()
+        multiline = bool(flags & re.MULTILINE)
+        if name.endswith("AT_BEGINNING_STRING"):
+            return _START, False
+        if name.endswith("AT_END_STRING"):
+            return _END, False
+        if name.endswith("AT_BEGINNING"):
+            return (_START | _PREV_NEWLINE if multiline else _START), False
+        if name.endswith("AT_END"):
+            if multiline:
+                return _END | _NEXT_NEWLINE, False
+            return _END | _LAST_NEWLINE, False
+        if name.endswith("AT_BOUNDARY"):
+            return -1, False
+        if name.endswith("AT_NON_BOUNDARY"):
+            return -1, True
+        raise PatternError(f"unsupported anchor {name}")
+
+    # -- matching -----------------------------------------------------------
+
+    def _holds(self, anchor: Tuple[int, bool], context: int) -> bool:
+        mask, negate = anchor
+        if mask == -1:
+            if negate and context & _START and context & _END:
+                return False  # like re, \B never matches the empty string
+            boundary = bool(context & _PREV_WORD) != bool(context & _NEXT_WORD)
+            return boundary != negate
+        return bool(context & mask) != negate
+
+    def _closure(self, pc: int, context: int) -> FrozenSet[int]:
+        key = (pc, context)
+        found = self._closures.get(key)
+        if found is not None:
+            return found
+        program = self._program
+        seen = set()
+        out = set()
+        stack = [pc]
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op, a, b = program[pc]
+            if op == _CHAR or op == _MATCH:
+                out.add(pc)
+            elif op == _SPLIT:
+                stack.append(b)
+                stack.append(a)
+            elif op == _JMP:
+                stack.append(a)
+            elif self._holds(a, context):
+                stack.append(pc + 1)
+        found = frozenset(out)
+        self._closures[key] = found
+        return found
+
+    def _contexts(self, text: str) -> List[int]:
+        word = self._word
+        n = len(text)
+        contexts = []
+        for i in range(n + 1):
+            context = 0
+            if i == 0:
+                context |= _START
+            elif text[i - 1] == "\n":
+                context |= _PREV_NEWLINE
+            if i == n:
+                context |= _END
+            elif text[i] == "\n":
+                context |= _NEXT_NEWLINE
+                if i == n - 1:
+                    context |= _LAST_NEWLINE
+            if i and word(text[i - 1]):
+                context |= _PREV_WORD
+            if i < n and word(text[i]):
+                context |= _NEXT_WORD
+            contexts.append(context)
+        return contexts
+
+    def search(self, text: str) -> bool:
+        """Whether the pattern matches anywhere in ``text``."""
+        contexts: Optional[List[int]] = (
+            self._contexts(text) if self._anchored else None
+        )
+        program = self._program
+        accept = self._match
+        state = self._closure(0, contexts[0] if contexts else 0)
+        if accept in state:
+            return True
+        transitions = self._transitions
+        for i, ch in enumerate(text, 1):
+            context = contexts[i] if contexts else 0
+            key = (state, ch, context)
+            following = transitions.get(key)
+            if following is None:
+                reached = set(self._closure(0, context))
+                for pc in state:
+                    if pc != accept and program[pc][1](ch):
+                        reached |= self._closure(pc + 1, context)
+                following = frozenset(reached)
+                if len(transitions) >= MAX_TRANSITIONS:
+                    transitions = self._transitions = {}
+                transitions[key] = following
+            if accept in following:
+                return True
+            state = following
+        return False
@@ -0,0 +1,577 @@
+"""
+Server-side pre-rendering of PromptiusGuiSchema to static HTML.
+
+Emits semantic HTML using the Tailwind classes of the shadcn components in
+``js/src/components/ui`` so the first paint does not wait for the JS bundle.
+Every element carries ``data-node-id`` so the client ``GraphRenderer`` can
+hydrate it later. Charts become inline SVG, following the layout of the
+adapters' built-in chart renderer.
+
+The graph is walked iteratively from ``metadata.rootId``. With a
+``RenderCache``, finished subtrees are stored under their Merkle hash (see
+``canonical``), so re-rendering a schema only renders the subtrees that
+changed.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import (
+    AlertNode,
+    ButtonNode,
+    CardNode,
+    ChartNode,
+    ChartProps,
+    ContainerNode,
+    Edge,
+    GridNode,
+    InputNode,
+    Node,
+    PromptiusGuiSchema,
+    StackNode,
+    TextareaNode,
+    TextNode,
+)
+from .canonical import Canonical, render_keys
+from .graph import GraphIndex
+
+# ============================================================================
+# TAILWIND CLASSES - mirrored from js/src/components/ui
+# ============================================================================
+
+BUTTON_BASE = (
+    "inline-flex items-center justify-center gap-2 whitespace-nowrap rounded-md "
+    "text-sm font-medium ring-offset-background transition-colors "
+    "focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-ring "
+    "focus-visible:ring-offset-2 disabled:pointer-events-none disabled:opacity-50"
+)
+BUTTON_VARIANTS = {
+    "primary": "bg-primary text-primary-foreground hover:bg-primary/90",
+    "secondary": "bg-secondary text-secondary-foreground hover:bg-secondary/80",
+    "outline": "border border-input bg-background hover:bg-accent hover:text-accent-foreground",
+    "ghost": "hover:bg-accent hover:text-accent-foreground",
+    "destructive": "bg-destructive text-destructive-foreground hover:bg-destructive/90",
+}
+BUTTON_SIZES = {"sm": "h-9 rounded-md px-3", "md": "h-10 px-4 py-2", "lg": "h-11 rounded-md px-8"}
+
+FIELD_BASE = (
+    "flex w-full rounded-md border border-input bg-background px-3 py-2 text-sm "
+    "ring-offset-background placeholder:text-muted-foreground "
+    "focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-ring "
+    "focus-visible:ring-offset-2 disabled:cursor-not-allowed disabled:opacity-50"
+)
+INPUT_SIZES = {"sm": "h-9", "md": "h-10", "lg": "h-11"}
+LABEL = "text-sm font-medium leading-none"
+HELPER = "text-sm text-muted-foreground"
+
+TEXT_TAGS = {
+    "h1": "scroll-m-20 text-4xl font-extrabold tracking-tight",
+    "h2": "scroll-m-20 text-3xl font-semibold tracking-tight",
+    "h3": "scroll-m-20 text-2xl font-semibold tracking-tight",
+    "h4": "scroll-m-20 text-xl font-semibold tracking-tight",
+    "h5": "text-lg font-semibold",
+    "h6": "text-base font-semibold",
+    "p": "leading-7",
+    "span": "",
+    "label": LABEL,
+}
+
+CARD = "rounded-lg border bg-card text-card-foreground"
+CARD_SHADOWS = ["shadow-none", "shadow-sm", "shadow", "shadow-md", "shadow-lg", "shadow-xl"]
+
+ALERT = "relative w-full rounded-lg border p-4"
+ALERT_VARIANTS = {
+    "info": "bg-background text-foreground",
+    "success": "border-green-500/50 text-green-700",
+    "warning": "border-yellow-500/50 text-yellow-700",
+    "error": "border-destructive/50 text-destructive",
+}
+
+STACK_ALIGN = {
+    "start": "items-start",
+    "center": "items-center",
+    "end": "items-end",
+    "stretch": "items-stretch",
+}
+
+CHART_COLORS = ["#1976d2", "#9c27b0", "#2e7d32", "#ed6c02"]
+CHART_PADDING = 24
+
+
+def _classes(*names: str) -> str:
+    return " ".join(name for name in names if name)
+
+
+def _attr(value: object) -> str:
+    return escape(str(value), quote=True)
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+# ============================================================================
+# NODE RENDERERS - each returns (opening html, closing html)
+# ============================================================================
+
+
+def _button(node: ButtonNode) -> Tuple[str, str]:
+    p = node.props
+    classes = _classes(
+        BUTTON_BASE,
+        BUTTON_VARIANTS[p.variant.value],
+        BUTTON_SIZES[p.size.value],
+        "w-full" if p.fullWidth else "",
+    )
+    flags = " disabled" if p.disabled or p.loading else ""
+    if p.loading:
+        flags += ' aria-busy="true"'
+    return (
+        f'<button type="button" data-node-id="{_attr(node.id)}" '
+        f'class="{classes}"{flags}>{escape(p.label)}</button>',
+        "",
+    )
+
+
+def _field(node_id: str, label: str, control: str, helper: str) -> str:
+    parts = [f'<div class="space-y-2" data-node-id="{_attr(node_id)}">']
+    if label:
+        parts.append(f'<label class="{LABEL}" for="{_attr(node_id)}">{escape(label)}</label>')
+    parts.append(control)
+    if helper:
+        parts.append(f'<p class="{HELPER}">{escape(helper)}</p>')
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def _input(node: InputNode) -> Tuple[str, str]:
+    p = node.props
+    flags = (" disabled" if p.disabled else "") + (" required" if p.required else "")
+    control = (
+        f'<input id="{_attr(node.id)}" name="{_attr(node.id)}" type="{p.type.value}" '
+        f'class="{_classes(FIELD_BASE, INPUT_SIZES[p.size.value])}" '
+        f'placeholder="{_attr(p.placeholder)}" value="{_attr(p.defaultValue)}" '
+        f'minlength="{p.minLength}" maxlength="{p.maxLength}"{flags}>'
+    )
+    return _field(node.id, p.label, control, p.helperText), ""
+
+
+def _textarea(node: TextareaNode) -> Tuple[str, str]:
+    p = node.props
+    flags = (" disabled" if p.disabled else "") + (" required" if p.required else "")
+    control = (
+        f'<textarea id="{_attr(node.id)}" name="{_attr(node.id)}" '
+        f'class="{_classes(FIELD_BASE, "min-h-[80px]")}" rows="{p.rows}" '
+        f'placeholder="{_attr(p.placeholder)}" maxlength="{p.maxLength}"{flags}>'
+        "</textarea>"
+    )
+    return _field(node.id, p.label, control, p.helperText), ""
+
+
+def _text(node: TextNode) -> Tuple[str, str]:
+    p = node.props
+    tag = p.tag.value
+    classes = _classes(
+        TEXT_TAGS[tag],
+        f"text-{p.align.value}",
+        "font-bold" if p.bold else "",
+        "italic" if p.italic else "",
+    )
+    style = f' style="color:{_attr(p.color)}"' if p.color else ""
+    return (
+        f'<{tag} data-node-id="{_attr(node.id)}" class="{classes}"{style}>'
+        f"{escape(p.content)}</{tag}>",
+        "",
+    )
+
+
+def _card(node: CardNode) -> Tuple[str, str]:
+    p = node.props
+    parts = [
+        f'<div data-node-id="{_attr(node.id)}" '
+        f'class="{_classes(CARD, CARD_SHADOWS[p.elevation])}">'
+    ]
+    if p.title or p.description:
+        parts.append('<div class="flex flex-col space-y-1.5 p-6">')
+        if p.title:
+            parts.append(
+                '<h3 class="text-2xl font-semibold leading-none tracking-tight">'
+                f"{escape(p.title)}</h3>"
+            )
+        if p.description:
+            parts.append(f'<p class="{HELPER}">{escape(p.description)}</p>')
+        parts.append("</div>")
+    parts.append(f'<div class="pt-0" style="padding:{p.padding}px">')
+    return "".join(parts), "</div></div>"
+
+
+def _alert(node: AlertNode) -> Tuple[str, str]:
+    p = node.props
+    parts = [
+        f'<div role="alert" data-node-id="{_attr(node.id)}" '
+        f'class="{_classes(ALERT, ALERT_VARIANTS[p.variant.value])}">'
+    ]
+    if p.title:
+        parts.append(
+            f'<h5 class="mb-1 font-medium leading-none tracking-tight">{escape(p.title)}</h5>'
+        )
+    parts.append(f'<div class="text-sm [&_p]:leading-relaxed">{escape(p.message)}</div>')
+    if p.dismissible:
+        parts.append(
+            '<button type="button" class="absolute right-2 top-2 text-sm opacity-70" '
+            'aria-label="Dismiss">&times;</button>'
+        )
+    parts.append("</div>")
+    return "".join(parts), ""
+
+
+def _container(node: ContainerNode) -> Tuple[str, str]:
+    p = node.props
+    return (
+        f'<div data-node-id="{_attr(node.id)}" '
+        f'class="{_classes("w-full", "mx-auto" if p.centered else "")}" '
+        f'style="max-width:{p.maxWidth}px;padding:{p.padding}px">',
+        "</div>",
+    )
+
+
+def _grid(node: GridNode) -> Tuple[str, str]:
+    p = node.props
+    if p.responsive:
+        classes = f"grid grid-cols-1 md:grid-cols-{p.columns}"
+        style = f"gap:{p.gap}px"
+    else:
+        classes = "grid"
+        style = f"grid-template-columns:repeat({p.columns},minmax(0,1fr));gap:{p.gap}px"
+    return (
+        f'<div data-node-id="{_attr(node.id)}" class="{classes}" style="{style}">',
+        "</div>",
+    )
+
+
+def _stack(node: StackNode) -> Tuple[str, str]:
+    p = node.props
+    direction = "flex-row" if p.direction.value == "row" else "flex-col"
+    return (
+        f'<div data-node-id="{_attr(node.id)}" '
+        f'class="flex {direction} {STACK_ALIGN[p.align.value]}" style="gap:{p.gap}px">',
+        "</div>",
+    )
+
+
+def _legend(entries: Sequence[Tuple[str, str]]) -> str:
+    items = "".join(
+        '<span class="flex items-center gap-1 text-xs">'
+        f'<span class="inline-block h-3 w-3 rounded-sm" style="background:{_attr(color)}"></span>'
+        f"{escape(name)}</span>"
+        for name, color in entries
+    )
+    return f'<div class="mt-2 flex flex-wrap gap-4">{items}</div>'
+
+
+def _axes(p: ChartProps, labels: List[str], inner_w: float, inner_h: float) -> Tuple[str, str]:
+    """Grid lines and y labels (drawn below) plus x labels (drawn above)."""
+    y_min, y_max = p.yAxis.min, p.yAxis.max
+    y_ticks = 4
+    below: List[str] = []
+    if p.yAxis.showGrid:
+        for i in range(y_ticks + 1):
+            y = inner_h - i / y_ticks * inner_h
+            below.append(
+                f'<line x1="0" y1="{_num(y)}" x2="{_num(inner_w)}" y2="{_num(y)}" '
+                'stroke="#eee" stroke-dasharray="3 3"/>'
+            )
+    ticks = p.xAxis.ticks or labels
+    if p.xAxis.showGrid and ticks:
+        step = inner_w / len(ticks)
+        for i in range(1, len(ticks)):
+            below.append(
+                f'<line x1="{_num(i * step)}" y1="0" x2="{_num(i * step)}" '
+                f'y2="{_num(inner_h)}" stroke="#eee" stroke-dasharray="3 3"/>'
+            )
+    for i in range(y_ticks + 1):
+        value = y_min + i * (y_max - y_min) / y_ticks
+        below.append(
+            f'<text x="-8" y="{_num(inner_h - i / y_ticks * inner_h)}" text-anchor="end" '
+            f'dominant-baseline="middle" font-size="10" fill="#666">{_num(value)}</text>'
+        )
+    above = [f'<g transform="translate(0,{_num(inner_h + 16)})">']
+    for i, tick in enumerate(ticks):
+        x = (i + 0.5) * inner_w / max(1, len(ticks))
+        above.append(
+            f'<text x="{_num(x)}" y="0" text-anchor="middle" font-size="10" '
+            f'fill="#666">{escape(tick)}</text>'
+        )
+    above.append("</g>")
+    return "".join(below), "".join(above)
+
+
+def _chart(node: ChartNode) -> Tuple[str, str]:
+    p = node.props
+    width, height = p.width, p.height
+    colors = p.colors or CHART_COLORS
+    inner_w = width - CHART_PADDING * 2
+    inner_h = height - CHART_PADDING * 2
+    labels = p.labels or [str(i + 1) for i in range(len(p.series[0].data))]
+    chart_type = p.chartType.value
+
+    parts = [f'<figure data-node-id="{_attr(node.id)}" class="w-full">']
+    if p.title:
+        parts.append(f'<figcaption class="mb-2 font-medium">{escape(p.title)}</figcaption>')
+    parts.append(
+        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+        f'role="img" aria-label="{chart_type} chart">'
+    )
+
+    if chart_type == "pie":
+        values = p.series[0].data
+        total = sum(values) or 1.0
+        cx, cy = width / 2, height / 2
+        r = min(inner_w, inner_h) / 2
+        acc = 0.0
+        for i, value in enumerate(values):
+            start = acc / total * 2 * math.pi
+            acc += value
+            end = acc / total * 2 * math.pi
+            large = 1 if end - start > math.pi else 0
+            d = (
+                f"M {_num(cx)} {_num(cy)} "
+                f"L {_num(cx + r * math.cos(start))} {_num(cy + r * math.sin(start))} "
+                f"A {_num(r)} {_num(r)} 0 {large} 1 "
+                f"{_num(cx + r * math.cos(end))} {_num(cy + r * math.sin(end))} Z"
+            )
+            parts.append(f'<path d="{d}" fill="{_attr(colors[i % len(colors)])}"/>')
+        parts.append("</svg>")
+        if p.showLegend:
+            parts.append(
+                _legend(
+                    [
+                        (labels[i] if i < len(labels) else f"Slice {i + 1}", colors[i % len(colors)])
+                        for i in range(len(values))
+                    ]
+                )
+            )
+        parts.append("</figure>")
+        return "".join(parts), ""
+
+    y_min, y_max = p.yAxis.min, p.yAxis.max
+    span = (y_max - y_min) or 1.0
+
+    def y_of(value: float) -> float:
+        return inner_h - (value - y_min) / span * inner_h
+
+    below, above = _axes(p, labels, inner_w, inner_h)
+    parts.append(f'<g transform="translate({CHART_PADDING},{CHART_PADDING})">{below}')
+    groups = max(1, len(labels))
+    if chart_type == "bar":
+        group_w = inner_w / groups
+        bar_w = group_w / (len(p.series) + 1)
+        for si, series in enumerate(p.series):
+            parts.append(f'<g fill="{_attr(colors[si % len(colors)])}">')
+            for i, value in enumerate(series.data):
+                top = y_of(min(max(value, y_min), y_max))
+                h = max(0.0, y_of(y_min) - top)
+                parts.append(
+                    f'<rect x="{_num(i * group_w + si * bar_w)}" y="{_num(top)}" '
+                    f'width="{_num(bar_w * 0.9)}" height="{_num(h)}" rx="2"/>'
+                )
+            parts.append("</g>")
+    else:
+        x_step = inner_w / max(1, groups - 1)
+        for si, series in enumerate(p.series):
+            points = " ".join(
+                f"{_num(i * x_step)},{_num(y_of(v))}" for i, v in enumerate(series.data)
+            )
+            parts.append(
+                f'<polyline points="{points}" fill="none" '
+                f'stroke="{_attr(colors[si % len(colors)])}" stroke-width="2"/>'
+            )
+    for note in p.annotations:
+        x = note.x / groups * inner_w
+        y = y_of(note.y)
+        parts.append(
+            f'<g><line x1="{_num(x)}" y1="0" x2="{_num(x)}" y2="{_num(inner_h)}" '
+            'stroke="#999" stroke-dasharray="4 2"/>'
+            f'<text x="{_num(x + 4)}" y="{_num(y - 4)}" font-size="10" fill="#333">'
+            f"{escape(note.label)}</text></g>"
+        )
+    parts.append(f"{above}</g></svg>")
+    if p.showLegend:
+        parts.append(
+            _legend(
+                [
+                    (s.name, colors[si % len(colors)])
+                    for si, s in enumerate(p.series)
+                    if s.name
+                ]
+            )
+        )
+    parts.append("</figure>")
+    return "".join(parts), ""
+
+
+RENDERERS: Dict[str, Callable[..., Tuple[str, str]]] = {
+    "button": _button,
+    "input": _input,
+    "textarea": _textarea,
+    "text": _text,
+    "card": _card,
+    "alert": _alert,
+    "container": _container,
+    "grid": _grid,
+    "stack": _stack,
+    "chart": _chart,
+}
+
+
+def render_node(node: Node) -> Tuple[str, str]:
+    """Opening and closing HTML for one node; children go in between."""
+    return RENDERERS[node.type](node)
+
+
+# ============================================================================
+# RENDER CACHE AND TRAVERSAL
+# ============================================================================
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered subtree HTML keyed by subtree hash."""
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            html = self._data.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: bytes, html: str) -> None:
+        with self._lock:
+            self._data[key] = html
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _schema_script(schema: PromptiusGuiSchema) -> str:
+    payload = schema.model_dump_json().replace("</", "<\\/")
+    return f'<script type="application/json" id="promptius-schema">{payload}</script>'
+
+
+def iter_html(
+    schema: PromptiusGuiSchema,
+    cache: Optional[RenderCache] = None,
+    flush_depth: int = 1,
+    embed_schema: bool = False,
+) -> Iterator[str]:
+    """Yield the HTML for ``schema`` in chunks, for streaming responses.
+
+    A chunk is flushed each time a subtree at depth ``flush_depth`` or less
+    is finished. With ``embed_schema`` the schema JSON is appended in a
+    ``<script type="application/json" id="promptius-schema">`` tag for
+    client hydration.
+    """
+    nodes: Dict[str, Node]
+    children: Dict[str, List[Edge]]
+    hashes: Dict[str, bytes] = {}
+    # Children always render in GraphIndex order; hashes are only cache keys
+    if cache is not None:
+        form = Canonical(schema, include_ids=True)
+        nodes, children = form.index.nodes, form.index.child_edges
+        hashes = render_keys(form)
+    else:
+        index = GraphIndex(schema)
+        nodes, children = index.nodes, index.child_edges
+
+    root_id = schema.metadata.rootId
+    parts: List[str] = []
+    base = 0  # number of parts already yielded; frame starts are absolute
+    # Frames: (node_id, closing html, absolute start index, depth)
+    frames: List[Tuple[str, str, int, int]] = []
+    on_path: Set[str] = set()
+    # Work items: node id to open, or None to close the innermost frame.
+    work: List[Tuple[Optional[str], int]] = [(root_id, 0)] if root_id in nodes else []
+
+    while work:
+        node_id, depth = work.pop()
+        if node_id is None:
+            closed_id, closing, start, frame_depth = frames.pop()
+            on_path.discard(closed_id)
+            parts.append(closing)
+            # Subtrees partly flushed already cannot be cached as one string.
+            if cache is not None and start >= base:
+                html = "".join(parts[start - base :])
+                del parts[start - base :]
+                parts.append(html)
+                cache.put(hashes[closed_id], html)
+            if frame_depth <= flush_depth and parts:
+                yield "".join(parts)
+                base += len(parts)
+                parts.clear()
+            continue
+
+        if cache is not None:
+            cached = cache.get(hashes[node_id])
+            if cached is not None:
+                parts.append(cached)
+                continue
+
+        opening, closing = render_node(nodes[node_id])
+        frames.append((node_id, closing, base + len(parts), depth))
+        parts.append(opening)
+        on_path.add(node_id)
+        work.append((None, depth))
+        for edge in reversed(children.get(node_id, ())):
+            # Skip dangling edges and edges that would recurse into an ancestor.
+            if edge.dest in nodes and edge.dest not in on_path:
+                work.append((edge.dest, depth + 1))
+
+    if embed_schema:
+        parts.append(_schema_script(schema))
+    if parts:
+        yield "".join(parts)
+
+
+def render_html(
+    schema: PromptiusGuiSchema,
+    cache: Optional[RenderCache] = None,
+    embed_schema: bool = False,
+) -> str:
+    """Render ``schema`` to a single HTML string."""
+    return "".join(iter_html(schema, cache, embed_schema=embed_schema))
+
+
+def render_document(
+    schema: PromptiusGuiSchema,
+    cache: Optional[RenderCache] = None,
+    stylesheet: str = "",
+) -> Iterator[str]:
+    """Yield a complete HTML page with the schema embedded for hydration."""
+    title = escape(schema.metadata.title)
+    link = f'<link rel="stylesheet" href="{_attr(stylesheet)}">' if stylesheet else ""
+    yield (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f"<title>{title}</title>{link}</head><body><div id=\"root\">"
+    )
+    yield from iter_html(schema, cache)
+    yield "</div>"
+    yield _schema_script(schema)
+    yield "</body></html>"
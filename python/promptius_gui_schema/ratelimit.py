@@ -0,0 +1,242 @@
+"""
+Per-tenant rate limiting and LLM token budgets.
+
+Each tenant has two token buckets: one for requests (``rate`` per second, up to
+``burst`` at once) and one for LLM output tokens (``tokens_per_minute``).
+Output tokens are only known after generation, so they are charged afterwards
+and may drive the budget negative; the tenant is then refused until it refills.
+
+A bucket left idle until both levels are full again is the same as a new one,
+so both limiters drop such buckets every ``sweep_interval`` seconds; a stream
+of one-off tenants does not grow the table.
+
+``RateLimiter`` keeps buckets in process memory and costs a few microseconds
+per check. ``SQLiteRateLimiter`` keeps them in a shared file so several server
+processes enforce one limit, at the price of a write transaction per check.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count for ``text`` (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class Limits:
+    """Bucket sizes for one tenant."""
+
+    __slots__ = ("rate", "burst", "tokens_per_minute")
+
+    def __init__(
+        self, rate: float = 2.0, burst: float = 10.0, tokens_per_minute: float = 100_000
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens_per_minute = tokens_per_minute
+
+    def bucket(self, kind: str) -> Tuple[float, float]:
+        """``(refill per second, capacity)`` of the ``kind`` bucket."""
+        if kind == REQUESTS:
+            return self.rate, self.burst
+        return self.tokens_per_minute / 60.0, self.tokens_per_minute
+
+
+def _refill(
+    level: float, stamp: float, now: float, rate: float, capacity: float
+) -> float:
+    return min(capacity, level + (now - stamp) * rate)
+
+
+def _admit(requests: float, tokens: float, limits: Limits) -> Tuple[bool, float]:
+    """Admission decision for refilled bucket levels and the wait if refused."""
+    wait = 0.0
+    if requests < 1.0:
+        wait = (1.0 - requests) / limits.rate if limits.rate > 0 else float("inf")
+    if tokens < 0.0:
+        refill = limits.tokens_per_minute / 60.0
+        wait = max(wait, -tokens / refill if refill > 0 else float("inf"))
+    return wait == 0.0, wait
+
+
+class RateLimiter:
+    """In-process token buckets keyed by tenant.
+
+    ``acquire`` admits or refuses one request and returns the seconds to wait
+    before retrying (``0.0`` when admitted); ``charge`` bills output tokens.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Limits] = None,
+        tenant_limits: Optional[Mapping[str, Limits]] = None,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self.limits = limits or Limits()
+        self.tenant_limits: Dict[str, Limits] = dict(tenant_limits or {})
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # tenant -> [requests level, tokens level, last refill]
+        self._buckets: Dict[str, list] = {}
+        self._swept = time.monotonic()
+
+    def limits_for(self, tenant: str) -> Limits:
+        return self.tenant_limits.get(tenant, self.limits)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _sweep(self, now: float) -> None:
+        """Drop buckets that have refilled completely (call with the lock)."""
+        self._swept = now
+        for tenant in list(self._buckets):
+            limits = self.limits_for(tenant)
+            state = self._state(tenant, limits, now)
+            if state[0] >= limits.burst and state[1] >= limits.tokens_per_minute:
+                del self._buckets[tenant]
+
+    def _state(self, tenant: str, limits: Limits, now: float) -> list:
+        state = self._buckets.get(tenant)
+        if state is None:
+            state = [limits.burst, limits.tokens_per_minute, now]
+            self._buckets[tenant] = state
+            return state
+        elapsed = now - state[2]
+        if elapsed > 0:
+            state[0] = min(limits.burst, state[0] + elapsed * limits.rate)
+            state[1] = min(
+                limits.tokens_per_minute,
+                state[1] + elapsed * limits.tokens_per_minute / 60.0,
+            )
+            state[2] = now
+        return state
+
+    def acquire(self, tenant: str) -> float:
+        limits = self.limits_for(tenant)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept >= self.sweep_interval:
+                self._sweep(now)
+            state = self._state(tenant, limits, now)
+            admitted, wait = _admit(state[0], state[1], limits)
+            if admitted:
+                state[0] -= 1.0
+        return wait
+
+    def charge(self, tenant: str, tokens: int) -> None:
+        limits = self.limits_for(tenant)
+        with self._lock:
+            self._state(tenant, limits, time.monotonic())[1] -= tokens
+
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS buckets (
+    tenant TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    level REAL NOT NULL,
+    stamp REAL NOT NULL,
+    PRIMARY KEY (tenant, kind)
+);
+"""
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Token buckets in a SQLite file shared by several processes."""
+
+    def __init__(
+        self,
+        path: str,
+        limits: Optional[Limits] = None,
+        tenant_limits: Optional[Mapping[str, Limits]] = None,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        super().__init__(limits, tenant_limits, sweep_interval)
+        self._swept = time.time()
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA_SQL)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(DISTINCT tenant) FROM buckets"
+            ).fetchone()[0]
+
+    def _sweep(self, now: float) -> None:
+        self._swept = now
+        full = []
+        for tenant in [
+            row[0] for row in self._conn.execute("SELECT DISTINCT tenant FROM buckets")
+        ]:
+            limits = self.limits_for(tenant)
+            levels = self._levels(tenant, limits, now)
+            if all(
+                levels[kind] >= limits.bucket(kind)[1] for kind in (REQUESTS, TOKENS)
+            ):
+                full.append((tenant,))
+        self._conn.executemany("DELETE FROM buckets WHERE tenant = ?", full)
+
+    def _levels(self, tenant: str, limits: Limits, now: float) -> Dict[str, float]:
+        rows = dict(
+            (kind, (level, stamp))
+            for kind, level, stamp in self._conn.execute(
+                "SELECT kind, level, stamp FROM buckets WHERE tenant = ?", (tenant,)
+            )
+        )
+        levels = {}
+        for kind in (REQUESTS, TOKENS):
+            rate, capacity = limits.bucket(kind)
+            level, stamp = rows.get(kind, (capacity, now))
+            levels[kind] = _refill(level, stamp, now, rate, capacity)
+        return levels
+
+    def _store(self, tenant: str, levels: Dict[str, float], now: float) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+            [(tenant, kind, level, now) for kind, level in levels.items()],
+        )
+
+    def _update(self, tenant: str, requests: float, tokens: float) -> float:
+        # Wall-clock time: monotonic clocks are not comparable across processes.
+        limits = self.limits_for(tenant)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if requests and now - self._swept >= self.sweep_interval:
+                    self._sweep(now)
+                levels = self._levels(tenant, limits, now)
+                wait = 0.0
+                if requests:
+                    admitted, wait = _admit(levels[REQUESTS], levels[TOKENS], limits)
+                    if admitted:
+                        levels[REQUESTS] -= requests
+                levels[TOKENS] -= tokens
+                self._store(tenant, levels, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, tenant: str) -> float:
+        return self._update(tenant, 1.0, 0.0)
+
+    def charge(self, tenant: str, tokens: int) -> None:
+        self._update(tenant, 0.0, float(tokens))
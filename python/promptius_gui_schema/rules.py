@@ -0,0 +1,426 @@
+"""
+A small rule language for ``ValidateAction.rules`` and its compiler.
+
+Each rule string is one check, optionally aimed at a field by node id::
+
+    rule    := ["@" node_id WS] name [(":" | "=") argument]
+
+    required                      value present and not blank
+    email | url | number | integer | tel | date
+                                  value has that format
+    minLength=N | maxLength=N     length bounds (characters)
+    length=N | length=N..M        exact length or bounds; either side may
+                                  be left out (``..20``)
+    min=X | max=X | range=X..Y    numeric bounds; implies ``number``
+    pattern=REGEX                 must match somewhere, as ``re.search``;
+                                  ``/REGEX/`` is accepted too. Patterns run
+                                  on ``patterns.LinearPattern``, so no
+                                  backreferences or lookarounds, and values
+                                  over ``MAX_MATCH_LENGTH`` are refused
+
+Names are case insensitive and ignore ``_`` and ``-`` (``min_length``,
+``max-length``). ``parse_rule`` raises ``RuleError`` for anything else.
+
+Rules for a field merge into one ``Constraints`` (the tightest bounds win).
+``compile_rules`` turns the constraints of a whole form into generated Python
+source, like ``schemacheck`` does for the JSON Schema: one straight-line
+function with the regexes precompiled and one ``elif`` chain per field, so a
+payload is checked without looking at a rule string. ``CompiledRules.to_json``
+exports the same constraints (with JSON Schema keyword names) for clients.
+Compile once per schema and keep the result; ``forms.RouterCache`` does that
+by schema hash.
+"""
+
+from __future__ import annotations
+
+import datetime
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .patterns import LinearPattern, PatternError
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s.]+$")
+_TEL = re.compile(r"^\+?[0-9][0-9 ()./-]{2,}$")
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _is_url(value: str) -> bool:
+    parts = urlsplit(value)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+
+def _is_number(value: str) -> bool:
+    return _number(value) is not None
+
+
+def _is_integer(value: str) -> bool:
+    number = _number(value)
+    return number is not None and number.is_integer()
+
+
+def _is_date(value: str) -> bool:
+    try:
+        datetime.date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+# Format checks by name: the ``format`` rules, and the input types that have
+# one (text, password and search inputs have none).
+TYPE_CHECKS: Dict[str, Callable[[str], Any]] = {
+    "email": _EMAIL.match,
+    "url": _is_url,
+    "number": _is_number,
+    "integer": _is_integer,
+    "tel": _TEL.match,
+    "date": _is_date,
+}
+
+# Normalized spelling -> rule name
+_NAMES = {
+    "required": "required",
+    "minlength": "minLength",
+    "minlen": "minLength",
+    "maxlength": "maxLength",
+    "maxlen": "maxLength",
+    "length": "length",
+    "min": "min",
+    "minimum": "min",
+    "max": "max",
+    "maximum": "max",
+    "range": "range",
+    "pattern": "pattern",
+    "regex": "pattern",
+    "numeric": "number",
+}
+_NAMES.update({name: name for name in TYPE_CHECKS})
+RULE_NAMES = frozenset(_NAMES.values())
+
+# Patterns come from generated schemas and run on unauthenticated
+# submissions: they never backtrack (``LinearPattern``), their source is
+# capped and values longer than MAX_MATCH_LENGTH are refused before matching.
+MAX_PATTERN_LENGTH = 256
+MAX_MATCH_LENGTH = 256
+
+_RULE = re.compile(
+    r"(?:@(?P<target>\S+)\s+)?(?P<name>[A-Za-z][A-Za-z_-]*)"
+    r"\s*(?:[:=]\s*(?P<arg>.*))?",
+    re.DOTALL,
+)
+
+
+class RuleError(ValueError):
+    """A rule string that is not in the rule language."""
+
+    def __init__(self, rule: str, message: str) -> None:
+        super().__init__(f"rule {rule!r}: {message}")
+        self.rule = rule
+
+
+class Rule(NamedTuple):
+    """One parsed rule; ``value`` depends on ``name``.
+
+    ``None`` for required and the formats, an ``int`` for minLength and
+    maxLength, a number for min and max, ``(low, high)`` (either may be
+    ``None``) for length and range, and the regex source for pattern.
+    """
+
+    target: Optional[str]
+    name: str
+    value: Any = None
+
+
+def _parse_int(rule: str, text: str) -> int:
+    if not (text.isascii() and text.isdigit()):
+        raise RuleError(rule, f"expected a non-negative integer, got {text!r}")
+    return int(text)
+
+
+def _parse_number(rule: str, text: str) -> float:
+    try:
+        number = int(text)
+    except ValueError:
+        number = _number(text)  # type: ignore[assignment]
+        if number is None:
+            raise RuleError(rule, f"expected a number, got {text!r}") from None
+    return number
+
+
+def _parse_bounds(rule: str, text: str, parse: Callable[[str, str], Any]) -> Any:
+    low, sep, high = text.partition("..")
+    if not sep:
+        value = parse(rule, text)
+        return value, value
+    bounds = (
+        parse(rule, low.strip()) if low.strip() else None,
+        parse(rule, high.strip()) if high.strip() else None,
+    )
+    if bounds == (None, None):
+        raise RuleError(rule, "expected at least one bound")
+    if None not in bounds and bounds[0] > bounds[1]:
+        raise RuleError(rule, "lower bound is above the upper bound")
+    return bounds
+
+
+def _check_pattern(rule: str, source: str) -> None:
+    if len(source) > MAX_PATTERN_LENGTH:
+        raise RuleError(
+            rule, f"pattern is longer than {MAX_PATTERN_LENGTH} characters"
+        )
+    try:
+        LinearPattern(source)
+    except PatternError as exc:
+        raise RuleError(rule, str(exc)) from None
+
+
+def parse_rule(text: str) -> Rule:
+    """Parse one rule string; raises ``RuleError``."""
+    rule = text.strip()
+    match = _RULE.fullmatch(rule)
+    if match is None:
+        raise RuleError(text, "expected '[@field] name[=argument]'")
+    target, arg = match["target"], match["arg"]
+    spelling = match["name"].lower().replace("_", "").replace("-", "")
+    name = _NAMES.get(spelling)
+    if name is None:
+        raise RuleError(text, f"unknown rule {match['name']!r}")
+    if name == "required" or name in TYPE_CHECKS:
+        if arg is not None:
+            raise RuleError(text, f"{name} takes no argument")
+        return Rule(target, name)
+    if not arg:
+        raise RuleError(text, f"{name} needs an argument")
+    if name in ("minLength", "maxLength"):
+        return Rule(target, name, _parse_int(text, arg))
+    if name in ("min", "max"):
+        return Rule(target, name, _parse_number(text, arg))
+    if name == "length":
+        return Rule(target, name, _parse_bounds(text, arg, _parse_int))
+    if name == "range":
+        return Rule(target, name, _parse_bounds(text, arg, _parse_number))
+    if len(arg) >= 2 and arg[0] == "/" and arg[-1] == "/":
+        arg = arg[1:-1]
+    _check_pattern(text, arg)
+    return Rule(target, name, arg)
+
+
+def parse_rules(rules: Iterable[str]) -> List[Rule]:
+    """Parse every rule string; raises ``RuleError`` on the first bad one."""
+    return [parse_rule(rule) for rule in rules]
+
+
+@dataclass
+class Constraints:
+    """Merged checks for one field."""
+
+    required: bool = False
+    min_length: int = 0
+    max_length: Optional[int] = None
+    formats: List[str] = field(default_factory=list)
+    patterns: List[str] = field(default_factory=list)
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+    def add(self, rule: Rule) -> None:
+        """Tighten these constraints by ``rule`` (its target is ignored)."""
+        name, value = rule.name, rule.value
+        if name == "required":
+            self.required = True
+        elif name in TYPE_CHECKS:
+            if name not in self.formats:
+                self.formats.append(name)
+        elif name == "pattern":
+            if value not in self.patterns:
+                self.patterns.append(value)
+        elif name in ("minLength", "maxLength", "length"):
+            low, high = {
+                "minLength": (value, None),
+                "maxLength": (None, value),
+            }.get(name, value)
+            if low is not None:
+                self.min_length = max(self.min_length, low)
+            if high is not None:
+                self.max_length = (
+                    high if self.max_length is None else min(self.max_length, high)
+                )
+        else:
+            low, high = {"min": (value, None), "max": (None, value)}.get(name, value)
+            if low is not None:
+                self.minimum = low if self.minimum is None else max(self.minimum, low)
+            if high is not None:
+                self.maximum = high if self.maximum is None else min(self.maximum, high)
+
+    def to_json(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"required": self.required}
+        if self.min_length:
+            data["minLength"] = self.min_length
+        if self.max_length is not None:
+            data["maxLength"] = self.max_length
+        if self.formats:
+            data["format"] = list(self.formats)
+        if self.patterns:
+            data["pattern"] = list(self.patterns)
+        if self.minimum is not None:
+            data["minimum"] = self.minimum
+        if self.maximum is not None:
+            data["maximum"] = self.maximum
+        return data
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.constants: Dict[str, Any] = {"_number": _number}
+        self.counter = 0
+
+    def constant(self, prefix: str, value: Any) -> str:
+        self.counter += 1
+        name = f"{prefix}{self.counter}"
+        self.constants[name] = value
+        return name
+
+    def field(self, name: str, rules: Constraints, out: List[str]) -> None:
+        key = repr(name)
+        out.append(f"    v = p.get({key})")
+        if rules.required:
+            out.append("    if v is None or v == '':")
+            out.append(f"        errors[{key}] = 'required'")
+            out.append(
+                "    elif type(v) is not str and type(v) is not int"
+                " and type(v) is not float:"
+            )
+        else:
+            out.append("    if v is None or v == '':")
+            out.append("        pass")
+            out.append(
+                "    elif type(v) is not str and type(v) is not int"
+                " and type(v) is not float:"
+            )
+        out.append(f"        errors[{key}] = 'must be a string'")
+        out.append("    else:")
+        out.append("        s = v if type(v) is str else str(v)")
+        chain = []
+        if rules.required:
+            chain.append(("not s.strip()", "required"))
+        if rules.min_length:
+            chain.append(
+                (
+                    f"len(s) < {rules.min_length}",
+                    f"shorter than {rules.min_length} characters",
+                )
+            )
+        if rules.max_length is not None:
+            chain.append(
+                (
+                    f"len(s) > {rules.max_length}",
+                    f"longer than {rules.max_length} characters",
+                )
+            )
+        ranged = rules.minimum is not None or rules.maximum is not None
+        for kind in rules.formats:
+            if ranged and kind == "number":
+                continue  # the range check parses the number
+            check = self.constant(f"is_{kind}_", TYPE_CHECKS[kind])
+            chain.append((f"not {check}(s)", f"not a valid {kind}"))
+        if rules.patterns:
+            chain.append(
+                (f"len(s) > {MAX_MATCH_LENGTH}", "too long to match the pattern")
+            )
+        for source in rules.patterns:
+            pattern = self.constant("pattern", LinearPattern(source))
+            chain.append((f"not {pattern}.search(s)", f"does not match /{source}/"))
+        keyword = "if"
+        for condition, message in chain:
+            out.append(f"        {keyword} {condition}:")
+            out.append(f"            errors[{key}] = {message!r}")
+            keyword = "elif"
+        if not ranged:
+            if not chain:
+                out.append("        pass")
+            return
+        pad = "        "
+        if chain:
+            out.append("        else:")
+            pad += "    "
+        out.append(f"{pad}n = _number(s)")
+        out.append(f"{pad}if n is None:")
+        out.append(f"{pad}    errors[{key}] = 'not a valid number'")
+        for bound, op, word in (
+            (rules.minimum, "<", "less"),
+            (rules.maximum, ">", "greater"),
+        ):
+            if bound is not None:
+                out.append(f"{pad}elif n {op} {bound!r}:")
+                out.append(f"{pad}    errors[{key}] = {f'{word} than {bound}'!r}")
+
+    def source(self, fields: Mapping[str, Constraints]) -> str:
+        names = self.constant("fields", frozenset(fields))
+        out = [
+            "def check(p):",
+            "    errors = {}",
+            f"    if not {names}.issuperset(p):",
+            "        for k in p:",
+            f"            if k not in {names}:",
+            "                errors[k] = 'unexpected field'",
+        ]
+        for name, rules in fields.items():
+            self.field(name, rules, out)
+        out.append("    return errors")
+        return "\n".join(out) + "\n"
+
+
+class CompiledRules:
+    """``check(payload) -> {field: message}`` for one form; see the module.
+
+    Payloads map field names to strings (numbers are checked as their
+    ``str``); unknown names are rejected, the first failing check of a
+    field is its message, and an empty dict means the payload passed.
+    """
+
+    def __init__(self, fields: Mapping[str, Constraints]) -> None:
+        self.fields = dict(fields)
+        compiler = _Compiler()
+        self.source = compiler.source(self.fields)
+        namespace: Dict[str, Any] = dict(compiler.constants)
+        exec(compile(self.source, "<promptius rules>", "exec"), namespace)
+        self._check: Callable[[Mapping[str, Any]], Dict[str, str]] = namespace[
+            "check"
+        ]
+
+    def __call__(self, payload: Mapping[str, Any]) -> Dict[str, str]:
+        return self._check(payload)
+
+    def check(self, payload: Mapping[str, Any]) -> Dict[str, str]:
+        return self._check(payload)
+
+    def to_json(self) -> Dict[str, Dict[str, Any]]:
+        """Constraints by field, for validating on another runtime."""
+        return {name: rules.to_json() for name, rules in self.fields.items()}
+
+
+def compile_rules(
+    fields: Mapping[str, "Constraints | Iterable[str | Rule]"],
+) -> CompiledRules:
+    """Compile per-field ``Constraints`` (or rule strings) into a checker.
+
+    Targets of rules given this way are ignored; each applies to its key.
+    """
+    merged: Dict[str, Constraints] = {}
+    for name, rules in fields.items():
+        if isinstance(rules, Constraints):
+            merged[name] = rules
+            continue
+        merged[name] = constraints = Constraints()
+        for rule in rules:
+            constraints.add(parse_rule(rule) if isinstance(rule, str) else rule)
+    return CompiledRules(merged)
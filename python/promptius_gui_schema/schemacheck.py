@@ -0,0 +1,400 @@
+"""
+Compiled yes/no validation against ``schema/promptius-gui-schema.json``.
+
+Services that only need to know whether a document conforms can skip
+building Pydantic models. ``compile_schema`` turns the JSON Schema into
+generated Python source with ``$defs`` inlined into straight-line checks:
+exact ``type()`` tests, ``frozenset`` enum lookups, precompiled ``pattern``
+regexes, and ``oneOf`` + ``discriminator`` unions dispatched through a dict
+on the ``type`` value to one function per member instead of trying every
+branch.
+
+Only the keyword subset the schema uses is supported (``type``,
+``properties``, ``required``, ``additionalProperties``, ``items``,
+``minItems``/``maxItems``, ``enum``, ``const``, ``minLength``/``maxLength``,
+``pattern``, ``minimum``/``maximum``, ``oneOf``, local ``$ref``); any other
+validation keyword raises ``UnsupportedSchemaError`` at compile time rather
+than being ignored. Results follow JSON Schema semantics, so unlike the
+Pydantic models unknown properties are rejected where the schema says
+``additionalProperties: false``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+# Keywords that do not affect validation.
+_ANNOTATIONS = frozenset(
+    [
+        "$schema",
+        "$id",
+        "$comment",
+        "title",
+        "description",
+        "default",
+        "examples",
+        "version",
+        "discriminator",
+        "$defs",
+    ]
+)
+
+_SUPPORTED = _ANNOTATIONS | {
+    "type",
+    "properties",
+    "required",
+    "additionalProperties",
+    "items",
+    "minItems",
+    "maxItems",
+    "enum",
+    "const",
+    "minLength",
+    "maxLength",
+    "pattern",
+    "minimum",
+    "maximum",
+    "exclusiveMinimum",
+    "exclusiveMaximum",
+    "oneOf",
+    "$ref",
+}
+
+# ``type`` keyword -> expression testing ``{v}``. JSON numbers include
+# integers; ``bool`` is its own Python type, so ``type(v) is int`` excludes it.
+_TYPE_TESTS = {
+    "object": "type({v}) is dict",
+    "array": "type({v}) is list",
+    "string": "type({v}) is str",
+    "boolean": "type({v}) is bool",
+    "null": "{v} is None",
+    "number": "(type({v}) is int or type({v}) is float)",
+    "integer": "(type({v}) is int or (type({v}) is float and {v}.is_integer()))",
+}
+
+_STRING_KEYWORDS = ("minLength", "maxLength", "pattern")
+_NUMBER_KEYWORDS = ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")
+_ARRAY_KEYWORDS = ("items", "minItems", "maxItems")
+_OBJECT_KEYWORDS = ("properties", "required", "additionalProperties")
+
+
+class UnsupportedSchemaError(ValueError):
+    """The schema uses a keyword or ``$ref`` form the compiler does not know."""
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """JSON equality: ``1 == 1.0`` but ``True != 1``."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_json_equal, a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    return a == b
+
+
+class _Compiler:
+    def __init__(self, root: Mapping[str, Any]) -> None:
+        self.root = root
+        self.defs: Mapping[str, Any] = root.get("$defs", {})
+        self.functions: List[str] = []
+        self.names: Dict[str, str] = {}  # $ref -> function name
+        self.constants: Dict[str, Any] = {}
+        self.inlining: List[str] = []
+        self.counter = 0
+
+    def fresh(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def constant(self, prefix: str, value: Any) -> str:
+        name = self.fresh(prefix)
+        self.constants[name] = value
+        return name
+
+    def resolve(self, ref: str) -> Any:
+        if not ref.startswith("#/$defs/") or "/" in ref[len("#/$defs/"):]:
+            raise UnsupportedSchemaError(f"Unsupported $ref {ref!r}")
+        key = ref[len("#/$defs/"):]
+        if key not in self.defs:
+            raise UnsupportedSchemaError(f"Unknown $ref {ref!r}")
+        return self.defs[key]
+
+    def ref(self, ref: str) -> str:
+        """Function name for a ``$ref``, compiling the target once."""
+        name = self.names.get(ref)
+        if name is None:
+            target = self.resolve(ref)
+            name = self.names[ref] = "check_" + re.sub(r"\W", "_", ref[8:])
+            self.function(name, target, ref)
+        return name
+
+    def function(self, name: str, schema: Mapping[str, Any], path: str) -> str:
+        body: List[str] = []
+        self.emit(schema, "v0", body, "    ", path)
+        self.functions.append(
+            "\n".join([f"def {name}(v0):"] + body + ["    return True", ""])
+        )
+        return name
+
+    def subschema(self, schema: Mapping[str, Any], path: str) -> str:
+        """A function for ``schema``; plain ``$ref`` reuses the def's."""
+        if set(schema) - _ANNOTATIONS == {"$ref"}:
+            return self.ref(schema["$ref"])
+        return self.function(self.fresh("check_anon"), schema, path)
+
+    def emit(self, schema: Any, v: str, out: List[str], pad: str, path: str) -> None:
+        """Append statements that ``return False`` unless ``v`` matches."""
+        if schema is True or schema == {}:
+            return
+        if schema is False:
+            out.append(f"{pad}return False")
+            return
+        unknown = set(schema) - _SUPPORTED
+        if unknown:
+            raise UnsupportedSchemaError(
+                f"Unsupported keyword(s) {sorted(unknown)} at {path}"
+            )
+        if "$ref" in schema:
+            # Inline the target unless it is already being inlined (recursion).
+            ref = schema["$ref"]
+            if ref in self.inlining:
+                out.append(f"{pad}if not {self.ref(ref)}({v}): return False")
+            else:
+                self.inlining.append(ref)
+                self.emit(self.resolve(ref), v, out, pad, ref)
+                self.inlining.pop()
+        kind = schema.get("type")
+        if kind is not None:
+            kinds = [kind] if isinstance(kind, str) else list(kind)
+            test = " or ".join(_TYPE_TESTS[k].format(v=v) for k in kinds)
+            out.append(f"{pad}if not ({test}): return False")
+        if "const" in schema:
+            self.emit_const(schema["const"], v, out, pad)
+        if "enum" in schema:
+            self.emit_enum(schema["enum"], v, out, pad, kind == "string")
+        for keywords, group, emit in (
+            (_STRING_KEYWORDS, "string", self.emit_string),
+            (_NUMBER_KEYWORDS, "number", self.emit_number),
+            (_ARRAY_KEYWORDS, "array", self.emit_array),
+            (_OBJECT_KEYWORDS, "object", self.emit_object),
+        ):
+            if any(k in schema for k in keywords):
+                self.emit_guarded(schema, group, kind, v, out, pad, path, emit)
+        if "oneOf" in schema:
+            self.emit_one_of(schema, v, out, pad, path)
+
+    def emit_guarded(
+        self,
+        schema: Mapping[str, Any],
+        kind: str,
+        declared: Any,
+        v: str,
+        out: List[str],
+        pad: str,
+        path: str,
+        emit: Callable[..., None],
+    ) -> None:
+        # Type-specific keywords only apply to instances of that type; skip
+        # the guard when ``type`` already pinned it down.
+        if declared == kind or (kind == "number" and declared == "integer"):
+            emit(schema, v, out, pad, path)
+            return
+        out.append(f"{pad}if {_TYPE_TESTS[kind].format(v=v)}:")
+        inner: List[str] = []
+        emit(schema, v, inner, pad + "    ", path)
+        out.extend(inner or [f"{pad}    pass"])
+
+    def emit_const(self, value: Any, v: str, out: List[str], pad: str) -> None:
+        if isinstance(value, str):
+            out.append(f"{pad}if {v} != {value!r}: return False")
+        else:
+            name = self.constant("const", value)
+            out.append(f"{pad}if not _json_equal({v}, {name}): return False")
+
+    def emit_enum(
+        self, values: List[Any], v: str, out: List[str], pad: str, is_str: bool
+    ) -> None:
+        if all(isinstance(value, str) for value in values):
+            name = self.constant("enum", frozenset(values))
+            guard = "" if is_str else f"type({v}) is not str or "
+            out.append(f"{pad}if {guard}{v} not in {name}: return False")
+        else:
+            name = self.constant("enum", tuple(values))
+            out.append(
+                f"{pad}if not any(_json_equal({v}, e) for e in {name}): return False"
+            )
+
+    def emit_string(
+        self, schema: Mapping[str, Any], v: str, out: List[str], pad: str, path: str
+    ) -> None:
+        if "minLength" in schema:
+            out.append(f"{pad}if len({v}) < {int(schema['minLength'])}: return False")
+        if "maxLength" in schema:
+            out.append(f"{pad}if len({v}) > {int(schema['maxLength'])}: return False")
+        if "pattern" in schema:
+            name = self.constant("pattern", re.compile(schema["pattern"]))
+            out.append(f"{pad}if {name}.search({v}) is None: return False")
+
+    def emit_number(
+        self, schema: Mapping[str, Any], v: str, out: List[str], pad: str, path: str
+    ) -> None:
+        for keyword, op in (
+            ("minimum", "<"),
+            ("maximum", ">"),
+            ("exclusiveMinimum", "<="),
+            ("exclusiveMaximum", ">="),
+        ):
+            if keyword in schema:
+                out.append(f"{pad}if {v} {op} {schema[keyword]!r}: return False")
+
+    def emit_array(
+        self, schema: Mapping[str, Any], v: str, out: List[str], pad: str, path: str
+    ) -> None:
+        if "minItems" in schema:
+            out.append(f"{pad}if len({v}) < {int(schema['minItems'])}: return False")
+        if "maxItems" in schema:
+            out.append(f"{pad}if len({v}) > {int(schema['maxItems'])}: return False")
+        items = schema.get("items")
+        if items is None or items is True or items == {}:
+            return
+        item = self.fresh("v")
+        inner: List[str] = []
+        self.emit(items, item, inner, pad + "    ", f"{path}/items")
+        if inner:
+            out.append(f"{pad}for {item} in {v}:")
+            out.extend(inner)
+
+    def emit_object(
+        self, schema: Mapping[str, Any], v: str, out: List[str], pad: str, path: str
+    ) -> None:
+        properties: Mapping[str, Any] = schema.get("properties", {})
+        required = list(schema.get("required", ()))
+        additional = schema.get("additionalProperties", True)
+        if required:
+            missing = " or ".join(f"{key!r} not in {v}" for key in required)
+            out.append(f"{pad}if {missing}: return False")
+        if additional is False:
+            allowed = self.constant("keys", frozenset(properties))
+            if set(required) == set(properties):
+                # Every allowed key is present, so extras show in the size.
+                out.append(f"{pad}if len({v}) != {len(properties)}: return False")
+            else:
+                out.append(f"{pad}if not {allowed}.issuperset({v}): return False")
+        elif additional is not True:
+            raise UnsupportedSchemaError(
+                f"Only boolean additionalProperties is supported at {path}"
+            )
+        for key, subschema in properties.items():
+            inner: List[str] = []
+            item = self.fresh("v")
+            inner_pad = pad if key in required else pad + "    "
+            self.emit(subschema, item, inner, inner_pad, f"{path}/properties/{key}")
+            if not inner:
+                continue
+            if key in required:
+                out.append(f"{pad}{item} = {v}[{key!r}]")
+            else:
+                out.append(f"{pad}if {key!r} in {v}:")
+                out.append(f"{inner_pad}{item} = {v}[{key!r}]")
+            out.extend(inner)
+
+    def emit_one_of(
+        self, schema: Mapping[str, Any], v: str, out: List[str], pad: str, path: str
+    ) -> None:
+        branches = schema["oneOf"]
+        dispatch = self.dispatch_table(schema)
+        if dispatch is not None:
+            prop, table = dispatch
+            name = self.constant("dispatch", None)
+            self.constants[name] = table  # filled with functions after exec
+            tag = self.fresh("t")
+            out.append(f"{pad}if type({v}) is not dict: return False")
+            out.append(f"{pad}{tag} = {v}.get({prop!r})")
+            out.append(f"{pad}if type({tag}) is not str: return False")
+            out.append(f"{pad}{tag} = {name}.get({tag})")
+            out.append(f"{pad}if {tag} is None or not {tag}({v}): return False")
+            return
+        functions = [
+            self.subschema(branch, f"{path}/oneOf/{i}")
+            for i, branch in enumerate(branches)
+        ]
+        calls = " + ".join(f"bool({f}({v}))" for f in functions)
+        out.append(f"{pad}if {calls} != 1: return False")
+
+    def dispatch_table(
+        self, schema: Mapping[str, Any]
+    ) -> Optional[Tuple[str, Dict[str, str]]]:
+        """``(property, {tag: function name})`` when the ``oneOf`` branches
+        are told apart by a distinct string ``const`` on the discriminator
+        property, so dispatching on it is equivalent to trying each branch."""
+        discriminator = schema.get("discriminator")
+        if not isinstance(discriminator, dict) or "propertyName" not in discriminator:
+            return None
+        prop = discriminator["propertyName"]
+        table: Dict[str, str] = {}
+        for branch in schema["oneOf"]:
+            target = branch
+            if set(branch) - _ANNOTATIONS == {"$ref"}:
+                ref = branch["$ref"]
+                if not ref.startswith("#/$defs/"):
+                    return None
+                target = self.defs.get(ref[len("#/$defs/"):], {})
+            const = target.get("properties", {}).get(prop, {}).get("const")
+            if (
+                not isinstance(const, str)
+                or const in table
+                or prop not in target.get("required", ())
+            ):
+                return None
+            table[const] = self.subschema(branch, f"oneOf/{const}")
+        return prop, table
+
+    def source(self) -> str:
+        self.function("check_root", self.root, "#")
+        return "\n".join(self.functions)
+
+
+class CompiledSchema:
+    """``validate(document) -> bool`` for one JSON Schema; see the module."""
+
+    def __init__(self, schema: Mapping[str, Any]) -> None:
+        compiler = _Compiler(schema)
+        self.source = compiler.source()
+        namespace: Dict[str, Any] = {"_json_equal": _json_equal}
+        namespace.update(compiler.constants)
+        exec(compile(self.source, "<promptius schemacheck>", "exec"), namespace)
+        for name, value in compiler.constants.items():
+            if name.startswith("dispatch"):
+                namespace[name] = {tag: namespace[fn] for tag, fn in value.items()}
+        self._check: Callable[[Any], bool] = namespace["check_root"]
+
+    def __call__(self, document: Any) -> bool:
+        return self._check(document)
+
+    def validate(self, document: Any) -> bool:
+        return self._check(document)
+
+    def validate_json(self, data: Union[str, bytes]) -> bool:
+        try:
+            document = json.loads(data)
+        except ValueError:
+            return False
+        return self._check(document)
+
+
+def compile_schema(
+    source: Union[Mapping[str, Any], str, "os.PathLike[str]"],
+) -> CompiledSchema:
+    """Compile a JSON Schema given as a dict or a path to a JSON file."""
+    if not isinstance(source, Mapping):
+        with open(source, encoding="utf-8") as fp:
+            source = json.load(fp)
+    return CompiledSchema(source)
@@ -0,0 +1,330 @@
+"""
+Content-addressed persistent store for PromptiusGuiSchema documents.
+
+Every node is stored as a fragment holding its type, props and the hashes of
+its ordered children, so a fragment's hash covers its whole subtree
+(Merkle-style). Identical cards, button groups and other subtrees shared between
+schemas are written once; a schema record only keeps its metadata, root hashes,
+node ids and events.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import Edge, PromptiusGuiSchema
+from .graph import GraphIndex
+
+# SQLite's default limit on host parameters is 999 in older builds.
+_BATCH = 500
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS fragments (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schemas (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    node_count INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _chunks(items: List[str], size: int = _BATCH) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+@dataclass
+class StoreStats:
+    """Dedup and throughput figures for a ``SchemaStore``.
+
+    ``dedup_ratio`` is logical nodes written across all stored schemas divided
+    by unique fragments on disk. Throughput figures cover this process only.
+    """
+
+    schemas: int
+    logical_nodes: int
+    unique_fragments: int
+    fragment_bytes: int
+    writes: int
+    reads: int
+    write_seconds: float
+    read_seconds: float
+
+    @property
+    def dedup_ratio(self) -> float:
+        if not self.unique_fragments:
+            return 1.0
+        return self.logical_nodes / self.unique_fragments
+
+    @property
+    def writes_per_second(self) -> float:
+        return self.writes / self.write_seconds if self.write_seconds else 0.0
+
+    @property
+    def reads_per_second(self) -> float:
+        return self.reads / self.read_seconds if self.read_seconds else 0.0
+
+
+@dataclass
+class Decomposition:
+    """A schema split into content-addressed fragments.
+
+    Fragments carry no node ids, so equal subtrees dedupe even when the LLM
+    picked different ids; the ids are kept per schema in fragment pre-order.
+    """
+
+    hashes: Dict[str, str]
+    bodies: Dict[str, bytes]
+    roots: List[str]
+    ids: List[str]
+    loose_edges: List[Dict[str, Any]]
+
+
+def decompose(schema: PromptiusGuiSchema) -> Decomposition:
+    """Hash every node of ``schema`` bottom-up into Merkle fragments.
+
+    ``roots`` starts with the root id (left out when ``metadata.rootId`` names
+    no node), followed by unreachable nodes that head their own trees. Edges that cannot be part of a Merkle tree (dangling
+    endpoints and edges closing a cycle) are returned as ``loose_edges``.
+    """
+    index = GraphIndex(schema)
+    nodes = index.nodes
+    loose_edges = [edge.model_dump() for edge in schema.edges if edge.src not in nodes]
+    tree: Dict[str, List[Edge]] = {}
+    hashes: Dict[str, str] = {}
+    bodies: Dict[str, bytes] = {}
+
+    candidates = [index.root_id] if index.root_id in nodes else []
+    candidates += index.orphans()
+    on_stack = set()
+    for root in candidates:
+        # Iterative post-order DFS over (node_id, expanded?) entries.
+        stack: List[Tuple[str, bool]] = [(root, False)]
+        while stack:
+            node_id, expanded = stack.pop()
+            if expanded:
+                on_stack.discard(node_id)
+                node = nodes[node_id]
+                body = _dumps(
+                    {
+                        "type": node.type,
+                        "props": node.props.model_dump(mode="json"),
+                        "children": [[e.order, hashes[e.dest]] for e in tree[node_id]],
+                    }
+                )
+                digest = _digest(body)
+                hashes[node_id] = digest
+                bodies[digest] = body
+                continue
+            if node_id in hashes:
+                continue
+            on_stack.add(node_id)
+            stack.append((node_id, True))
+            kept = []
+            for edge in index.child_edges.get(node_id, ()):
+                if edge.dest not in nodes or edge.dest in on_stack:
+                    loose_edges.append(edge.model_dump())
+                    continue
+                kept.append(edge)
+                if edge.dest not in hashes:
+                    stack.append((edge.dest, False))
+            tree[node_id] = kept
+
+    # Record ids in the same pre-order ``SchemaStore.get`` replays; a shared
+    # node is listed at every position but only expanded the first time.
+    roots: List[str] = []
+    ids: List[str] = []
+    seen = set()
+    for root in candidates:
+        if root in seen:
+            continue
+        roots.append(root)
+        stack_ids = [root]
+        while stack_ids:
+            node_id = stack_ids.pop()
+            ids.append(node_id)
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            stack_ids.extend(edge.dest for edge in reversed(tree[node_id]))
+    return Decomposition(hashes, bodies, roots, ids, loose_edges)
+
+
+class SchemaStore:
+    """SQLite-backed store deduplicating schemas by subtree hash.
+
+    ``put`` returns a content key for the schema; ``get`` rebuilds it. Node and
+    edge list order is normalised to rendering order on read.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA_SQL)
+        self._writes = 0
+        self._reads = 0
+        self._write_seconds = 0.0
+        self._read_seconds = 0.0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SchemaStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def put(self, schema: PromptiusGuiSchema) -> str:
+        """Store ``schema`` and return its content key."""
+        started = time.perf_counter()
+        parts = decompose(schema)
+        record = _dumps(
+            {
+                "metadata": schema.metadata.model_dump(mode="json"),
+                "roots": [parts.hashes[root] for root in parts.roots],
+                "ids": parts.ids,
+                "looseEdges": parts.loose_edges,
+                "events": [event.model_dump(mode="json") for event in schema.events],
+            }
+        )
+        key = _digest(record)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO fragments (hash, body) VALUES (?, ?)",
+                parts.bodies.items(),
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO schemas (key, body, node_count, created) "
+                "VALUES (?, ?, ?, ?)",
+                (key, record, len(schema.nodes), time.time()),
+            )
+            self._writes += 1
+            self._write_seconds += time.perf_counter() - started
+        return key
+
+    def put_many(self, schemas: Iterable[PromptiusGuiSchema]) -> List[str]:
+        return [self.put(schema) for schema in schemas]
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM schemas WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM schemas ORDER BY created")
+            return [row[0] for row in rows]
+
+    def get(self, key: str) -> PromptiusGuiSchema:
+        """Rebuild the schema stored under ``key``; raises ``KeyError``."""
+        started = time.perf_counter()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM schemas WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(key)
+            record = json.loads(row[0])
+            bodies = self._load_fragments(record["roots"])
+
+        nodes: List[Dict[str, Any]] = []
+        edges: List[Dict[str, Any]] = []
+        ids = iter(record["ids"])
+        emitted = set()
+        for root in record["roots"]:
+            stack: List[Tuple[str, Optional[str], int]] = [(root, None, 0)]
+            while stack:
+                digest, parent, order = stack.pop()
+                node_id = next(ids)
+                if parent is not None:
+                    edges.append({"src": parent, "dest": node_id, "order": order})
+                if node_id in emitted:
+                    continue
+                emitted.add(node_id)
+                fragment = bodies[digest]
+                nodes.append(
+                    {"id": node_id, "type": fragment["type"], "props": fragment["props"]}
+                )
+                stack.extend(
+                    (child, node_id, child_order)
+                    for child_order, child in reversed(fragment["children"])
+                )
+        edges.extend(record["looseEdges"])
+
+        schema = PromptiusGuiSchema.model_validate(
+            {
+                "metadata": record["metadata"],
+                "nodes": nodes,
+                "edges": edges,
+                "events": record["events"],
+            }
+        )
+        with self._lock:
+            self._reads += 1
+            self._read_seconds += time.perf_counter() - started
+        return schema
+
+    def _load_fragments(self, roots: List[str]) -> Dict[str, Dict[str, Any]]:
+        bodies: Dict[str, Dict[str, Any]] = {}
+        pending = list(dict.fromkeys(roots))
+        while pending:
+            found: List[str] = []
+            for batch in _chunks(pending):
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, body FROM fragments WHERE hash IN ({marks})", batch
+                )
+                for digest, body in rows:
+                    fragment = json.loads(body)
+                    bodies[digest] = fragment
+                    found.extend(child for _, child in fragment["children"])
+            missing = set(pending) - set(bodies)
+            if missing:
+                raise KeyError(f"Missing fragments: {sorted(missing)[:5]}")
+            pending = [h for h in dict.fromkeys(found) if h not in bodies]
+        return bodies
+
+    def stats(self) -> StoreStats:
+        with self._lock:
+            schemas, logical = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(node_count), 0) FROM schemas"
+            ).fetchone()
+            unique, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM fragments"
+            ).fetchone()
+            return StoreStats(
+                schemas=schemas,
+                logical_nodes=logical,
+                unique_fragments=unique,
+                fragment_bytes=size,
+                writes=self._writes,
+                reads=self._reads,
+                write_seconds=self._write_seconds,
+                read_seconds=self._read_seconds,
+            )
@@ -0,0 +1,305 @@
+"""
+Streaming loader for large PromptiusGuiSchema documents.
+
+``json.loads`` followed by ``PromptiusGuiSchema.model_validate`` holds the raw
+text, the parsed dicts and the models in memory at the same time. The loader
+here scans the document incrementally, cuts out one ``nodes``/``edges``/
+``events`` item at a time and validates it straight from its JSON bytes, so
+parse overhead stays proportional to the largest single item.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from pydantic import Field, TypeAdapter, ValidationError
+from typing_extensions import Annotated
+
+from . import Edge, Event, Node, PromptiusGuiSchema, UIMetadata
+from .graph import GraphIndex
+
+Source = Union[str, bytes, "os.PathLike[str]", IO[bytes], Iterable[bytes]]
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Dispatching on ``type`` validates each node against one model instead of
+# trying every member of the ``Node`` union in turn.
+_node_adapter: TypeAdapter[Node] = TypeAdapter(
+    Annotated[Node, Field(discriminator="type")]
+)
+
+_VALIDATORS = {
+    "nodes": _node_adapter.validate_json,
+    "edges": Edge.model_validate_json,
+    "events": Event.model_validate_json,
+}
+
+_STRUCTURAL = re.compile(rb'[{}\[\]"]')
+_STRING_END = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb"[,\]}\s]")
+_WHITESPACE = frozenset(b" \t\r\n")
+
+
+class SchemaStreamError(ValueError):
+    """Malformed or invalid document; ``offset`` is the byte position."""
+
+    def __init__(self, message: str, offset: int, section: str = "", index: int = -1):
+        location = f" in {section}[{index}]" if section and index >= 0 else ""
+        super().__init__(f"{message}{location} at byte {offset}")
+        self.offset = offset
+        self.section = section
+        self.index = index
+
+
+def _chunks(source: Source, chunk_size: int) -> Iterator[bytes]:
+    if isinstance(source, bytes):
+        yield source
+        return
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fp:
+            yield from iter(lambda: fp.read(chunk_size), b"")
+        return
+    read = getattr(source, "read", None)
+    if read is not None:
+        yield from iter(lambda: read(chunk_size), b"")
+        return
+    for chunk in source:
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+class _Reader:
+    """Pull-based scanner returning raw JSON values from a chunked source."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self.buf = b""
+        self.pos = 0
+        self.offset = 0  # absolute offset of buf[0]
+
+    def more(self) -> int:
+        """Append the next chunk, dropping consumed bytes; returns the shift.
+
+        Returns ``-1`` at end of input.
+        """
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return -1
+        shift = self.pos
+        self.buf = self.buf[shift:] + chunk
+        self.offset += shift
+        self.pos = 0
+        return shift
+
+    def error(self, message: str) -> SchemaStreamError:
+        return SchemaStreamError(message, self.offset + self.pos)
+
+    def peek(self) -> int:
+        """Skip whitespace and return the next byte without consuming it."""
+        while True:
+            buf, pos = self.buf, self.pos
+            end = len(buf)
+            while pos < end and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < end:
+                return buf[pos]
+            if self.more() < 0:
+                return -1
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char[0]:
+            raise self.error(f"Expected {char.decode()!r}")
+        self.pos += 1
+
+    def value(self) -> bytes:
+        """Consume and return the raw bytes of the next JSON value."""
+        first = self.peek()
+        if first < 0:
+            raise self.error("Unexpected end of input")
+        if first == 0x22:  # '"'
+            end = self._string_end(self.pos + 1)
+        elif first in (0x7B, 0x5B):  # '{' or '['
+            end = self._container_end(self.pos + 1)
+        else:
+            end = self._scalar_end(self.pos + 1)
+        raw = self.buf[self.pos : end]
+        self.pos = end
+        return raw
+
+    def _string_end(self, i: int) -> int:
+        while True:
+            found = _STRING_END.search(self.buf, i)
+            if found is None:
+                i = len(self.buf)
+            elif self.buf[found.start()] == 0x5C:  # backslash escape
+                i = found.start() + 2
+                if i <= len(self.buf):
+                    continue
+            else:
+                return found.start() + 1
+            shift = self.more()
+            if shift < 0:
+                raise self.error("Unterminated string")
+            i -= shift
+
+    def _container_end(self, i: int) -> int:
+        depth = 1
+        while True:
+            found = _STRUCTURAL.search(self.buf, i)
+            if found is None:
+                i = len(self.buf)
+                shift = self.more()
+                if shift < 0:
+                    raise self.error("Unexpected end of input")
+                i -= shift
+                continue
+            char = self.buf[found.start()]
+            i = found.start() + 1
+            if char == 0x22:
+                i = self._string_end(i)
+            elif char in (0x7B, 0x5B):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+    def _scalar_end(self, i: int) -> int:
+        while True:
+            found = _SCALAR_END.search(self.buf, i)
+            if found is not None:
+                return found.start()
+            i = len(self.buf)
+            shift = self.more()
+            if shift < 0:
+                return len(self.buf)
+            i -= shift
+
+
+class SchemaStream:
+    """Iterable of ``(section, item)`` pairs parsed from ``source``.
+
+    ``section`` is ``"metadata"`` (a ``UIMetadata``) or one of ``"nodes"``,
+    ``"edges"`` and ``"events"`` (a typed ``Node``, ``Edge`` or ``Event``).
+    Items come in document order; unknown top-level keys are skipped and
+    ``keys`` records every top-level key seen so far. ``source`` may be a
+    path, bytes, a binary file or an iterable of chunks.
+    """
+
+    def __init__(self, source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.source = source
+        self.chunk_size = chunk_size
+        self.keys: Set[str] = set()
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        reader = _Reader(_chunks(self.source, self.chunk_size))
+        reader.expect(b"{")
+        if reader.peek() == 0x7D:
+            reader.pos += 1
+            return
+        while True:
+            key_offset = reader.offset + reader.pos
+            if reader.peek() != 0x22:
+                raise reader.error("Expected object key")
+            key = json.loads(reader.value())
+            self.keys.add(key)
+            reader.expect(b":")
+            if key in _VALIDATORS:
+                yield from _iter_array(reader, key)
+            elif key == "metadata":
+                raw = reader.value()
+                try:
+                    yield key, UIMetadata.model_validate_json(raw)
+                except ValidationError as exc:
+                    raise SchemaStreamError(str(exc), key_offset, key) from exc
+            else:
+                reader.value()
+            separator = reader.peek()
+            reader.pos += 1
+            if separator == 0x7D:
+                return
+            if separator != 0x2C:
+                reader.pos -= 1
+                raise reader.error("Expected ',' or '}'")
+
+
+def iter_schema(
+    source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Tuple[str, Any]]:
+    """Yield ``(section, item)`` pairs while parsing ``source``."""
+    return iter(SchemaStream(source, chunk_size))
+
+
+def _iter_array(reader: _Reader, section: str) -> Iterator[Tuple[str, Any]]:
+    validate = _VALIDATORS[section]
+    reader.expect(b"[")
+    if reader.peek() == 0x5D:
+        reader.pos += 1
+        return
+    index = 0
+    while True:
+        offset = reader.offset + reader.pos
+        raw = reader.value()
+        try:
+            item = validate(raw)
+        except ValidationError as exc:
+            raise SchemaStreamError(str(exc), offset, section, index) from exc
+        yield section, item
+        index += 1
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == 0x5D:
+            return
+        if separator != 0x2C:
+            reader.pos -= 1
+            raise reader.error("Expected ',' or ']'")
+
+
+def load_index(source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE) -> GraphIndex:
+    """Stream ``source`` into a ``GraphIndex`` built as items arrive.
+
+    The assembled schema is available as ``index.schema``.
+    """
+    index = GraphIndex()
+    metadata = None
+    sections: Dict[str, List[Any]] = {"nodes": [], "edges": [], "events": []}
+    adders = {
+        "nodes": index.add_node,
+        "edges": index.add_edge,
+        "events": index.add_event,
+    }
+    stream = SchemaStream(source, chunk_size)
+    for section, item in stream:
+        if section == "metadata":
+            metadata = item
+            index.root_id = item.rootId
+            continue
+        sections[section].append(item)
+        adders[section](item)
+
+    required = ("metadata", "nodes", "edges", "events")
+    missing = [key for key in required if key not in stream.keys]
+    if missing:
+        raise SchemaStreamError(f"Missing required keys {missing}", 0)
+    nodes: List[Node] = sections["nodes"]
+    if not nodes:
+        raise SchemaStreamError("'nodes' must contain at least one node", 0, "nodes")
+    index.schema = PromptiusGuiSchema.model_construct(
+        metadata=metadata,
+        nodes=nodes,
+        edges=sections["edges"],
+        events=sections["events"],
+    )
+    return index.finish()
+
+
+def load_schema(
+    source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> PromptiusGuiSchema:
+    """Stream and validate ``source`` item by item into a schema."""
+    schema = load_index(source, chunk_size).schema
+    assert schema is not None
+    return schema
@@ -0,0 +1,652 @@
+"""
+Template library for PromptiusGuiSchema graphs.
+
+Most production UIs are variations of a few layouts (forms, KPI grids, chart
+dashboards). A template is a validated schema plus typed slots; prompts that
+match a template are answered by filling the slots and instantiating a fresh
+copy of the graph instead of calling the LLM.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Tuple,
+    get_origin,
+)
+
+from pydantic import TypeAdapter
+
+from . import PromptiusGuiSchema
+from .charts import fix_charts
+
+# A slot target is ``(node_id, dotted_prop_path)``. The pseudo node ids
+# ``"metadata"`` and ``"events"`` address ``UIMetadata`` fields and the events
+# list (``"<index>.action.<field>"``) instead of node props.
+SlotTarget = Tuple[str, str]
+
+METADATA_TARGET = "metadata"
+EVENTS_TARGET = "events"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> frozenset:
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+def _copy(value: Any) -> Any:
+    """Copy a JSON-compatible value; cheaper than ``copy.deepcopy``."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _set_path(target: Any, path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        target = target[int(part)] if isinstance(target, list) else target[part]
+    last = parts[-1]
+    if isinstance(target, list):
+        target[int(last)] = value
+    else:
+        target[last] = value
+
+
+@dataclass(frozen=True)
+class Slot:
+    """A typed hole in a template.
+
+    ``pattern`` is an optional regex whose first matching group extracts the
+    slot value from a prompt; values are coerced to ``type`` with Pydantic's lax mode.
+    Extracted text for a list ``type`` is split on commas first. Routing
+    needs every ``required`` slot filled from the prompt; only mark a slot
+    optional when its default is structure (a label), not content.
+    """
+
+    name: str
+    type: Any
+    targets: Tuple[SlotTarget, ...]
+    default: Any
+    description: str = ""
+    pattern: Optional[str] = None
+    required: bool = True
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_adapter", TypeAdapter(self.type))
+        compiled = re.compile(self.pattern, re.IGNORECASE) if self.pattern else None
+        object.__setattr__(self, "_compiled", compiled)
+
+    def coerce(self, value: Any) -> Any:
+        if isinstance(value, str) and get_origin(self.type) is list:
+            value = [part.strip() for part in value.split(",") if part.strip()]
+        return self._adapter.validate_python(value)  # type: ignore[attr-defined]
+
+    def extract(self, prompt: str) -> Optional[str]:
+        compiled: Optional[Pattern[str]] = self._compiled  # type: ignore[attr-defined]
+        if compiled is None:
+            return None
+        found = compiled.search(prompt)
+        if found is None:
+            return None
+        return next((g.strip() for g in found.groups() if g), None)
+
+
+class Template:
+    """A reusable ``PromptiusGuiSchema`` graph with typed slots."""
+
+    def __init__(
+        self,
+        name: str,
+        schema: PromptiusGuiSchema,
+        slots: Iterable[Slot] = (),
+        keywords: Iterable[str] = (),
+        description: str = "",
+        finish: Optional[Callable[[PromptiusGuiSchema], PromptiusGuiSchema]] = None,
+    ) -> None:
+        self.name = name
+        self.schema = schema
+        self.slots: Dict[str, Slot] = {slot.name: slot for slot in slots}
+        self.keywords = frozenset(k.lower() for k in keywords)
+        self.description = description
+        # Applied to every instance; raises ValueError for unusable slot values
+        self.finish = finish
+
+        # Keep a JSON-mode document around so instantiation is a plain dict copy.
+        self._document = schema.model_dump(mode="json")
+        self._node_positions = {
+            node["id"]: i for i, node in enumerate(self._document["nodes"])
+        }
+        for slot in self.slots.values():
+            for node_id, _ in slot.targets:
+                if node_id in (METADATA_TARGET, EVENTS_TARGET):
+                    continue
+                if node_id not in self._node_positions:
+                    raise ValueError(
+                        f"Slot '{slot.name}' of template '{name}' targets unknown "
+                        f"node '{node_id}'"
+                    )
+
+    def fill(self, prompt: str) -> Dict[str, Any]:
+        """Extract slot values from ``prompt`` using each slot's pattern.
+
+        Values that do not coerce to the slot's type are left out.
+        """
+        values = {}
+        for slot in self.slots.values():
+            extracted = slot.extract(prompt)
+            if extracted is None:
+                continue
+            try:
+                values[slot.name] = slot.coerce(extracted)
+            except ValueError:
+                continue
+        return values
+
+    def missing(self, values: Mapping[str, Any]) -> List[str]:
+        """Names of the required slots ``values`` leaves unfilled."""
+        return [
+            slot.name
+            for slot in self.slots.values()
+            if slot.required and slot.name not in values
+        ]
+
+    def instantiate(
+        self,
+        values: Optional[Mapping[str, Any]] = None,
+        id_prefix: Optional[str] = None,
+    ) -> PromptiusGuiSchema:
+        """Return a new schema with slots filled and every node id refreshed."""
+        values = dict(values or {})
+        unknown = set(values) - set(self.slots)
+        if unknown:
+            raise ValueError(
+                f"Unknown slots for template '{self.name}': {sorted(unknown)}"
+            )
+
+        prefix = id_prefix if id_prefix is not None else uuid.uuid4().hex[:8]
+        ids = {node_id: f"{prefix}-{node_id}" for node_id in self._node_positions}
+
+        source = self._document
+        metadata = dict(source["metadata"])
+        metadata["rootId"] = ids[metadata["rootId"]]
+        nodes = [
+            {"id": ids[n["id"]], "type": n["type"], "props": _copy(n["props"])}
+            for n in source["nodes"]
+        ]
+        edges = [
+            {"src": ids[e["src"]], "dest": ids[e["dest"]], "order": e["order"]}
+            for e in source["edges"]
+        ]
+        events = [
+            {
+                "nodeId": ids[e["nodeId"]],
+                "eventType": e["eventType"],
+                "action": dict(e["action"]),
+            }
+            for e in source["events"]
+        ]
+
+        for slot in self.slots.values():
+            value = slot.coerce(values.get(slot.name, slot.default))
+            for node_id, path in slot.targets:
+                if node_id == METADATA_TARGET:
+                    _set_path(metadata, path, value)
+                elif node_id == EVENTS_TARGET:
+                    _set_path(events, path, _copy(value))
+                else:
+                    props = nodes[self._node_positions[node_id]]["props"]
+                    _set_path(props, path, _copy(value))
+
+        schema = PromptiusGuiSchema.model_validate(
+            {"metadata": metadata, "nodes": nodes, "edges": edges, "events": events}
+        )
+        return self.finish(schema) if self.finish is not None else schema
+
+
+@dataclass
+class TemplateMatch:
+    """A routed prompt: the chosen template, its score and extracted slots."""
+
+    template: Template
+    score: float
+    values: Dict[str, Any] = field(default_factory=dict)
+
+    def instantiate(self, id_prefix: Optional[str] = None) -> PromptiusGuiSchema:
+        return self.template.instantiate(self.values, id_prefix=id_prefix)
+
+
+class TemplateRegistry:
+    """Holds templates and routes prompts to the best matching one.
+
+    Routing is a keyword-overlap classifier: the score of a template is the
+    fraction of its keywords present in the prompt. A template only answers
+    a prompt when it scores at least ``threshold`` (by default every keyword
+    must appear) and, with ``require_slots``, every required slot is filled
+    from the prompt and the filled template instantiates, so no canned title
+    or data stands in for what the prompt asked. Other prompts are considered
+    novel and should go to full LLM generation.
+    """
+
+    def __init__(self, threshold: float = 1.0, require_slots: bool = True) -> None:
+        self.threshold = threshold
+        self.require_slots = require_slots
+        self._templates: Dict[str, Template] = {}
+
+    def register(self, template: Template) -> Template:
+        if template.name in self._templates:
+            raise ValueError(f"Template '{template.name}' is already registered")
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> Template:
+        return self._templates[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._templates
+
+    def __iter__(self):
+        return iter(self._templates.values())
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def route(self, prompt: str) -> Optional[TemplateMatch]:
+        """Return the best match for ``prompt``, or ``None`` if it is novel."""
+        words = _tokens(prompt)
+        best: Optional[TemplateMatch] = None
+        for template in self._templates.values():
+            if not template.keywords:
+                continue
+            score = len(template.keywords & words) / len(template.keywords)
+            if score < self.threshold or (best is not None and score <= best.score):
+                continue
+            values = template.fill(prompt)
+            if self.require_slots:
+                if template.missing(values):
+                    continue
+                try:
+                    template.instantiate(values, id_prefix="route")
+                except ValueError:
+                    continue
+            best = TemplateMatch(template, score, values)
+        return best
+
+
+# ============================================================================
+# BUILT-IN TEMPLATES
+# ============================================================================
+
+_TITLE_PATTERN = (
+    r"(?:titled|called|named)\s+"
+    r"(?:[\"']([^\"'\n]+)[\"']|(.+?)(?=\s+(?:that|with|for|to|and|which)\b|[,.]|$))"
+)
+
+
+def _text(node_id: str, content: str, tag: str, **props: Any) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": "text",
+        "props": {
+            "content": content,
+            "tag": tag,
+            "align": props.get("align", "left"),
+            "bold": props.get("bold", False),
+            "italic": False,
+            "color": props.get("color", "inherit"),
+        },
+    }
+
+
+def _card(node_id: str, title: str, description: str = "") -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": "card",
+        "props": {
+            "title": title,
+            "description": description,
+            "elevation": 2,
+            "padding": 16,
+        },
+    }
+
+
+def _edges(src: str, dests: List[str]) -> List[Dict[str, Any]]:
+    return [{"src": src, "dest": d, "order": i} for i, d in enumerate(dests)]
+
+
+def _metadata(title: str, description: str, root_id: str) -> Dict[str, Any]:
+    return {
+        "title": title,
+        "description": description,
+        "version": "2.0.0",
+        "framework": "shadcn",
+        "rootId": root_id,
+    }
+
+
+def contact_form_template() -> Template:
+    """Contact form: name, email and message fields with a submit button."""
+    field_defaults = {"size": "md", "disabled": False, "helperText": ""}
+    schema = PromptiusGuiSchema.model_validate(
+        {
+            "metadata": _metadata(
+                "Contact Form", "Get in touch with us", "contact-card"
+            ),
+            "nodes": [
+                _card("contact-card", "Contact Us", "Fill out the form below"),
+                {
+                    "id": "form-stack",
+                    "type": "stack",
+                    "props": {"direction": "column", "gap": 16, "align": "stretch"},
+                },
+                {
+                    "id": "name-input",
+                    "type": "input",
+                    "props": {
+                        **field_defaults,
+                        "placeholder": "John Doe",
+                        "type": "text",
+                        "required": True,
+                        "label": "Full Name",
+                        "defaultValue": "",
+                        "maxLength": 100,
+                        "minLength": 1,
+                    },
+                },
+                {
+                    "id": "email-input",
+                    "type": "input",
+                    "props": {
+                        **field_defaults,
+                        "placeholder": "john@example.com",
+                        "type": "email",
+                        "required": True,
+                        "label": "Email",
+                        "defaultValue": "",
+                        "maxLength": 254,
+                        "minLength": 3,
+                    },
+                },
+                {
+                    "id": "message-textarea",
+                    "type": "textarea",
+                    "props": {
+                        "placeholder": "Your message...",
+                        "rows": 5,
+                        "disabled": False,
+                        "required": True,
+                        "label": "Message",
+                        "helperText": "",
+                        "maxLength": 2000,
+                    },
+                },
+                {
+                    "id": "submit-btn",
+                    "type": "button",
+                    "props": {
+                        "label": "Submit",
+                        "variant": "primary",
+                        "size": "md",
+                        "disabled": False,
+                        "fullWidth": True,
+                        "loading": False,
+                    },
+                },
+            ],
+            "edges": _edges("contact-card", ["form-stack"])
+            + _edges(
+                "form-stack",
+                ["name-input", "email-input", "message-textarea", "submit-btn"],
+            ),
+            "events": [
+                {
+                    "nodeId": "submit-btn",
+                    "eventType": "onClick",
+                    "action": {
+                        "type": "submitForm",
+                        "endpoint": "/api/contact",
+                        "method": "POST",
+                    },
+                }
+            ],
+        }
+    )
+    return Template(
+        "contact_form",
+        schema,
+        slots=[
+            Slot(
+                "title",
+                str,
+                (("contact-card", "title"), (METADATA_TARGET, "title")),
+                default="Contact Us",
+                pattern=_TITLE_PATTERN,
+            ),
+            Slot(
+                "endpoint",
+                str,
+                ((EVENTS_TARGET, "0.action.endpoint"),),
+                default="/api/contact",
+                pattern=r"(?:to|at|endpoint)\s+(/[\w/\-]+)",
+            ),
+        ],
+        keywords=["contact", "form"],
+        description=contact_form_template.__doc__ or "",
+    )
+
+
+def kpi_grid_template() -> Template:
+    """Analytics dashboard: a heading and a grid of three KPI cards."""
+    cards = ["users", "revenue", "sessions"]
+    schema = PromptiusGuiSchema.model_validate(
+        {
+            "metadata": _metadata(
+                "Analytics Dashboard", "System metrics overview", "dashboard-container"
+            ),
+            "nodes": [
+                {
+                    "id": "dashboard-container",
+                    "type": "container",
+                    "props": {"maxWidth": 1200, "padding": 24, "centered": True},
+                },
+                _text("dashboard-title", "Analytics Dashboard", "h1", bold=True),
+                {
+                    "id": "metrics-grid",
+                    "type": "grid",
+                    "props": {"columns": 3, "gap": 16, "responsive": True},
+                },
+                _card("users-card", "Total Users"),
+                _text("users-count", "12,345", "h2", bold=True),
+                _card("revenue-card", "Revenue"),
+                _text("revenue-count", "$98,765", "h2", bold=True),
+                _card("sessions-card", "Active Sessions"),
+                _text("sessions-count", "432", "h2", bold=True),
+            ],
+            "edges": _edges("dashboard-container", ["dashboard-title", "metrics-grid"])
+            + _edges("metrics-grid", [f"{c}-card" for c in cards])
+            + [
+                edge
+                for c in cards
+                for edge in _edges(f"{c}-card", [f"{c}-count"])
+            ],
+            "events": [],
+        }
+    )
+    number = r"[$€£]?\d[\d,.]*[kKmM]?"
+    slots = [
+        Slot(
+            "title",
+            str,
+            (("dashboard-title", "content"), (METADATA_TARGET, "title")),
+            default="Analytics Dashboard",
+            pattern=_TITLE_PATTERN,
+        ),
+        Slot(
+            "users_value",
+            str,
+            (("users-count", "content"),),
+            default="12,345",
+            pattern=rf"({number})\s+(?:total\s+)?users\b",
+        ),
+        Slot(
+            "revenue_value",
+            str,
+            (("revenue-count", "content"),),
+            default="$98,765",
+            pattern=rf"revenue\s+(?:of\s+)?({number})|({number})\s+(?:in\s+)?revenue",
+        ),
+        Slot(
+            "sessions_value",
+            str,
+            (("sessions-count", "content"),),
+            default="432",
+            pattern=rf"({number})\s+(?:active\s+)?sessions\b",
+        ),
+    ]
+    # Card labels are structure, so prompts may leave them at their defaults
+    labels = {
+        "users": "Total Users",
+        "revenue": "Revenue",
+        "sessions": "Active Sessions",
+    }
+    for c in cards:
+        target = ((f"{c}-card", "title"),)
+        slots.append(Slot(f"{c}_label", str, target, labels[c], required=False))
+    return Template(
+        "kpi_grid",
+        schema,
+        slots=slots,
+        keywords=["dashboard", "metrics", "kpi"],
+        description=kpi_grid_template.__doc__ or "",
+    )
+
+
+def _fit_chart(schema: PromptiusGuiSchema) -> PromptiusGuiSchema:
+    """Fit the axes to the filled data; refuse labels and values that differ
+    in length."""
+    schema, issues = fix_charts(schema, annotate="none")
+    if issues:
+        raise ValueError(issues[0].message)
+    return schema
+
+
+def chart_dashboard_template() -> Template:
+    """Chart dashboard: a heading above a single chart card.
+
+    The prompt supplies the data, e.g. ``labels [Q1, Q2, Q3]`` and
+    ``values [3, 5, 8]``; the y axis is fitted to it.
+    """
+    schema = PromptiusGuiSchema.model_validate(
+        {
+            "metadata": _metadata(
+                "Sales Overview", "Chart dashboard", "chart-container"
+            ),
+            "nodes": [
+                {
+                    "id": "chart-container",
+                    "type": "container",
+                    "props": {"maxWidth": 1200, "padding": 24, "centered": True},
+                },
+                _text("chart-heading", "Sales Overview", "h1", bold=True),
+                _card("chart-card", ""),
+                {
+                    "id": "main-chart",
+                    "type": "chart",
+                    "props": {
+                        "chartType": "bar",
+                        "width": 800,
+                        "height": 400,
+                        "labels": ["Jan", "Feb", "Mar", "Apr"],
+                        "series": [{"name": "Value", "data": [120, 150, 170, 160]}],
+                        "colors": ["#2563eb"],
+                        "title": "",
+                        "showLegend": False,
+                        "legendPosition": "top",
+                        "xAxis": {
+                            "label": "",
+                            "ticks": ["Jan", "Feb", "Mar", "Apr"],
+                            "showGrid": False,
+                        },
+                        "yAxis": {
+                            "label": "",
+                            "min": 0,
+                            "max": 200,
+                            "showGrid": True,
+                        },
+                        "annotations": [],
+                    },
+                },
+            ],
+            "edges": _edges("chart-container", ["chart-heading", "chart-card"])
+            + _edges("chart-card", ["main-chart"]),
+            "events": [],
+        }
+    )
+    return Template(
+        "chart_dashboard",
+        schema,
+        slots=[
+            Slot(
+                "title",
+                str,
+                (("chart-heading", "content"), (METADATA_TARGET, "title")),
+                default="Sales Overview",
+                pattern=_TITLE_PATTERN,
+            ),
+            Slot(
+                "chart_type",
+                str,
+                (("main-chart", "chartType"),),
+                default="bar",
+                pattern=r"\b(bar|line|pie)\s+chart",
+            ),
+            Slot(
+                "labels",
+                List[str],
+                (("main-chart", "labels"), ("main-chart", "xAxis.ticks")),
+                default=["Jan", "Feb", "Mar", "Apr"],
+                pattern=r"\blabels?\s*[:=]?\s*\[([^\]]+)\]",
+            ),
+            Slot(
+                "values",
+                List[float],
+                (("main-chart", "series.0.data"),),
+                default=[120, 150, 170, 160],
+                pattern=r"\b(?:values|data)\s*[:=]?\s*\[([^\]]+)\]",
+            ),
+            Slot(
+                "series_name",
+                str,
+                (("main-chart", "series.0.name"),),
+                default="Value",
+                pattern=r"\bseries\s+(?:named|called)\s+[\"']([^\"'\n]+)[\"']",
+                required=False,
+            ),
+        ],
+        keywords=["chart", "dashboard"],
+        description=chart_dashboard_template.__doc__ or "",
+        finish=_fit_chart,
+    )
+
+
+def default_registry(
+    threshold: float = 1.0, require_slots: bool = True
+) -> TemplateRegistry:
+    """Return a registry preloaded with the built-in templates."""
+    registry = TemplateRegistry(threshold=threshold, require_slots=require_slots)
+    for factory in (contact_form_template, kpi_grid_template, chart_dashboard_template):
+        registry.register(factory())
+    return registry
@@ -0,0 +1,132 @@
+"""
+Production entry point: runs ``server:app`` in several worker processes.
+
+Workers share warm state through the environment set up here before they are
+spawned: one SQLite response cache file (WAL mode, so a hit in any worker is a
+hit in all of them), one ``/jobs`` queue file, one rate limit file, one store
+of served schemas (so any worker can answer page requests) and one envelope
+secret. The audit store is only written when ``--schema-store`` or
+``PROMPTIUS_SCHEMA_STORE`` names a file. Send SIGHUP to the supervisor to
+restart workers one by one after a deploy; SIGTERM drains in-flight requests
+for up to ``--graceful-timeout`` seconds before exiting. With ``--fake-llm`` or
+``--replay`` the response cache is off unless ``--cache`` names a file, so
+load tests measure the stand-in LLM rather than cache hits.
+
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import secrets
+import tempfile
+
+import uvicorn
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the UI generation server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="SQLite file shared by all workers for cached LLM answers, or 'off'; "
+        "off by default with --fake-llm and --replay",
+    )
+    parser.add_argument(
+        "--jobs",
+        default=os.getenv("PROMPTIUS_JOBS")
+        or os.path.join(tempfile.gettempdir(), "promptius-jobs.db"),
+        help="SQLite file holding the /jobs queue shared by all workers",
+    )
+    parser.add_argument(
+        "--rate-limit-db",
+        default=os.getenv("PROMPTIUS_RATE_LIMIT_DB")
+        or os.path.join(tempfile.gettempdir(), "promptius-rate-limit.db"),
+        help="SQLite file holding per-tenant rate limit buckets for all workers",
+    )
+    parser.add_argument(
+        "--served-store",
+        default=os.getenv("PROMPTIUS_SERVED_STORE")
+        or os.path.join(tempfile.gettempdir(), "promptius-served.db"),
+        help="SQLite store of paged schemas, shared so any worker can serve pages",
+    )
+    parser.add_argument(
+        "--schema-store",
+        default=os.getenv("PROMPTIUS_SCHEMA_STORE"),
+        help="SQLite file keeping every generated schema for audit; off if unset",
+    )
+    parser.add_argument(
+        "--submissions",
+        default=os.getenv("PROMPTIUS_SUBMISSIONS")
+        or os.path.join(tempfile.gettempdir(), "promptius-submissions.db"),
+        help="SQLite file receiving accepted form submissions from all workers",
+    )
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_true",
+        help="Lift the per-tenant request and token limits, for load tests",
+    )
+    parser.add_argument(
+        "--fake-llm",
+        default=None,
+        metavar="LATENCY",
+        help="Answer from templates after this delay instead of calling the LLM",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        metavar="FILE",
+        help="Serve answers recorded with PROMPTIUS_RECORD instead of calling the LLM",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        default=None,
+        metavar="LATENCY",
+        help="Replay delay: seconds or e.g. lognormal:median=1.5,sigma=0.4",
+    )
+    args = parser.parse_args()
+    if args.cache is None and (args.fake_llm is not None or args.replay is not None):
+        # Cached answers would skip the stand-in LLM and its simulated latency
+        args.cache = "off"
+    elif args.cache is None:
+        args.cache = os.getenv("PROMPTIUS_CACHE") or os.path.join(
+            tempfile.gettempdir(), "promptius-response-cache.db"
+        )
+
+    os.environ["PROMPTIUS_CACHE"] = args.cache
+    os.environ["PROMPTIUS_JOBS"] = args.jobs
+    os.environ["PROMPTIUS_SUBMISSIONS"] = args.submissions
+    os.environ["PROMPTIUS_RATE_LIMIT_DB"] = args.rate_limit_db
+    os.environ["PROMPTIUS_SERVED_STORE"] = args.served_store
+    if args.schema_store:
+        os.environ["PROMPTIUS_SCHEMA_STORE"] = args.schema_store
+    os.environ.setdefault("PROMPTIUS_ENVELOPE_SECRET", secrets.token_hex(32))
+    if args.no_rate_limit:
+        os.environ["PROMPTIUS_RATE"] = "1e9"
+        os.environ["PROMPTIUS_BURST"] = "1e9"
+        os.environ["PROMPTIUS_TOKENS_PER_MINUTE"] = "1e12"
+    if args.fake_llm is not None:
+        os.environ["PROMPTIUS_FAKE_LLM"] = args.fake_llm
+    if args.replay is not None:
+        os.environ["PROMPTIUS_REPLAY"] = args.replay
+    if args.replay_latency is not None:
+        os.environ["PROMPTIUS_REPLAY_LATENCY"] = args.replay_latency
+
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import math
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 from dotenv import load_dotenv
 
-from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema import Framework, PromptiusGuiSchema
+from promptius_gui_schema.cache import ResponseCache, prompt_key
+from promptius_gui_schema.charts import chart_free_schema, complete_charts, fix_charts
+from promptius_gui_schema.envelope import build_envelope
+from promptius_gui_schema.events import check_events
+from promptius_gui_schema.forms import RouterCache, SubmissionBacklogFull, SubmissionError, SubmissionStore
+from promptius_gui_schema.frameworks import VariantCache
+from promptius_gui_schema.incremental import IncrementalError, IncrementalValidator
+from promptius_gui_schema.graph import GraphIndex, Subgraph, subtree
+from promptius_gui_schema.paging import DEFAULT_PAGE_SIZE, children_page, paginate
+from promptius_gui_schema.layout import LayoutCache
+from promptius_gui_schema.migrations import MigrationError, default_migrations
+from promptius_gui_schema.jobs import DONE, FAILED, FINISHED, QUEUED, Job, JobQueue, JobWorkerPool
+from promptius_gui_schema.prerender import RenderCache, render_document
+from promptius_gui_schema.ratelimit import Limits, RateLimiter, SQLiteRateLimiter, estimate_tokens
+from promptius_gui_schema.store import SchemaStore
+from promptius_gui_schema.templates import default_registry
 import uvicorn
 
 load_dotenv()
@@ -21,26 +48,413 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-llm = ChatOpenAI(model_name="gpt-4.1-mini", temperature=0)
-#llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20", temperature=0)
-llm_with_struct = llm.with_structured_output(PromptiusGuiSchema)
+model_name = "gpt-4.1-mini"
+# The model leaves chart axis bounds, ticks and annotations to complete_charts
+chart_free = os.getenv("PROMPTIUS_CHART_AXES") == "auto"
+fake_latency = os.getenv("PROMPTIUS_FAKE_LLM")
+replay_path = os.getenv("PROMPTIUS_REPLAY")
+if fake_latency:
+    # Offline stand-in for benchmarks: answers from templates after a delay
+    from fake_llm import FakeStructuredLLM
+    model_name = "fake"
+    llm_with_struct = FakeStructuredLLM(fake_latency)
+elif replay_path:
+    # Offline load tests: recorded answers with simulated latency
+    from fake_llm import ReplayLLM
+    model_name = "replay"
+    llm_with_struct = ReplayLLM(replay_path, latency=os.getenv("PROMPTIUS_REPLAY_LATENCY"))
+else:
+    llm = ChatOpenAI(model_name=model_name, temperature=0)
+    #llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20", temperature=0)
+    if chart_free:
+        llm_with_struct = llm.with_structured_output(chart_free_schema()) | RunnableLambda(complete_charts)
+    else:
+        llm_with_struct = llm.with_structured_output(PromptiusGuiSchema)
+    if os.getenv("PROMPTIUS_RECORD"):
+        from fake_llm import RecordingLLM
+        llm_with_struct = RecordingLLM(llm_with_struct, os.getenv("PROMPTIUS_RECORD"))
+
+# Raw-JSON stream checked as it arrives, cancelled on the first invalid value
+stream_llm = None
+if os.getenv("PROMPTIUS_STREAM_VALIDATE") and not fake_latency:
+    if replay_path:
+        stream_llm = llm_with_struct
+    elif not os.getenv("PROMPTIUS_RECORD"):
+        stream_schema = chart_free_schema() if chart_free else PromptiusGuiSchema.model_json_schema()
+        stream_llm = llm.bind(response_format={"type": "json_schema", "json_schema": {"name": "PromptiusGuiSchema", "schema": stream_schema}})
+
+# Prompts matching a known layout are answered from templates without an LLM call
+templates = default_registry()
+
+# Every generated schema is kept for audit and replay when a store path is set
+store_path = os.getenv("PROMPTIUS_SCHEMA_STORE")
+schema_store = SchemaStore(store_path) if store_path else None
+
+# Full copies of schemas served in pages or subtrees, fetched later by key;
+# serve.py points every worker at one file so any of them can serve a page
+served_store = SchemaStore(os.getenv("PROMPTIUS_SERVED_STORE", ":memory:"))
+
+@lru_cache(maxsize=256)
+def stored_index(key: str) -> GraphIndex:
+    return GraphIndex(served_store.get(key))
+
+# LLM answers by normalised prompt; serve.py points every worker at one file.
+# "off" answers every request from the LLM, e.g. to load-test replayed latency
+cache_path = os.getenv("PROMPTIUS_CACHE", ":memory:")
+response_cache = ResponseCache(cache_path) if cache_path != "off" else None
+
+# Rendered subtree HTML, keyed by subtree hash
+render_cache = RenderCache()
+
+# Box geometry per (schema hash, breakpoint)
+layout_cache = LayoutCache()
+
+# Accepted form submissions, committed in batches; serve.py points every worker at one file
+submission_store = SubmissionStore(os.getenv("PROMPTIUS_SUBMISSIONS", ":memory:"))
+
+# Form validators derived once per stored schema
+form_routers = RouterCache()
+
+# Custom action handlers clients register (comma-separated); others are reported
+custom_handlers = [name for name in os.getenv("PROMPTIUS_CUSTOM_HANDLERS", "").split(",") if name] or None
+
+# All four framework variants of a schema, keyed by its content hash
+variant_cache = VariantCache()
+
+# Key for pre-validated envelopes; set it to share stamps across server processes
+envelope_secret = os.getenv("PROMPTIUS_ENVELOPE_SECRET", "").encode() or os.urandom(32)
+
+# Asynchronous generation queue; serve.py points every worker at one file
+job_queue = JobQueue(
+    os.getenv("PROMPTIUS_JOBS", ":memory:"),
+    default_cap=int(os.getenv("PROMPTIUS_TENANT_CAP", "2")),
+)
+job_workers = int(os.getenv("PROMPTIUS_JOB_WORKERS", "4"))
+# Finished jobs are deleted this many seconds after they finish
+job_retention = float(os.getenv("PROMPTIUS_JOB_RETENTION", "86400"))
+
+# Client-chosen job priorities are clamped to -MAX_JOB_PRIORITY..MAX_JOB_PRIORITY
+MAX_JOB_PRIORITY = 10
+
+# Longest a GET /jobs/{id}?wait= request may hold the connection
+MAX_JOB_WAIT = 25.0
+
+# Per-tenant request rate and LLM output token budget; a shared file when workers > 1
+limits = Limits(
+    rate=float(os.getenv("PROMPTIUS_RATE", "2")),
+    burst=float(os.getenv("PROMPTIUS_BURST", "10")),
+    tokens_per_minute=float(os.getenv("PROMPTIUS_TOKENS_PER_MINUTE", "100000")),
+)
+rate_limit_path = os.getenv("PROMPTIUS_RATE_LIMIT_DB")
+rate_limiter = SQLiteRateLimiter(rate_limit_path, limits) if rate_limit_path else RateLimiter(limits)
+
+# API key -> tenant ("key:tenant,..."); without keys clients are told apart by address
+api_keys = dict(item.split(":", 1) for item in os.getenv("PROMPTIUS_API_KEYS", "").split(",") if ":" in item)
+
+def authenticated_tenant(request: Request, authorization: str = Header(default="")) -> str:
+    """
+    The tenant a request is billed to: its API key's, or its client address.
+    """
+    if api_keys:
+        scheme, _, key = authorization.partition(" ")
+        tenant = api_keys.get(key.strip()) if scheme.lower() == "bearer" else None
+        if tenant is None:
+            raise HTTPException(status_code=401, detail="Missing or unknown API key", headers={"WWW-Authenticate": "Bearer"})
+        return tenant
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+def check_rate_limit(tenant: str):
+    wait = rate_limiter.acquire(tenant)
+    if wait > 0:
+        retry_after = str(math.ceil(wait)) if wait != math.inf else "3600"
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": retry_after})
 
 class GenerateUIRequest(BaseModel):
     prompt: str
+    use_templates: bool = False
+    envelope: bool = False
+    paginate: bool = False
+    store: bool = False
+    framework: Optional[Framework] = None
+
+class JobRequest(GenerateUIRequest):
+    priority: int = 0
+
+class FormSubmission(BaseModel):
+    endpoint: str
+    method: str = "POST"
+    values: Dict[str, Any]
+
+def respond(schema: PromptiusGuiSchema, request: GenerateUIRequest):
+    if request.framework is not None and request.framework != schema.metadata.framework:
+        # Switching frameworks reuses the generated schema instead of a new LLM call
+        schema = variant_cache.get(schema, request.framework.value)
+    if request.store and not request.paginate:
+        # Whole schema plus a key for /schemas/{key}/subtree fetches
+        body = build_envelope(schema, envelope_secret) if request.envelope else schema.model_dump()
+        return {"key": served_store.put(schema), "schema": body}
+    if request.paginate:
+        # Long child lists ship their first page; the rest is fetched by key
+        key = served_store.put(schema)
+        schema, hints = paginate(schema)
+        body = build_envelope(schema, envelope_secret) if request.envelope else schema.model_dump()
+        return {"key": key, "pages": [hint.to_json() for hint in hints.values()], "schema": body}
+    if request.envelope:
+        return build_envelope(schema, envelope_secret)
+    return schema.model_dump()
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/stats")
+def stats():
+    if response_cache is None:
+        return {"pid": os.getpid(), "cache": None}
+    cache = response_cache.stats()
+    return {"pid": os.getpid(), "cache": {"entries": cache.entries, "hits": cache.hits, "misses": cache.misses}}
+
+def invoke_streaming(messages, tenant: str) -> PromptiusGuiSchema:
+    # Chart placeholders are filled here and computed by fix_charts in generate
+    validator = IncrementalValidator(chart_free=chart_free and not replay_path)
+    chunks = stream_llm.stream(messages)
+    try:
+        for chunk in chunks:
+            validator.feed(getattr(chunk, "content", chunk))
+        return validator.close()
+    except IncrementalError as exc:
+        # Closing the stream cancels the upstream request; bill what was produced
+        print("Aborted generation:", exc)
+        rate_limiter.charge(tenant, estimate_tokens(validator.buffer.decode("utf-8", "replace")))
+        raise HTTPException(status_code=502, detail=f"Generated schema is invalid: {exc}")
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+def generate(request: GenerateUIRequest, tenant: str = "default") -> PromptiusGuiSchema:
+    print("Received prompt:", request.prompt)
+    if request.use_templates:
+        match = templates.route(request.prompt)
+        if match is not None:
+            print("Answered from template:", match.template.name)
+            return match.instantiate()
+    key = prompt_key(request.prompt, model_name)
+    cached = response_cache.get(key) if response_cache is not None else None
+    if cached is not None:
+        try:
+            schema, migrated = default_migrations.load(cached)
+        except (ValidationError, MigrationError) as exc:
+            print("Dropping unreadable cache entry:", exc)
+        else:
+            if migrated:
+                # Written under an older schema version; store the upgrade
+                response_cache.put(key, schema.model_dump_json().encode("utf-8"))
+            print("Answered from cache")
+            return schema
+    messages = [SystemMessage(content="You are a UI generator, you are required to generate UI, even if user is not providing sufficient data you are supposed to generate mock values. Keep the styling compact, use grid when required. You need to ensure that the UI looks good, think like a graphic designer"), HumanMessage(content=request.prompt)]
+    if stream_llm is not None:
+        answer = invoke_streaming(messages, tenant)
+    else:
+        answer: PromptiusGuiSchema = llm_with_struct.invoke(messages)
+    # Axis ranges and ticks that do not fit the series are recomputed
+    answer, chart_issues = fix_charts(answer)
+    for issue in chart_issues:
+        print("Chart issue:", issue.message)
+    for issue in check_events(answer, handlers=custom_handlers):
+        print("Event issue:", issue.code, issue.field, issue.message)
+    print("Generated UI Schema:", answer)
+    body = answer.model_dump_json()
+    rate_limiter.charge(tenant, estimate_tokens(body))
+    if response_cache is not None:
+        response_cache.put(key, body.encode("utf-8"))
+    if schema_store is not None:
+        schema_store.put(answer)
+    return answer
+
 @app.post("/generate_ui")
-def generate_ui(request: GenerateUIRequest):
+def generate_ui(request: GenerateUIRequest, tenant: str = Depends(authenticated_tenant)):
     """
     Generates a UI schema based on the user's prompt.
     """
-    print("Received prompt:", request.prompt)
-    answer: PromptiusGuiSchema = llm_with_struct.invoke([SystemMessage(content="You are a UI generator, you are required to generate UI, even if user is not providing sufficient data you are supposed to generate mock values. Keep the styling compact, use grid when required. You need to ensure that the UI looks good, think like a graphic designer"), HumanMessage(content=request.prompt)])
-    print("Generated UI Schema:", answer)
-    return answer.model_dump()
+    check_rate_limit(tenant)
+    return respond(generate(request, tenant), request)
+
+def run_job(job: Job) -> bytes:
+    request = GenerateUIRequest.model_validate(job.payload)
+    body = jsonable_encoder(respond(generate(request, job.tenant), request))
+    return json.dumps(body).encode("utf-8")
+
+job_pool = JobWorkerPool(job_queue, run_job, workers=job_workers, retention=job_retention)
+
+@app.on_event("startup")
+def start_job_workers():
+    # Jobs left running by a crashed process go back in the queue
+    job_queue.requeue_stale(older_than=600)
+    job_pool.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_pool.stop(timeout=30)
+    submission_store.close()
+
+def job_status(job: Job):
+    status = {"id": job.id, "status": job.status, "tenant": job.tenant, "priority": job.priority}
+    if job.status == QUEUED:
+        status["position"] = job_queue.position(job)
+    elif job.status == DONE:
+        status["result"] = json.loads(job.result)
+        status["seconds"] = job.finished - job.created
+    elif job.status == FAILED:
+        status["error"] = job.error
+    return status
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest, tenant: str = Depends(authenticated_tenant)):
+    """
+    Queues a generation and returns its id immediately.
+    """
+    # Admitted now; the worker bills the output tokens to the same tenant
+    check_rate_limit(tenant)
+    payload = request.model_dump(mode="json", exclude={"priority"})
+    priority = max(-MAX_JOB_PRIORITY, min(MAX_JOB_PRIORITY, request.priority))
+    job = job_queue.submit(payload, tenant=tenant, priority=priority)
+    return job_status(job)
+
+@app.get("/jobs")
+def queue_depth():
+    return job_queue.depth()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Returns a job's status; with ?wait=<seconds> holds the request until it finishes.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), MAX_JOB_WAIT)
+    delay = 0.05
+    while True:
+        job = job_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        if job.status in FINISHED or time.monotonic() >= deadline:
+            return job_status(job)
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, 0.5)
+
+@app.post("/render_html")
+def render_html(schema: PromptiusGuiSchema):
+    """
+    Streams static HTML for a schema so clients can paint before hydrating.
+    """
+    return StreamingResponse(render_document(schema, render_cache), media_type="text/html")
+
+def subgraph_json(sub: Subgraph):
+    return {
+        "nodes": [node.model_dump() for node in sub.nodes],
+        "edges": [edge.model_dump() for edge in sub.edges],
+        "events": [event.model_dump() for event in sub.events],
+        "hasMore": sub.more,
+    }
+
+@app.get("/schemas/{key}/subtree/{node_id}")
+def get_subtree(key: str, node_id: str, depth: Optional[int] = None):
+    """
+    Returns the subgraph rooted at a node, depth levels deep; cut nodes are listed in hasMore.
+    """
+    try:
+        sub = subtree(stored_index(key), node_id, depth if depth is None else max(depth, 0))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown schema or node")
+    return {"nodeId": node_id, **subgraph_json(sub)}
+
+@app.get("/schemas/{key}/framework/{framework}")
+def get_framework_variant(key: str, framework: Framework):
+    """
+    Returns a stored schema retargeted to another UI framework.
+    """
+    try:
+        schema = stored_index(key).schema
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown schema")
+    return variant_cache.get(schema, framework.value, content_hash=key).model_dump()
+
+@app.post("/schemas/{key}/submit")
+def submit_form(key: str, submission: FormSubmission):
+    """
+    Validates a submitForm payload against the stored schema's form and stores it.
+    """
+    try:
+        schema = stored_index(key).schema
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown schema")
+    router = form_routers.router(schema, content_hash=key)
+    try:
+        form = router.validate(submission.endpoint, submission.method, submission.values)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No form submits to this endpoint")
+    except SubmissionError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors)
+    try:
+        submission_store.add(key, form.endpoint, form.method, submission.values)
+    except SubmissionBacklogFull:
+        raise HTTPException(status_code=503, detail="Too many submissions waiting", headers={"Retry-After": "1"})
+    return {"status": "accepted", "form": form.form_id}
+
+@app.get("/schemas/{key}/forms")
+def get_form_rules(key: str):
+    """
+    Returns the compiled checks of every form in a stored schema, by field.
+    """
+    try:
+        schema = stored_index(key).schema
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown schema")
+    router = form_routers.router(schema, content_hash=key)
+    return [
+        {
+            "endpoint": form.endpoint,
+            "method": form.method,
+            "form": form.form_id,
+            "fields": form.validator.to_json(),
+        }
+        for forms in router.forms.values()
+        for form in forms
+    ]
+
+@app.get("/schemas/{key}/children/{node_id}")
+def get_children(key: str, node_id: str, start: int = 0, stop: int = DEFAULT_PAGE_SIZE):
+    """
+    Returns children start:stop of a node in a paged schema, with their subtrees.
+    """
+    try:
+        index = stored_index(key)
+        page, hints = children_page(index, node_id, max(start, 0), max(stop, 0))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown schema or node")
+    return {
+        "nodeId": node_id,
+        "total": len(index.child_edges.get(node_id, ())),
+        **subgraph_json(page),
+        "pages": [hint.to_json() for hint in hints.values()],
+    }
+
+@app.post("/layout")
+def layout(schema: PromptiusGuiSchema, breakpoint: str = "lg"):
+    """
+    Returns absolute boxes for every node at a breakpoint, plus overflow and overlap checks.
+    """
+    try:
+        result = layout_cache.layout(schema, breakpoint)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "breakpoint": breakpoint,
+        "width": result.width,
+        "height": result.height,
+        "boxes": {node_id: box._asdict() for node_id, box in result.boxes.items()},
+        "overflows": result.overflows(),
+        "overlaps": result.overlaps(),
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
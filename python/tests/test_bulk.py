@@ -0,0 +1,47 @@
+import pytest
+
+from promptius_gui_schema.__main__ import main
+from promptius_gui_schema.bulk import plan_tasks
+from promptius_gui_schema.templates import default_registry
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "schemas.jsonl"
+    lines = [t.instantiate(id_prefix="t").model_dump_json() for t in default_registry()]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_jsonl_tasks_split_at_newlines_and_cover_the_file(archive):
+    data = archive.read_bytes()
+    tasks = [chunk for batch in plan_tasks([str(archive)], 1) for chunk in batch]
+    assert len(tasks) == data.count(b"\n")
+    assert tasks[0][1] == 0 and tasks[-1][2] == len(data)
+    for (_, _, stop), (_, start, _) in zip(tasks, tasks[1:]):
+        assert stop == start and data[stop - 1 : stop] == b"\n"
+
+
+@pytest.mark.parametrize("chunk_bytes", [0, -1])
+def test_plan_tasks_rejects_empty_chunks(archive, chunk_bytes):
+    with pytest.raises(ValueError):
+        next(plan_tasks([str(archive)], chunk_bytes))
+
+
+@pytest.mark.parametrize("command", ["validate", "migrate"])
+@pytest.mark.parametrize("chunk_mb", ["0", "-3"])
+def test_cli_rejects_non_positive_chunk_size(
+    archive, tmp_path, capsys, command, chunk_mb
+):
+    argv = [command, str(archive), "--chunk-mb", chunk_mb]
+    if command == "migrate":
+        argv += ["-o", str(tmp_path / "out.jsonl")]
+    with pytest.raises(SystemExit) as info:
+        main(argv)
+    assert info.value.code == 2
+    assert "must be a positive integer" in capsys.readouterr().err
+
+
+def test_cli_validates_an_archive(archive, capsys):
+    assert main(["validate", str(archive), "--jobs", "1", "--chunk-mb", "1"]) == 0
+    assert capsys.readouterr().out
@@ -0,0 +1,120 @@
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.canonical import canonicalize, schema_hash
+
+# Few distinct node bodies and actions, so identical sibling subtrees (which
+# tie on order and on their hash) are common.
+BODIES = [
+    ("stack", {"direction": "column", "gap": 8, "align": "stretch"}),
+    ("card", {"title": "Card", "description": "", "elevation": 1, "padding": 16}),
+    (
+        "button",
+        {
+            "label": "Go",
+            "variant": "primary",
+            "size": "md",
+            "disabled": False,
+            "fullWidth": False,
+            "loading": False,
+        },
+    ),
+]
+ACTIONS = [
+    {"type": "setState", "key": "a", "value": "1"},
+    {"type": "setState", "key": "b", "value": True},
+    {"type": "submitForm", "endpoint": "/api/x", "method": "POST"},
+]
+EVENT_TYPES = ["onClick", "onFocus"]
+
+
+def random_schema(rng: random.Random) -> Dict[str, Any]:
+    count = rng.randint(2, 12)
+    ids = [f"id{i}" for i in range(count)]
+    nodes = []
+    for node_id in ids:
+        kind, props = rng.choice(BODIES[:2] if node_id == "id0" else BODIES)
+        nodes.append({"id": node_id, "type": kind, "props": dict(props)})
+    edges = []
+    for i in range(1, count):
+        # Most nodes hang off an earlier one; the rest start orphan trees.
+        if rng.random() < 0.85:
+            src = ids[rng.randrange(i)]
+            edges.append({"src": src, "dest": ids[i], "order": rng.randint(0, 1)})
+    for _ in range(rng.randint(0, 1)):
+        edges.append({"src": rng.choice(ids), "dest": "ghost", "order": 0})
+    events = [
+        {
+            "nodeId": rng.choice(ids),
+            "eventType": rng.choice(EVENT_TYPES),
+            "action": rng.choice(ACTIONS),
+        }
+        for _ in range(rng.randint(0, 4))
+    ]
+    return {
+        "metadata": {
+            "title": "Fuzz",
+            "description": "",
+            "version": "1.0.0",
+            "framework": "shadcn",
+            "rootId": "id0",
+        },
+        "nodes": nodes,
+        "edges": edges,
+        "events": events,
+    }
+
+
+def shuffled(data: Dict[str, Any], rng: random.Random, rename: bool) -> Dict[str, Any]:
+    """``data`` with list order shuffled and, optionally, node ids renamed."""
+    names = {node["id"]: node["id"] for node in data["nodes"]}
+    if rename:
+        fresh = [f"x{i}" for i in range(len(names))]
+        rng.shuffle(fresh)
+        names = dict(zip(names, fresh))
+
+    def name(node_id: str) -> str:
+        return names.get(node_id, node_id)
+
+    out: Dict[str, List[Any]] = {
+        "nodes": [dict(node, id=name(node["id"])) for node in data["nodes"]],
+        "edges": [
+            dict(edge, src=name(edge["src"]), dest=name(edge["dest"]))
+            for edge in data["edges"]
+        ],
+        "events": [
+            dict(event, nodeId=name(event["nodeId"])) for event in data["events"]
+        ],
+    }
+    for items in out.values():
+        rng.shuffle(items)
+    metadata = dict(data["metadata"], rootId=name(data["metadata"]["rootId"]))
+    return dict(out, metadata=metadata)
+
+
+@pytest.mark.parametrize("seed", range(400))
+def test_hash_and_canonical_form_ignore_input_order(seed):
+    rng = random.Random(seed)
+    data = random_schema(rng)
+    schema = PromptiusGuiSchema.model_validate(data)
+    expected = canonicalize(schema, relabel_ids=True).model_dump(mode="json")
+    for rename in (False, True):
+        other = PromptiusGuiSchema.model_validate(shuffled(data, rng, rename))
+        assert schema_hash(other) == schema_hash(schema)
+        assert canonicalize(other, relabel_ids=True).model_dump(mode="json") == expected
+    other = PromptiusGuiSchema.model_validate(shuffled(data, rng, rename=False))
+    assert schema_hash(other, relabel_ids=False) == schema_hash(
+        schema, relabel_ids=False
+    )
+
+
+def test_events_distinguish_identical_subtrees():
+    rng = random.Random(0)
+    data = random_schema(rng)
+    data["events"] = []
+    schema = PromptiusGuiSchema.model_validate(data)
+    data["events"] = [{"nodeId": "id0", "eventType": "onClick", "action": ACTIONS[0]}]
+    assert schema_hash(PromptiusGuiSchema.model_validate(data)) != schema_hash(schema)
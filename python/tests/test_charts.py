@@ -0,0 +1,24 @@
+import pytest
+
+from promptius_gui_schema import charts
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy" and charts.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(charts, "np", None)
+    return request.param
+
+
+def test_labels_sort_by_value(backend):
+    table = {
+        "month": [12, 2, 10, 1, 11, 2],
+        "year": [2024, 2023, 2024, 2023, 2024, 2024],
+        "sales": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    }
+    result = charts.aggregate(table, "month", "sales", "year")
+    assert result.labels == ["1", "2", "10", "11", "12"]
+    assert [series.name for series in result.series] == ["2023", "2024"]
+    assert result.series[1].data == [0.0, 6.0, 3.0, 5.0, 1.0]
@@ -0,0 +1,34 @@
+import pytest
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.compact import compact, expand, to_dict, to_json
+from promptius_gui_schema.templates import chart_dashboard_template, default_registry
+
+TEMPLATES = {template.name: template for template in default_registry()}
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATES))
+def test_templates_roundtrip(name):
+    schema = TEMPLATES[name].instantiate()
+    packed = compact(schema)
+    assert to_json(packed) == schema.model_dump_json()
+    assert to_dict(packed) == schema.model_dump(mode="json")
+    assert expand(packed) == schema
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [1e-7, -2.5e-9, 1e-5, -7.281153494453801e-05, 1e-4],
+        [1e16, 1.5e22, -1.2345678901234568e17, 1e15],
+        [0.0, -0.0, 0.1, 5e-324, 1.7976931348623157e308],
+        [float("inf"), float("-inf"), float("nan")],
+    ],
+)
+def test_floats_are_written_like_pydantic(values):
+    data = chart_dashboard_template().instantiate().model_dump(mode="json")
+    chart = next(node for node in data["nodes"] if node["type"] == "chart")
+    chart["props"]["series"][0]["data"] = values
+    chart["props"]["labels"] = [str(i) for i in range(len(values))]
+    schema = PromptiusGuiSchema.model_validate(data)
+    assert to_json(compact(schema)) == schema.model_dump_json()
@@ -0,0 +1,224 @@
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.forms import (
+    RouterCache,
+    SubmissionBacklogFull,
+    SubmissionError,
+    SubmissionRouter,
+    SubmissionStore,
+    form_specs,
+)
+
+
+def text_input(node_id: str, **props: Any) -> Dict[str, Any]:
+    base = {
+        "label": node_id,
+        "placeholder": "",
+        "type": "text",
+        "size": "md",
+        "required": True,
+        "disabled": False,
+        "helperText": "",
+        "defaultValue": "",
+        "maxLength": 100,
+        "minLength": 0,
+    }
+    base.update(props)
+    return {"id": node_id, "type": "input", "props": base}
+
+
+def button(node_id: str) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": "button",
+        "props": {
+            "label": "Send",
+            "variant": "primary",
+            "size": "md",
+            "disabled": False,
+            "fullWidth": False,
+            "loading": False,
+        },
+    }
+
+
+def card(node_id: str) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": "card",
+        "props": {"title": node_id, "description": "", "elevation": 1, "padding": 16},
+    }
+
+
+def submit(node_id: str, endpoint: str = "/api/submit") -> Dict[str, Any]:
+    return {
+        "nodeId": node_id,
+        "eventType": "onClick",
+        "action": {"type": "submitForm", "endpoint": endpoint, "method": "POST"},
+    }
+
+
+def two_forms(events: List[Dict[str, Any]]) -> PromptiusGuiSchema:
+    """Two cards, each with one required input and a submit button."""
+    edges = [
+        ("root", "name-card"),
+        ("root", "email-card"),
+        ("name-card", "name"),
+        ("name-card", "name-btn"),
+        ("email-card", "email"),
+        ("email-card", "email-btn"),
+    ]
+    return PromptiusGuiSchema.model_validate(
+        {
+            "metadata": {
+                "title": "Forms",
+                "description": "",
+                "version": "2.0.0",
+                "framework": "shadcn",
+                "rootId": "root",
+            },
+            "nodes": [
+                {
+                    "id": "root",
+                    "type": "stack",
+                    "props": {"direction": "column", "gap": 8, "align": "stretch"},
+                },
+                card("name-card"),
+                card("email-card"),
+                text_input("name"),
+                text_input("email", type="email"),
+                button("name-btn"),
+                button("email-btn"),
+            ],
+            "edges": [
+                {"src": src, "dest": dest, "order": i}
+                for i, (src, dest) in enumerate(edges)
+            ],
+            "events": events,
+        }
+    )
+
+
+def test_forms_sharing_an_endpoint_stay_separate():
+    schema = two_forms([submit("name-btn"), submit("email-btn")])
+    specs = form_specs(schema)
+    assert sorted(spec.form_id for spec in specs.values()) == [
+        "email-card",
+        "name-card",
+    ]
+    router = SubmissionRouter(schema)
+    assert router.validate("/api/submit", "post", {"name": "x"}).form_id == "name-card"
+    assert (
+        router.validate("/api/submit", "POST", {"email": "a@b.co"}).form_id
+        == "email-card"
+    )
+    with pytest.raises(SubmissionError) as raised:
+        router.validate("/api/submit", "POST", {"email": "nope"})
+    assert raised.value.errors == {"email": "not a valid email"}
+    with pytest.raises(KeyError):
+        router.validate("/api/other", "POST", {"name": "x"})
+
+
+def test_validate_rules_tighten_their_form_only():
+    schema = two_forms(
+        [
+            submit("name-btn"),
+            submit("email-btn", "/api/email"),
+            {
+                "nodeId": "name-btn",
+                "eventType": "onFocus",
+                "action": {
+                    "type": "validate",
+                    "rules": ["length=3..5", "@email maxLength=3", "bogus"],
+                },
+            },
+        ]
+    )
+    router = SubmissionRouter(schema)
+    with pytest.raises(SubmissionError) as raised:
+        router.validate("/api/submit", "POST", {"name": "ab"})
+    assert raised.value.errors == {"name": "shorter than 3 characters"}
+    assert router.validate("/api/submit", "POST", {"name": "abc"})
+    # '@email' points outside the name form, so the email form is unchanged
+    assert router.validate("/api/email", "POST", {"email": "long@example.com"})
+
+
+def test_router_cache_reuses_routers():
+    schema = two_forms([submit("name-btn")])
+    cache = RouterCache(maxsize=1)
+    assert cache.router(schema) is cache.router(schema)
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.router(two_forms([submit("email-btn")]))
+    assert len(cache) == 1
+
+
+def test_store_batches_concurrent_submissions():
+    with SubmissionStore(batch_size=100, flush_interval=0.01) as store:
+        threads = [
+            threading.Thread(
+                target=lambda n=n: [
+                    store.add("key", "/api/submit", "POST", {"n": n, "i": i})
+                    for i in range(50)
+                ]
+            )
+            for n in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(250):
+            store.add("key", "/api/other", "POST", {"i": i}, wait=False)
+        store.flush()
+        assert store.count() == 650
+        assert store.count("/api/other") == 250
+        assert store.batches < 650
+        rows = list(store.iter("/api/other", after=0))
+        assert [row.payload["i"] for row in rows] == list(range(250))
+        assert list(store.iter("/api/other", after=rows[-1].id)) == []
+
+
+def test_store_failed_batch_only_fails_its_waiters():
+    store = SubmissionStore(batch_size=10, retries=1)
+    write = store._write
+    failing = {"on": True}
+
+    def flaky(rows):
+        if failing["on"]:
+            raise sqlite3.OperationalError("database is locked")
+        write(rows)
+
+    store._write = flaky  # type: ignore[method-assign]
+    with pytest.raises(sqlite3.OperationalError):
+        store.add("key", "/api/submit", "POST", {"i": 0})
+    for i in range(5):
+        store.add("key", "/api/submit", "POST", {"i": i}, wait=False)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    assert store.dropped == 5
+
+    failing["on"] = False
+    store.add("key", "/api/submit", "POST", {"i": 6})
+    store.flush()
+    assert store.count() == 1
+    store.close()
+
+
+def test_store_bounds_its_backlog():
+    store = SubmissionStore(batch_size=5, max_pending=10, backlog_timeout=0.05)
+    write = store._write
+    store._write = lambda rows: (time.sleep(0.3), write(rows))  # type: ignore
+    with pytest.raises(SubmissionBacklogFull):
+        for i in range(100):
+            store.add("key", "/api/submit", "POST", {"i": i}, wait=False)
+    store.flush()
+    assert store.count() == i
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.add("key", "/api/submit", "POST", {})
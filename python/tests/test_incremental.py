@@ -0,0 +1,147 @@
+import json
+import random
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from pydantic import ValidationError
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.charts import complete_charts, fix_charts
+from promptius_gui_schema.incremental import IncrementalError, IncrementalValidator
+from promptius_gui_schema.templates import default_registry
+
+DOCUMENTS = [t.instantiate(id_prefix="t").model_dump_json() for t in default_registry()]
+
+VALUES = [None, -1, 0, 1, 20, 1.5, 1e9, "", "x", "button", "chart", True, [], {}]
+
+
+def stream(
+    doc: str, rng: random.Random, chart_free: bool = False
+) -> Optional[PromptiusGuiSchema]:
+    """Feed ``doc`` in random chunks; ``None`` if it is rejected."""
+    validator = IncrementalValidator(chart_free=chart_free)
+    try:
+        i = 0
+        while i < len(doc):
+            size = rng.randint(1, 40)
+            validator.feed(doc[i : i + size])
+            i += size
+        return validator.close()
+    except IncrementalError:
+        return None
+
+
+def pydantic(doc: str) -> Optional[PromptiusGuiSchema]:
+    try:
+        return PromptiusGuiSchema.model_validate_json(doc)
+    except ValidationError:
+        return None
+
+
+def dumped(schema: Optional[PromptiusGuiSchema]) -> Optional[str]:
+    return schema.model_dump_json() if schema is not None else None
+
+
+def mutate_value(data: Any, rng: random.Random) -> None:
+    """Replace or drop one value anywhere in ``data``."""
+    paths: List[Tuple[Any, ...]] = []
+
+    def walk(value: Any, path: Tuple[Any, ...]) -> None:
+        if isinstance(value, dict):
+            items: Any = value.items()
+        elif isinstance(value, list):
+            items = enumerate(value)
+        else:
+            return
+        for key, child in items:
+            paths.append(path + (key,))
+            walk(child, path + (key,))
+
+    walk(data, ())
+    path = rng.choice(paths)
+    parent = data
+    for key in path[:-1]:
+        parent = parent[key]
+    if isinstance(parent, dict) and rng.random() < 0.15:
+        del parent[path[-1]]
+    else:
+        parent[path[-1]] = rng.choice(VALUES)
+
+
+def mutate_bytes(doc: str, rng: random.Random) -> str:
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(doc))
+        op = rng.random()
+        if op < 0.4:
+            doc = doc[:i] + doc[i + 1 :]
+        elif op < 0.7:
+            doc = doc[:i] + rng.choice('{}[],:"0 -.e\\a') + doc[i:]
+        else:
+            doc = doc[:i] + doc[i] + doc[i:]
+    return doc
+
+
+@pytest.mark.parametrize("doc", DOCUMENTS)
+def test_chunked_documents_match_pydantic(doc):
+    rng = random.Random(doc)
+    for _ in range(20):
+        assert dumped(stream(doc, rng)) == doc
+    assert dumped(stream(json.dumps(json.loads(doc), indent=2), rng)) == doc
+
+
+@pytest.mark.parametrize("seed", range(0, 1000, 50))
+def test_fuzzed_values_match_pydantic(seed):
+    for seed in range(seed, seed + 50):
+        rng = random.Random(seed)
+        data = json.loads(rng.choice(DOCUMENTS))
+        for _ in range(rng.randint(0, 2)):
+            mutate_value(data, rng)
+        doc = json.dumps(data)
+        assert dumped(stream(doc, rng)) == dumped(pydantic(doc)), seed
+
+
+@pytest.mark.parametrize("seed", range(0, 1000, 50))
+def test_fuzzed_bytes_match_pydantic(seed):
+    for seed in range(seed, seed + 50):
+        rng = random.Random(seed)
+        doc = mutate_bytes(rng.choice(DOCUMENTS), rng)
+        assert dumped(stream(doc, rng)) == dumped(pydantic(doc)), seed
+
+
+def test_first_error_stops_the_stream():
+    data = json.loads(DOCUMENTS[0])
+    data["nodes"].insert(1, {"id": "g", "type": "grid", "props": {"columns": 20}})
+    doc = json.dumps(data)
+    validator = IncrementalValidator()
+    with pytest.raises(IncrementalError) as info:
+        for char in doc:
+            validator.feed(char)
+    error = info.value
+    assert error.path == ("nodes", 1, "props", "columns")
+    assert doc[error.offset : error.offset + 2] == "20"
+    assert validator.offset < len(doc) // 2
+    with pytest.raises(IncrementalError):
+        validator.close()
+
+
+def chart_free(doc: str) -> str:
+    """``doc`` without the chart fields ``chart_free_schema`` leaves out."""
+    data = json.loads(doc)
+    for node in data["nodes"]:
+        if node["type"] == "chart":
+            props = node["props"]
+            del props["annotations"], props["xAxis"]["ticks"]
+            del props["yAxis"]["min"], props["yAxis"]["max"]
+    return json.dumps(data)
+
+
+def test_chart_free_documents_complete_like_complete_charts():
+    docs = [chart_free(d) for d in DOCUMENTS if '"type":"chart"' in d]
+    assert docs
+    rng = random.Random(0)
+    for doc in docs:
+        expected = complete_charts(json.loads(doc)).model_dump_json()
+        streamed = stream(doc, rng, chart_free=True)
+        assert streamed is not None
+        assert fix_charts(streamed)[0].model_dump_json() == expected
+        assert stream(doc, rng) is None
@@ -0,0 +1,34 @@
+from promptius_gui_schema.interning import StringPool
+from promptius_gui_schema.templates import default_registry
+
+TEMPLATES = list(default_registry())
+
+
+def documents(count: int):
+    return [
+        TEMPLATES[i % len(TEMPLATES)].instantiate(id_prefix=f"d{i}").model_dump_json()
+        for i in range(count)
+    ]
+
+
+def test_pooled_models_equal_plain_ones_and_share_strings():
+    pool = StringPool()
+    docs = documents(len(TEMPLATES) + 1)
+    # The same template twice, with different ids.
+    first, second = pool.validate_json(docs[0]), pool.validate_json(docs[-1])
+    assert first.model_dump_json() == docs[0]
+    assert first.metadata.title is second.metadata.title
+    assert pool.intern("".join(first.metadata.title)) is first.metadata.title
+    fields_set = first.nodes[0].__pydantic_fields_set__
+    assert second.nodes[0].__pydantic_fields_set__ is fields_set
+
+
+def test_pool_size_is_capped():
+    pool = StringPool(max_strings=50)
+    models = [pool.validate_json(d) for d in documents(40)]
+    assert 0 < len(pool) <= 50
+    assert [m.model_dump_json() for m in models] == documents(40)
+    unbounded = StringPool(max_strings=None)
+    for d in documents(40):
+        unbounded.validate_json(d)
+    assert len(unbounded) > 50
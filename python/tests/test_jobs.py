@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from promptius_gui_schema.jobs import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    Job,
+    JobQueue,
+    JobWorkerPool,
+)
+
+
+@pytest.fixture
+def queue():
+    with JobQueue(default_cap=1) as queue:
+        yield queue
+
+
+def test_claims_follow_priority_then_submission_order(queue):
+    low = queue.submit({"prompt": "low"}, tenant="a")
+    high = queue.submit({"prompt": "high"}, tenant="b", priority=5)
+    later = queue.submit({"prompt": "later"}, tenant="c")
+    assert queue.position(later) == 2
+    assert [queue.claim().id for _ in range(3)] == [high.id, low.id, later.id]
+    assert queue.claim() is None
+
+
+def test_tenant_cap_skips_busy_tenants(queue):
+    first = queue.submit({}, tenant="busy")
+    queue.submit({}, tenant="busy")
+    other = queue.submit({}, tenant="other")
+    assert queue.claim().id == first.id
+    assert queue.claim().id == other.id
+    assert queue.claim() is None
+    queue.complete(first.id, b"ok")
+    assert queue.claim() is not None
+
+
+def test_finish_and_requeue_stale(queue):
+    job = queue.submit({}, tenant="t")
+    failed = queue.submit({}, tenant="u")
+    queue.claim(), queue.claim()
+    queue.fail(failed.id, "boom")
+    assert queue.get(failed.id).status == FAILED
+    assert queue.requeue_stale(older_than=-1) == 1
+    assert queue.get(job.id).status == QUEUED
+    assert queue.depth()["status"] == {QUEUED: 1, RUNNING: 0, DONE: 0, FAILED: 1}
+
+
+def test_purge_keeps_recent_and_unfinished_jobs(queue):
+    finished = queue.submit({}, tenant="a")
+    waiting = queue.submit({}, tenant="b")
+    queue.claim()
+    queue.complete(finished.id, b"{}")
+    assert queue.purge(older_than=3600) == 0
+    assert queue.purge(older_than=-1) == 1
+    assert queue.get(finished.id) is None
+    assert queue.get(waiting.id).status == QUEUED
+
+
+def test_pool_runs_jobs_and_purges_on_a_timer(queue):
+    def handler(job: Job) -> bytes:
+        if job.payload.get("fail"):
+            raise ValueError("bad prompt")
+        return job.payload["prompt"].encode()
+
+    pool = JobWorkerPool(
+        queue, handler, workers=2, poll_interval=0.01, retention=0.2,
+        purge_interval=0.05,
+    ).start()
+    try:
+        ok = queue.submit({"prompt": "hi"}, tenant="a")
+        bad = queue.submit({"fail": True}, tenant="b")
+        assert queue.wait(ok.id, timeout=5).result == b"hi"
+        assert queue.wait(bad.id, timeout=5).error == "ValueError: bad prompt"
+        deadline = time.monotonic() + 5
+        while pool.purged < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert pool.purged == 2
+        assert queue.get(ok.id) is None
+    finally:
+        pool.stop(timeout=5)
+    assert not any(t.name == "job-purger" for t in threading.enumerate())
+
+
+def test_pool_without_retention_keeps_finished_jobs(queue):
+    pool = JobWorkerPool(queue, lambda job: b"", workers=1, poll_interval=0.01)
+    pool.start()
+    try:
+        job = queue.submit({}, tenant="a")
+        assert queue.wait(job.id, timeout=5).status == DONE
+    finally:
+        pool.stop(timeout=5)
+    assert queue.get(job.id) is not None
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.canonical import schema_hash
+from promptius_gui_schema.layout import (
+    BREAKPOINTS,
+    LayoutCache,
+    breakpoint_for,
+    compute_layout,
+    layout_key,
+)
+
+
+def button(node_id: str, label: str = "Go", full_width: bool = False) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "type": "button",
+        "props": {
+            "label": label,
+            "variant": "primary",
+            "size": "md",
+            "disabled": False,
+            "fullWidth": full_width,
+            "loading": False,
+        },
+    }
+
+
+def row(
+    children: List[Dict[str, Any]], edges: List[Tuple[str, int]]
+) -> PromptiusGuiSchema:
+    """A row stack holding ``children``, edges listed in the given order."""
+    return PromptiusGuiSchema.model_validate(
+        {
+            "metadata": {
+                "title": "Row",
+                "description": "",
+                "version": "1.0.0",
+                "framework": "shadcn",
+                "rootId": "root",
+            },
+            "nodes": [
+                {
+                    "id": "root",
+                    "type": "stack",
+                    "props": {"direction": "row", "gap": 8, "align": "start"},
+                }
+            ]
+            + children,
+            "edges": [
+                {"src": "root", "dest": dest, "order": order} for dest, order in edges
+            ],
+            "events": [],
+        }
+    )
+
+
+def test_row_places_intrinsic_items_then_shares_the_rest():
+    schema = row(
+        [button("a"), button("b", full_width=True)], [("a", 0), ("b", 1)]
+    )
+    layout = compute_layout(schema, 500)
+    a, b = layout.boxes["a"], layout.boxes["b"]
+    assert a.x == 0 and a.width == 2 * 7 + 32  # two glyphs plus md padding
+    assert b.x == a.right + 8 and b.right == 500
+    assert layout.order == ["root", "a", "b"]
+    assert layout.overflows() == [] and layout.overlaps() == []
+
+
+def test_tied_siblings_in_another_order_get_another_layout():
+    children = [button("a", "Short"), button("b", "A much longer label")]
+    first = row(children, [("a", 0), ("b", 0)])
+    second = row(children, [("b", 0), ("a", 0)])
+    # The content hash ignores the list order of tied siblings...
+    assert schema_hash(first, relabel_ids=False) == schema_hash(
+        second, relabel_ids=False
+    )
+    # ...but they render in list order, so the layout key must not.
+    assert layout_key(first) != layout_key(second)
+    cache = LayoutCache()
+    assert cache.layout(first).boxes == compute_layout(first, BREAKPOINTS["lg"]).boxes
+    assert cache.layout(second).boxes == compute_layout(second, BREAKPOINTS["lg"]).boxes
+    assert (cache.hits, cache.misses) == (0, 2)
+    cache.layout(row(children, [("a", 0), ("b", 0)]))
+    assert cache.hits == 1
+
+
+def test_missing_root_lays_out_nothing():
+    schema = row([button("a")], [("a", 0)]).model_copy(deep=True)
+    schema.metadata.rootId = "nope"
+    assert layout_key(schema) == ""
+    assert LayoutCache().layout(schema).boxes == {}
+
+
+@pytest.mark.parametrize(
+    "width, name", [(320, "base"), (640, "sm"), (1023, "md"), (2000, "2xl")]
+)
+def test_breakpoint_for(width, name):
+    assert breakpoint_for(width) == name
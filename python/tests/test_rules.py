@@ -0,0 +1,308 @@
+import random
+import time
+from typing import Any, Dict, Mapping
+
+import pytest
+
+from promptius_gui_schema.patterns import LinearPattern
+from promptius_gui_schema.rules import (
+    MAX_MATCH_LENGTH,
+    TYPE_CHECKS,
+    Constraints,
+    CompiledRules,
+    Rule,
+    RuleError,
+    compile_rules,
+    parse_rule,
+)
+
+
+def reference_check(
+    fields: Mapping[str, Constraints], payload: Mapping[str, Any]
+) -> Dict[str, str]:
+    """What the generated checker must return, written out plainly."""
+    import re
+
+    errors = {name: "unexpected field" for name in payload if name not in fields}
+    for name, rules in fields.items():
+        value = payload.get(name)
+        if value is None or value == "":
+            if rules.required:
+                errors[name] = "required"
+            continue
+        if type(value) not in (str, int, float):
+            errors[name] = "must be a string"
+            continue
+        text = value if isinstance(value, str) else str(value)
+        ranged = rules.minimum is not None or rules.maximum is not None
+        checks = []
+        if rules.required:
+            checks.append((not text.strip(), "required"))
+        if rules.min_length:
+            checks.append(
+                (
+                    len(text) < rules.min_length,
+                    f"shorter than {rules.min_length} characters",
+                )
+            )
+        if rules.max_length is not None:
+            checks.append(
+                (
+                    len(text) > rules.max_length,
+                    f"longer than {rules.max_length} characters",
+                )
+            )
+        for kind in rules.formats:
+            if not (ranged and kind == "number"):
+                checks.append(
+                    (not TYPE_CHECKS[kind](text), f"not a valid {kind}")
+                )
+        if rules.patterns:
+            checks.append(
+                (len(text) > MAX_MATCH_LENGTH, "too long to match the pattern")
+            )
+        for source in rules.patterns:
+            checks.append(
+                (re.search(source, text) is None, f"does not match /{source}/")
+            )
+        failed = next((message for bad, message in checks if bad), None)
+        if failed is None and ranged:
+            try:
+                number = float(text)
+            except ValueError:
+                number = float("nan")
+            if number != number or number in (float("inf"), float("-inf")):
+                failed = "not a valid number"
+            elif rules.minimum is not None and number < rules.minimum:
+                failed = f"less than {rules.minimum}"
+            elif rules.maximum is not None and number > rules.maximum:
+                failed = f"greater than {rules.maximum}"
+        if failed is not None:
+            errors[name] = failed
+    return errors
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("required", Rule(None, "required")),
+        ("min_length:3", Rule(None, "minLength", 3)),
+        ("Max-Length = 10", Rule(None, "maxLength", 10)),
+        ("length=4", Rule(None, "length", (4, 4))),
+        ("length=..5", Rule(None, "length", (None, 5))),
+        ("range=1..10", Rule(None, "range", (1, 10))),
+        ("min=-2.5", Rule(None, "min", -2.5)),
+        ("pattern=/^[a-z]+$/", Rule(None, "pattern", "^[a-z]+$")),
+        ("@email-input email", Rule("email-input", "email")),
+        ("numeric", Rule(None, "number")),
+    ],
+)
+def test_parse_rule(text, expected):
+    assert parse_rule(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "bogus",
+        "required=1",
+        "max",
+        "minLength=x",
+        "minLength=²",
+        "minLength=-1",
+        "length=5..2",
+        "range=..",
+        "min=nan",
+        "pattern=(",
+        "pattern=a{99999999999}",
+        "pattern=a{2000}",
+        "pattern=(a)\\1",
+        "pattern=a(?=b)",
+        "pattern=(?<!a)b",
+        "pattern=" + "a" * 300,
+    ],
+)
+def test_parse_rule_rejects(text):
+    with pytest.raises(RuleError):
+        parse_rule(text)
+
+
+def test_constraints_keep_the_tightest_bounds():
+    rules = Constraints()
+    for text in ["minLength=2", "length=3..10", "maxLength=8", "min=0", "range=-5..5"]:
+        rules.add(parse_rule(text))
+    assert (rules.min_length, rules.max_length) == (3, 8)
+    assert (rules.minimum, rules.maximum) == (0, 5)
+
+
+@pytest.mark.parametrize(
+    "payload, errors",
+    [
+        ({"name": "abc", "age": "30"}, {}),
+        ({"name": "   "}, {"name": "required"}),
+        ({"name": ""}, {"name": "required"}),
+        ({"name": True}, {"name": "must be a string"}),
+        ({"name": ["a"]}, {"name": "must be a string"}),
+        ({"name": "a"}, {"name": "shorter than 2 characters"}),
+        ({"name": "abcdef"}, {"name": "longer than 5 characters"}),
+        ({"name": "ABC"}, {"name": "does not match /^[a-z]+$/"}),
+        ({"name": "ab", "age": ""}, {}),
+        ({"name": "ab", "age": 18}, {}),
+        ({"name": "ab", "age": "99"}, {}),
+        ({"name": "ab", "age": 17}, {"age": "less than 18"}),
+        ({"name": "ab", "age": "100"}, {"age": "greater than 99"}),
+        ({"name": "ab", "age": "30.5"}, {"age": "not a valid integer"}),
+        ({"name": "ab", "age": "inf"}, {"age": "not a valid integer"}),
+        ({"name": "ab", "extra": 1}, {"extra": "unexpected field"}),
+    ],
+)
+def test_compiled_edge_cases(payload, errors):
+    check = compile_rules(
+        {
+            "name": ["required", "length=2..5", "pattern=^[a-z]+$"],
+            "age": ["integer", "range=18..99"],
+        }
+    )
+    assert check(payload) == errors
+
+
+@pytest.mark.parametrize(
+    "kind, good, bad",
+    [
+        ("email", "a@b.co", "a@b"),
+        ("url", "https://x.io/p", "ftp://x.io"),
+        ("number", "-1.5e3", "1,5"),
+        ("integer", "12", "1.2"),
+        ("tel", "+1 (555) 010-0000", "call me"),
+        ("date", "2024-02-29", "2023-02-29"),
+    ],
+)
+def test_formats(kind, good, bad):
+    check = compile_rules({"f": [kind]})
+    assert check({"f": good}) == {}
+    assert check({"f": bad}) == {"f": f"not a valid {kind}"}
+
+
+def test_long_values_are_not_matched():
+    check = compile_rules({"f": ["pattern=^a+$"]})
+    assert check({"f": "a" * MAX_MATCH_LENGTH}) == {}
+    assert check({"f": "a" * (MAX_MATCH_LENGTH + 1)}) == {
+        "f": "too long to match the pattern"
+    }
+
+
+@pytest.mark.parametrize(
+    "source, match, near_miss",
+    [
+        ("(a|aa)*b", "aaab", "a" * MAX_MATCH_LENGTH),
+        ("(a+)+$", "xa", "a" * (MAX_MATCH_LENGTH - 1) + "!"),
+        ("^(\\w+\\s?)*$", "ab cd", "a" * (MAX_MATCH_LENGTH - 1) + "!"),
+        ("a*a*a*a*a*x", "aax", "a" * MAX_MATCH_LENGTH),
+    ],
+)
+def test_backtracking_patterns_run_in_linear_time(source, match, near_miss):
+    check = compile_rules({"f": [f"pattern={source}"]})
+    assert check({"f": match}) == {}
+    start = time.perf_counter()
+    assert check({"f": near_miss}) == {"f": f"does not match /{source}/"}
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "^[a-z]+$",
+        "(?i)^abc",
+        "(?m)^b$",
+        "(?s)a.b",
+        "\\bcat\\b",
+        "\\Bx",
+        "a{2,3}?c",
+        "[^\\d\\s]+\\Z",
+        "(?:ab|a)(?:c|bcd)$",
+        "(?a)\\w\\W",
+    ],
+)
+def test_linear_patterns_agree_with_re(source):
+    import re
+
+    pattern = LinearPattern(source)
+    rng = random.Random(source)
+    for _ in range(500):
+        text = "".join(rng.choice("abcdABx1 \né_") for _ in range(rng.randrange(9)))
+        assert pattern.search(text) == bool(re.search(source, text)), text
+
+
+def random_constraints(rng: random.Random) -> Constraints:
+    rules = Constraints(required=rng.random() < 0.5)
+    texts = rng.sample(
+        [
+            "minLength=2",
+            "maxLength=6",
+            "length=1..4",
+            "email",
+            "number",
+            "integer",
+            "date",
+            "min=0",
+            "max=50",
+            "pattern=^[0-9a-z@.]+$",
+            "pattern=\\d",
+        ],
+        rng.randrange(4),
+    )
+    for text in texts:
+        rules.add(parse_rule(text))
+    return rules
+
+
+def random_value(rng: random.Random) -> Any:
+    return rng.choice(
+        [
+            None,
+            "",
+            " ",
+            "a",
+            "abc",
+            "a@b.co",
+            "12",
+            "-3",
+            "51",
+            "4.5",
+            "1e1",
+            "nan",
+            "2024-01-31",
+            "ABCDEFGH",
+            7,
+            0.5,
+            False,
+            [],
+        ]
+    )
+
+
+def test_generated_source_matches_constraints():
+    rng = random.Random(0)
+    for _ in range(300):
+        fields = {f"f{i}": random_constraints(rng) for i in range(rng.randrange(1, 4))}
+        check = CompiledRules(fields)
+        for _ in range(20):
+            payload = {
+                name: random_value(rng) for name in fields if rng.random() < 0.8
+            }
+            if rng.random() < 0.1:
+                payload["stray"] = "x"
+            assert check(payload) == reference_check(fields, payload), check.source
+
+
+def test_to_json_exports_constraints():
+    check = compile_rules({"f": ["required", "email", "maxLength=20", "min=1"]})
+    assert check.to_json() == {
+        "f": {
+            "required": True,
+            "maxLength": 20,
+            "format": ["email"],
+            "minimum": 1,
+        }
+    }
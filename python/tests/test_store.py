@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from promptius_gui_schema import PromptiusGuiSchema
+from promptius_gui_schema.store import SchemaStore, decompose
+
+
+def node(node_id: str, kind: str = "card", title: str = "Card") -> Dict[str, Any]:
+    if kind == "stack":
+        props = {"direction": "column", "gap": 8, "align": "stretch"}
+    else:
+        props = {"title": title, "description": "", "elevation": 1, "padding": 16}
+    return {"id": node_id, "type": kind, "props": props}
+
+
+def schema(
+    nodes: List[Dict[str, Any]],
+    edges: List[Tuple[str, str, int]],
+    root: str = "root",
+    events: Any = (),
+) -> PromptiusGuiSchema:
+    return PromptiusGuiSchema.model_validate(
+        {
+            "metadata": {
+                "title": "Store",
+                "description": "",
+                "version": "1.0.0",
+                "framework": "shadcn",
+                "rootId": root,
+            },
+            "nodes": nodes,
+            "edges": [{"src": s, "dest": d, "order": o} for s, d, o in edges],
+            "events": list(events),
+        }
+    )
+
+
+def contents(doc: PromptiusGuiSchema) -> Dict[str, Any]:
+    """``doc`` with list order dropped; ``get`` returns rendering order."""
+    return {
+        "metadata": doc.metadata.model_dump(mode="json"),
+        "nodes": sorted((n.id, n.model_dump_json()) for n in doc.nodes),
+        "edges": sorted((e.src, e.dest, e.order) for e in doc.edges),
+        "events": [e.model_dump(mode="json") for e in doc.events],
+    }
+
+
+CLICK = {
+    "nodeId": "a",
+    "eventType": "onClick",
+    "action": {"type": "setState", "key": "open", "value": True},
+}
+
+CASES = {
+    "tree": schema(
+        [node("root", "stack"), node("a"), node("b", title="B")],
+        [("root", "a", 0), ("root", "b", 1)],
+        events=[CLICK],
+    ),
+    "shared child": schema(
+        [node("root", "stack"), node("a", "stack"), node("b", "stack"), node("c")],
+        [("root", "a", 0), ("root", "b", 1), ("a", "c", 0), ("b", "c", 0)],
+    ),
+    "cycle and dangling edges": schema(
+        [node("root", "stack"), node("a", "stack"), node("b")],
+        [("root", "a", 0), ("a", "root", 0), ("a", "ghost", 1), ("ghost", "b", 0)],
+    ),
+    "orphan trees": schema(
+        [node("root"), node("x", "stack"), node("y")],
+        [("x", "y", 0)],
+    ),
+    "missing root": schema(
+        [node("a", "stack"), node("b")],
+        [("a", "b", 0)],
+        root="nope",
+        events=[CLICK],
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_put_get_roundtrip(name):
+    doc = CASES[name]
+    with SchemaStore() as store:
+        key = store.put(doc)
+        assert key in store
+        assert contents(store.get(key)) == contents(doc)
+        assert store.put(doc) == key
+
+
+def test_missing_root_is_left_out_of_roots():
+    parts = decompose(CASES["missing root"])
+    assert parts.roots == ["a"]
+    assert parts.ids == ["a", "b"]
+
+
+def test_equal_subtrees_share_fragments():
+    first = schema([node("root", "stack"), node("a")], [("root", "a", 0)])
+    second = schema([node("top", "stack"), node("z")], [("top", "z", 0)], root="top")
+    with SchemaStore() as store:
+        keys = store.put_many([first, second])
+        assert keys[0] != keys[1]
+        stats = store.stats()
+        assert (stats.schemas, stats.logical_nodes) == (2, 4)
+        assert stats.unique_fragments == 2
+        assert stats.dedup_ratio == 2.0
+        assert store.keys() == keys
+
+
+def test_get_unknown_key_raises_key_error():
+    with SchemaStore() as store:
+        with pytest.raises(KeyError):
+            store.get("0" * 32)
@@ -0,0 +1,93 @@
+import pytest
+
+from promptius_gui_schema.templates import (
+    Slot,
+    Template,
+    TemplateRegistry,
+    chart_dashboard_template,
+    default_registry,
+)
+
+
+@pytest.fixture(scope="module")
+def registry() -> TemplateRegistry:
+    return default_registry()
+
+
+def props(schema, suffix):
+    return next(node.props for node in schema.nodes if node.id.endswith(suffix))
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    [
+        'Build a COVID cases line chart dashboard titled "COVID Cases by Country"',
+        'Line chart dashboard titled "X" with labels [a, b] and values [1, 2, 3]',
+        'Bar chart dashboard titled "X" with labels [a, b] and values [1, x]',
+        'KPI metrics dashboard titled "Ops"',
+        "Make a contact form",
+        "Create a sales dashboard with revenue, users and churn",
+    ],
+)
+def test_prompts_without_their_content_are_novel(registry, prompt):
+    assert registry.route(prompt) is None
+
+
+def test_chart_dashboard_uses_the_prompts_data(registry):
+    match = registry.route(
+        'Build a line chart dashboard titled "COVID Cases" with labels '
+        "[US, UK, FR] and values [1000, 2500, 700]"
+    )
+    assert match is not None and match.template.name == "chart_dashboard"
+    schema = match.instantiate()
+    chart = props(schema, "main-chart")
+    assert schema.metadata.title == "COVID Cases"
+    assert props(schema, "chart-heading").content == "COVID Cases"
+    assert chart.chartType.value == "line"
+    assert chart.labels == chart.xAxis.ticks == ["US", "UK", "FR"]
+    assert chart.series[0].data == [1000, 2500, 700]
+    assert chart.yAxis.min <= 700 and chart.yAxis.max >= 2500
+
+
+def test_kpi_grid_routes_with_its_values(registry):
+    match = registry.route(
+        'KPI metrics dashboard titled "Ops" with 1,200 users, '
+        "revenue of $5,400 and 37 active sessions"
+    )
+    assert match is not None and match.template.name == "kpi_grid"
+    schema = match.instantiate()
+    assert props(schema, "users-count").content == "1,200"
+    assert props(schema, "revenue-count").content == "$5,400"
+    assert props(schema, "sessions-count").content == "37"
+    assert props(schema, "users-card").title == "Total Users"
+
+
+def test_contact_form_fills_title_and_endpoint(registry):
+    match = registry.route('Contact form titled "Reach us" posting to /api/reach')
+    assert match is not None
+    schema = match.instantiate()
+    assert schema.metadata.title == "Reach us"
+    assert schema.events[0].action.endpoint == "/api/reach"
+
+
+def test_slots_without_patterns_block_routing():
+    base = chart_dashboard_template()
+    template = Template(
+        "sample",
+        base.schema,
+        slots=[Slot("title", str, (("chart-heading", "content"),), "Sample")],
+        keywords=["sample"],
+    )
+    registry = TemplateRegistry()
+    registry.register(template)
+    assert registry.route("sample") is None
+    assert TemplateRegistry(require_slots=False).route("sample") is None
+    loose = TemplateRegistry(require_slots=False)
+    loose.register(template)
+    assert loose.route("sample") is not None
+
+
+def test_list_slots_split_on_commas():
+    slot = Slot("values", chart_dashboard_template().slots["values"].type, (), [])
+    assert slot.coerce("1, 2.5,3") == [1.0, 2.5, 3.0]
+    assert slot.coerce([4]) == [4.0]